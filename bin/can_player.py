@@ -0,0 +1,78 @@
+#!/usr/bin/env python
+"""
+can_player.py replays a recorded log file onto a CAN bus, keeping the
+original gaps between messages.
+
+    can_player.py -c vcan0 -i socketcan candump.log
+
+See canplayer in the can-utils package for a C implementation.
+The log format is chosen by the file extension: .asc, .log (candump -l),
+.bin or .pcapng.
+"""
+from __future__ import print_function
+import argparse
+
+import can
+
+if __name__ == "__main__":
+
+    parser = argparse.ArgumentParser(description="Replay CAN traffic from a log file onto a bus")
+
+    parser.add_argument("infile", help="""The log file to replay, extension can be .asc, .log, .bin, .pcapng""")
+
+    parser.add_argument("-v", action="count", dest="verbosity",
+                        help='''How much information do you want to see at the command line?
+                        You can add several of these e.g., -vv is DEBUG''', default=2)
+
+    parser.add_argument('-c', '--channel', help='''Most backend interfaces require some sort of channel.
+    For example with the serial interface the channel might be a rfcomm device: /dev/rfcomm0
+    Other channel examples are: can0, vcan0''', default=can.rc['channel'])
+
+    parser.add_argument('-i', '--interface', dest="interface", help='''Which backend do you want to use?''',
+                        default='kvaser', choices=('kvaser', 'socketcan', 'socketcan_ctypes',
+                                                   'socketcan_native', 'pcan', 'serial',
+                                                   'virtual', 'shm', 'network', 'replay'))
+
+    parser.add_argument('-s', '--speed', type=float, default=1.0,
+                        help='''Playback speed, 2 replays twice as fast as recorded''')
+
+    parser.add_argument('--fast', action='store_true',
+                        help='''Ignore the recorded timing and send as fast as possible''')
+
+    parser.add_argument('--skip', type=float, default=0.0,
+                        help='''Seconds from the start of the recording to skip''')
+
+    parser.add_argument('--filter', help='''Only replay messages matching one of these filters:
+        <can_id>:<can_mask> (matches when <can_id> & mask == can_id & mask)
+    ''', nargs='+', default=None)
+
+    results = parser.parse_args()
+
+    verbosity = results.verbosity
+
+    logging_level_name = ['critical', 'error', 'warning', 'info', 'debug', 'subdebug'][min(5, verbosity)]
+    can.set_logging_level(logging_level_name)
+
+    can_filters = None
+    if results.filter:
+        can_filters = []
+        for filt in results.filter:
+            can_id, can_mask = filt.split(":")
+            can_filters.append({"can_id": int(can_id, base=16), "can_mask": int(can_mask, base=16)})
+
+    bus_kwargs = {}
+    if results.interface == 'shm':
+        # Only the bus which creates a shared memory ring can send to it
+        bus_kwargs['create'] = True
+    bus = can.interface.Bus(results.channel, bustype=results.interface, **bus_kwargs)
+    player = can.Player(can.LogReader(results.infile), bus,
+                        speed=None if results.fast else results.speed,
+                        can_filters=can_filters, skip=results.skip)
+
+    try:
+        player.play()
+    except KeyboardInterrupt:
+        pass
+    finally:
+        print(player.report())
+        bus.shutdown()
@@ -0,0 +1,66 @@
+#!/usr/bin/env python
+"""
+can_server.py makes a CAN bus available over the network, so other machines
+can open it with the network interface.
+
+    can_server.py -c can0 -i socketcan --port 20000
+
+Clients connect with:
+
+    bus = can.interface.Bus('hostname:20000', bustype='network')
+
+The packets are compatible with cannelloni.
+"""
+from __future__ import print_function
+import argparse
+import time
+
+import can
+from can.interfaces.network import NetworkServer
+
+if __name__ == "__main__":
+
+    parser = argparse.ArgumentParser(description="Serve a CAN bus to network clients")
+
+    parser.add_argument("-v", action="count", dest="verbosity",
+                        help='''How much information do you want to see at the command line?
+                        You can add several of these e.g., -vv is DEBUG''', default=2)
+
+    parser.add_argument('-c', '--channel', help='''Most backend interfaces require some sort of channel.
+    For example with the serial interface the channel might be a rfcomm device: /dev/rfcomm0
+    Other channel examples are: can0, vcan0''', default=can.rc['channel'])
+
+    parser.add_argument('-i', '--interface', dest="interface", help='''Which backend do you want to use?''',
+                        default='kvaser', choices=('kvaser', 'socketcan', 'socketcan_ctypes',
+                                                   'socketcan_native', 'pcan', 'serial'))
+
+    parser.add_argument('-p', '--port', type=int, default=20000, help='''The port to listen on''')
+
+    parser.add_argument('--host', default='', help='''The address to listen on, by default all of them''')
+
+    parser.add_argument('--tcp', action='store_true', help='''Serve over TCP rather than UDP''')
+
+    parser.add_argument('--coalesce', type=float, default=1.0,
+                        help='''Milliseconds a frame may wait for others to share its packet''')
+
+    results = parser.parse_args()
+
+    verbosity = results.verbosity
+
+    logging_level_name = ['critical', 'error', 'warning', 'info', 'debug', 'subdebug'][min(5, verbosity)]
+    can.set_logging_level(logging_level_name)
+
+    bus = can.interface.Bus(results.channel, bustype=results.interface)
+    server = NetworkServer(bus, results.port, host=results.host, protocol='tcp' if results.tcp else 'udp',
+                           coalesce_time=results.coalesce / 1000.0)
+    print("Serving {} on {}:{}".format(bus.channel_info, *server.address))
+
+    try:
+        while True:
+            time.sleep(1)
+    except KeyboardInterrupt:
+        pass
+    finally:
+        print("Missing packets from clients: {}".format(server.lost_packets))
+        server.stop()
+        bus.shutdown()
@@ -7,16 +7,40 @@ Copyright (C) 2010 Dynamic Controls
 """
 from __future__ import print_function
 
+import binascii
+import datetime
 import logging
+import mmap
+import os
+import re
+import sqlite3
+import struct
+import threading
+import time
+from collections import deque
 try:
     import queue
 except ImportError:
     import Queue as queue
 
+from can.batch import MessageBatch, batch_dtype, message_flags, numpy
+from can.util import len2dlc
+from can.message import Message, FLAG_EXTENDED_ID, FLAG_REMOTE_FRAME, FLAG_ERROR_FRAME, FLAG_FD, \
+    FLAG_BITRATE_SWITCH, FLAG_ERROR_STATE_INDICATOR
+
 
 log = logging.getLogger('can')
 log.debug("Loading python-can")
 
+#: Wait for room in a full buffer, stalling the notifying thread meanwhile
+BLOCK = 'block'
+#: Discard the oldest buffered message to make room for the new one
+DROP_OLDEST = 'drop_oldest'
+#: Discard the new message when the buffer is full
+DROP_NEWEST = 'drop_newest'
+
+OVERFLOW_POLICIES = (BLOCK, DROP_OLDEST, DROP_NEWEST)
+
 
 def set_logging_level(level_name=None):
     """Set the logging level for python-can.
@@ -50,13 +74,66 @@ class BufferedReader(Listener):
     **message buffer**: that is, when the :class:`can.BufferedReader` instance is
     notified of a new message it pushes it into a queue of messages waiting to
     be serviced.
+
+    By default the buffer grows without limit. Given a `max_size` it becomes
+    a ring buffer which discards messages according to `overflow` once full,
+    counting them in :attr:`dropped`.
+
+    :param int max_size:
+        The most messages held at once, 0 for no limit.
+    :param str overflow:
+        What to do with a new message when the buffer is full. One of
+        ``'drop_oldest'`` (the default), ``'drop_newest'``, or ``'block'``
+        which makes the notifying thread wait for room.
+    :param int high_water_mark:
+        Call `on_high_water` when the buffer fills to this many messages.
+        Defaults to `max_size`.
+    :param on_high_water:
+        Called with the reader each time the buffer reaches the high water
+        mark, after it has drained below it since the last call.
     """
 
-    def __init__(self):
-        self.buffer = queue.Queue(0)
+    def __init__(self, max_size=0, overflow=DROP_OLDEST, high_water_mark=None, on_high_water=None):
+        if overflow not in OVERFLOW_POLICIES:
+            raise ValueError("overflow must be one of {}, not {!r}".format(OVERFLOW_POLICIES, overflow))
+        self._buffer = deque()
+        #: A :class:`queue.Queue` like view of the buffered messages, for
+        #: code written against earlier versions
+        self.buffer = _QueueView(self)
+        self.max_size = max_size
+        self.overflow = overflow
+        self.high_water_mark = high_water_mark or max_size or None
+        self.on_high_water = on_high_water
+        #: Number of messages discarded because the buffer was full
+        self.dropped = 0
+        self._above_high_water = False
+        self._stopped = False
+        self._condition = threading.Condition()
 
     def on_message_received(self, msg):
-        self.buffer.put(msg)
+        buffer = self._buffer
+        high_water = False
+        with self._condition:
+            if self._stopped:
+                return
+            if self.max_size and len(buffer) >= self.max_size:
+                if self.overflow == DROP_NEWEST:
+                    self.dropped += 1
+                    return
+                elif self.overflow == DROP_OLDEST:
+                    buffer.popleft()
+                    self.dropped += 1
+                else:
+                    while len(buffer) >= self.max_size and not self._stopped:
+                        self._condition.wait()
+                    if self._stopped:
+                        return
+            buffer.append(msg)
+            if self.high_water_mark and len(buffer) >= self.high_water_mark and not self._above_high_water:
+                self._above_high_water = high_water = True
+            self._condition.notify_all()
+        if high_water and self.on_high_water is not None:
+            self.on_high_water(self)
 
     def get_message(self, timeout=0.5):
         """
@@ -64,10 +141,83 @@ class BufferedReader(Listener):
         available it blocks for 0.5 seconds or until a message is received (whichever
         is shorter), and returns the message if there is one, or None if there is not.
         """
-        try:
-            return self.buffer.get(block=True, timeout=timeout)
-        except queue.Empty:
-            return None
+        messages = self.get_messages(1, timeout)
+        if messages:
+            return messages[0]
+        return None
+
+    def get_messages(self, max_count=None, timeout=0.5):
+        """
+        Waits like :meth:`get_message` for at least one message, then removes
+        and returns up to `max_count` buffered messages in one go.
+
+        :param int max_count: The most messages to return, None for all.
+        :param float timeout: Seconds to wait, None to wait indefinitely.
+        :return: A list of messages, empty on timeout.
+        """
+        buffer = self._buffer
+        with self._condition:
+            if not buffer and not self._stopped:
+                if timeout is None:
+                    while not buffer and not self._stopped:
+                        self._condition.wait()
+                else:
+                    end_time = time.time() + timeout
+                    remaining = timeout
+                    while not buffer and not self._stopped and remaining > 0:
+                        self._condition.wait(remaining)
+                        remaining = end_time - time.time()
+            count = len(buffer) if max_count is None else min(max_count, len(buffer))
+            messages = [buffer.popleft() for _ in range(count)]
+            if count:
+                if self.high_water_mark and len(buffer) < self.high_water_mark:
+                    self._above_high_water = False
+                self._condition.notify_all()
+        return messages
+
+    def __len__(self):
+        return len(self._buffer)
+
+    def stop(self):
+        """Stop accepting messages and wake up any waiting threads.
+        Messages already buffered can still be retrieved, after which the
+        get methods return immediately.
+        """
+        with self._condition:
+            self._stopped = True
+            self._condition.notify_all()
+
+
+class _QueueView(object):
+    """The parts of the :class:`queue.Queue` interface that
+    :attr:`BufferedReader.buffer` used to provide."""
+
+    def __init__(self, reader):
+        self._reader = reader
+
+    def get(self, block=True, timeout=None):
+        messages = self._reader.get_messages(1, timeout if block else 0)
+        if not messages:
+            raise queue.Empty()
+        return messages[0]
+
+    def get_nowait(self):
+        return self.get(False)
+
+    def put(self, msg, block=True, timeout=None):
+        self._reader.on_message_received(msg)
+
+    def put_nowait(self, msg):
+        self.put(msg, False)
+
+    def qsize(self):
+        return len(self._reader)
+
+    def empty(self):
+        return not len(self._reader)
+
+    def full(self):
+        return bool(self._reader.max_size) and len(self._reader) >= self._reader.max_size
 
 
 class Printer(Listener):
@@ -100,39 +250,953 @@ class Printer(Listener):
 class CSVWriter(Listener):
 
     """Writes a comma separated text file of
-    timestamp, arbitrationid, flags, dlc, data
+    timestamp, arbitration_id, flags, dlc, data
     for each messages received.
+
+    Arbitration ids are written as fixed width hex, 8 digits for extended
+    ids and 3 for standard ids, flags as the ``FLAG_*`` bits from
+    :mod:`can.message` and data as a hex string::
+
+        timestamp,arbitration_id,flags,dlc,data
+        1437436.437851,0x0CF00400,1,8,FF7D7DE80F00037D
+        1437436.440132,0x123,0,2,0102
+
+    By default every row is written as it arrives. With `buffer_rows` set
+    rows are collected and formatted together, then written out once that
+    many are waiting or the oldest is `flush_interval` seconds old. The
+    interval is checked as messages arrive; call :meth:`flush` or
+    :meth:`stop` to write out rows when the bus goes quiet.
+
+    :param str filename: The file to write.
+    :param int buffer_rows: Rows to collect before writing, 0 to write each row at once.
+    :param float flush_interval: The longest a buffered row waits to be written.
     """
 
-    def __init__(self, filename):
+    def __init__(self, filename, buffer_rows=0, flush_interval=1.0):
         self.csv_file = open(filename, 'wt')
+        self.buffer_rows = buffer_rows
+        self.flush_interval = flush_interval
+        self._rows = []
+        self._first_row_time = None
 
         # Write a header row
-        self.csv_file.write("timestamp, arbitrationid, flags, dlc, data")
+        self.csv_file.write("timestamp,arbitration_id,flags,dlc,data\n")
 
     def on_message_received(self, msg):
-        row = ','.join([msg.timestamp,
-                        msg.arbitration_id,
-                        msg.flags,
-                        msg.dlc,
-                        msg.data])
-        self.csv_file.write(row + '\n')
+        if not self.buffer_rows:
+            self.csv_file.write(_csv_rows((msg,)))
+            return
+        rows = self._rows
+        if not rows:
+            self._first_row_time = time.time()
+        rows.append(msg)
+        if len(rows) >= self.buffer_rows or time.time() - self._first_row_time >= self.flush_interval:
+            self.flush()
+
+    def flush(self):
+        """Write out any buffered rows."""
+        if self._rows:
+            self.csv_file.write(_csv_rows(self._rows))
+            self._rows = []
+        self.csv_file.flush()
+
+    def stop(self):
+        """Write out any buffered rows and close the file."""
+        if not self.csv_file.closed:
+            self.flush()
+            self.csv_file.close()
 
     def __del__(self):
-        self.csv_file.close()
-        super(CSVWriter, self).__del__()
+        self.stop()
+
+
+def _csv_rows(messages):
+    """Format messages as CSV rows, with the flag packing inlined as this
+    is the hot loop of the writer.
+    """
+    hexlify = binascii.hexlify
+    rows = []
+    append = rows.append
+    for msg in messages:
+        if msg.id_type:
+            flags = FLAG_EXTENDED_ID
+            arbitration_id = "0x%08X" % msg.arbitration_id
+        else:
+            flags = 0
+            arbitration_id = "0x%03X" % msg.arbitration_id
+        if msg.is_remote_frame:
+            flags |= FLAG_REMOTE_FRAME
+        if msg.is_error_frame:
+            flags |= FLAG_ERROR_FRAME
+        if msg.is_fd:
+            flags |= FLAG_FD
+            if msg.bitrate_switch:
+                flags |= FLAG_BITRATE_SWITCH
+            if msg.error_state_indicator:
+                flags |= FLAG_ERROR_STATE_INDICATOR
+        append("%.6f,%s,%d,%d,%s\n" % (msg.timestamp,
+                                        arbitration_id,
+                                        flags,
+                                        msg.dlc,
+                                        hexlify(msg.data).decode('ascii').upper()))
+    return "".join(rows)
 
 
 class SqliteWriter(Listener):
 
-    """TODO"""
+    """Logs received messages to a SQLite database.
+
+    Messages are buffered and inserted by a background thread with
+    ``executemany``, one transaction per batch. A batch is written once
+    `batch_size` messages are waiting or the oldest has waited `max_delay`
+    seconds. The database uses write ahead logging, so it can be queried
+    while a capture is running.
+
+    The table has the columns ``ts``, ``arbitration_id``, ``flags`` (the
+    ``FLAG_*`` bits from :mod:`can.message`), ``dlc`` and ``data`` and is
+    indexed on ``(arbitration_id, ts)``::
+
+        SELECT ts, data FROM messages WHERE arbitration_id = 0x0CF00400 AND ts > ?
+
+    If writing fails the error is logged, further messages are discarded
+    and :meth:`stop` raises it.
+
+    :param str filename: The database file, created if it doesn't exist.
+    :param str table_name: The table to append messages to.
+    :param int batch_size: The most messages inserted per transaction.
+    :param float max_delay: The longest a message waits to be written.
+    """
+
+    def __init__(self, filename, table_name="messages", batch_size=1000, max_delay=0.5):
+        self.filename = filename
+        self.table_name = table_name
+        self.batch_size = batch_size
+        self.max_delay = max_delay
+        #: Number of messages written to the database so far
+        self.written = 0
+
+        self._buffer = BufferedReader()
+        self._ready = threading.Event()
+        self._error = None
+        self._writer = threading.Thread(target=self._write_thread)
+        self._writer.daemon = True
+        self._writer.start()
+
+        # Report problems opening the database to the caller
+        self._ready.wait()
+        if self._error is not None:
+            raise self._error
+
+    def _connect(self):
+        db = sqlite3.connect(self.filename)
+        db.execute("PRAGMA journal_mode=WAL")
+        db.execute("PRAGMA synchronous=NORMAL")
+        db.execute("""
+            CREATE TABLE IF NOT EXISTS {0} (
+                ts REAL,
+                arbitration_id INTEGER,
+                flags INTEGER,
+                dlc INTEGER,
+                data BLOB
+            )""".format(self.table_name))
+        db.execute("CREATE INDEX IF NOT EXISTS {0}_id_ts ON {0} (arbitration_id, ts)".format(self.table_name))
+        db.commit()
+        return db
+
+    def _write_thread(self):
+        try:
+            db = self._connect()
+        except Exception as error:
+            self._error = error
+            self._ready.set()
+            return
+        self._ready.set()
+
+        insert = "INSERT INTO {} VALUES (?, ?, ?, ?, ?)".format(self.table_name)
+        buffer = self._buffer
+        try:
+            while True:
+                messages = buffer.get_messages(self.batch_size, timeout=None)
+                if not messages:
+                    # Stopped and drained
+                    break
+                # Give a small batch until max_delay to fill up
+                end_time = time.time() + self.max_delay
+                while len(messages) < self.batch_size:
+                    remaining = end_time - time.time()
+                    if remaining <= 0:
+                        break
+                    more = buffer.get_messages(self.batch_size - len(messages), remaining)
+                    if not more:
+                        break
+                    messages.extend(more)
+
+                try:
+                    db.executemany(insert, [(msg.timestamp,
+                                             msg.arbitration_id,
+                                             message_flags(msg),
+                                             msg.dlc,
+                                             sqlite3.Binary(bytes(msg.data))) for msg in messages])
+                    db.commit()
+                except Exception as error:
+                    log.exception("Writing to %s failed, no more messages will be logged", self.filename)
+                    self._error = error
+                    # Don't let messages pile up with nothing to write them
+                    buffer.stop()
+                    break
+                self.written += len(messages)
+        finally:
+            db.close()
+
+    def on_message_received(self, msg):
+        self._buffer.on_message_received(msg)
+
+    def stop(self, timeout=None):
+        """Write any buffered messages and close the database.
+
+        :raises Exception: The error which stopped messages from being written.
+        """
+        self._buffer.stop()
+        self._writer.join(timeout)
+        if self._error is not None:
+            raise self._error
+
+
+#: First bytes of a binary log file
+BINARY_MAGIC = b'PYCANLOG'
+BINARY_VERSION = 1
+
+# magic, version, payload size, reserved
+_binary_header = struct.Struct('<8sHH4x')
+
+
+def _binary_record(payload_size):
+    """The packed layout of one record, the same as :func:`can.batch.batch_dtype`."""
+    return struct.Struct('<dIBB{}s'.format(payload_size))
+
+
+def _record_to_message(timestamp, arbitration_id, flags, dlc, data):
+    """Build a :class:`~can.Message` from the fields of a binary record."""
+    is_remote_frame = bool(flags & FLAG_REMOTE_FRAME)
+    return Message(timestamp=timestamp,
+                   arbitration_id=arbitration_id,
+                   extended_id=bool(flags & FLAG_EXTENDED_ID),
+                   is_remote_frame=is_remote_frame,
+                   is_error_frame=bool(flags & FLAG_ERROR_FRAME),
+                   dlc=dlc,
+                   data=b'' if is_remote_frame else data[:dlc],
+                   is_fd=bool(flags & FLAG_FD),
+                   bitrate_switch=bool(flags & FLAG_BITRATE_SWITCH),
+                   error_state_indicator=bool(flags & FLAG_ERROR_STATE_INDICATOR))
+
+
+class BinaryWriter(Listener):
+
+    """Logs messages to a compact binary file of fixed size records.
+
+    The file starts with a 16 byte header followed by one record per
+    message, laid out like a row of a :class:`~can.MessageBatch`::
+
+        float64 timestamp, uint32 arbitration_id, uint8 flags, uint8 dlc,
+        uint8[8] data (uint8[64] for CAN FD), all little endian and unpadded
+
+    That is 22 bytes per classic frame. Records are packed as they arrive
+    and written out together every `buffer_rows` messages. Frames with more
+    data than `payload_size` are skipped with a warning and counted in
+    :attr:`skipped`.
+
+    :param str filename: The file to write, replaced if it exists.
+    :param int payload_size: 8, or 64 to store CAN FD frames.
+    :param int buffer_rows: Records to collect before writing.
+    """
+
+    def __init__(self, filename, payload_size=8, buffer_rows=1000):
+        if payload_size not in (8, 64):
+            raise ValueError("payload_size must be 8 or 64, not {}".format(payload_size))
+        self.payload_size = payload_size
+        self.buffer_rows = buffer_rows
+        self._pack = _binary_record(payload_size).pack
+        self._records = []
+        #: Number of frames not logged because their data didn't fit a record
+        self.skipped = 0
+        self.log_file = open(filename, 'wb')
+        self.log_file.write(_binary_header.pack(BINARY_MAGIC, BINARY_VERSION, payload_size))
+
+    def on_message_received(self, msg):
+        if len(msg.data) > self.payload_size:
+            # Raising would stop the notifier feeding this and every other listener
+            if not self.skipped:
+                log.warning("Skipping frames with more than %d data bytes, such as 0x%x with %d",
+                            self.payload_size, msg.arbitration_id, len(msg.data))
+            self.skipped += 1
+            return
+        self._records.append(self._pack(msg.timestamp, msg.arbitration_id, message_flags(msg),
+                                        msg.dlc, bytes(msg.data)))
+        if len(self._records) >= self.buffer_rows:
+            self.flush()
+
+    def flush(self):
+        """Write out any buffered records."""
+        if self._records:
+            self.log_file.write(b''.join(self._records))
+            self._records = []
+        self.log_file.flush()
+
+    def stop(self):
+        """Write out any buffered records and close the file."""
+        if not self.log_file.closed:
+            self.flush()
+            self.log_file.close()
+
+    def __del__(self):
+        self.stop()
+
+
+class BinaryReader(object):
+
+    """Reads a file written by :class:`BinaryWriter`.
+
+    The file is memory mapped rather than read, so opening it is
+    instantaneous whatever its size. Records can be viewed as a NumPy
+    structured array without copying, or converted to
+    :class:`~can.Message` objects one at a time as they are needed::
+
+        >>> log = BinaryReader('capture.bin')
+        >>> len(log)
+        >>> log[-1].timestamp
+        >>> engine = log.batch().filter([{"can_id": 0x0CF00400, "can_mask": 0x1FFFFFFF}])
+
+    A partially written final record, as found in a file still being
+    logged to, is ignored.
+    """
+
+    def __init__(self, filename):
+        self.log_file = open(filename, 'rb')
+        self._map = mmap.mmap(self.log_file.fileno(), 0, access=mmap.ACCESS_READ)
+        if len(self._map) < _binary_header.size:
+            raise ValueError("{} is too short to be a binary log".format(filename))
+        magic, version, payload_size = _binary_header.unpack_from(self._map)
+        if magic != BINARY_MAGIC:
+            raise ValueError("{} is not a binary log".format(filename))
+        if version != BINARY_VERSION:
+            raise ValueError("Unsupported binary log version {}".format(version))
+        self.payload_size = payload_size
+        self._record = _binary_record(payload_size)
+
+    def __len__(self):
+        return (len(self._map) - _binary_header.size) // self._record.size
+
+    def _message(self, index):
+        return _record_to_message(*self._record.unpack_from(
+            self._map, _binary_header.size + index * self._record.size))
+
+    def __getitem__(self, index):
+        count = len(self)
+        if index < 0:
+            index += count
+        if not 0 <= index < count:
+            raise IndexError("record index out of range")
+        return self._message(index)
+
+    def __iter__(self):
+        for index in range(len(self)):
+            yield self._message(index)
+
+    def array(self):
+        """Return the records as a NumPy structured array (see
+        :func:`can.batch.batch_dtype`) backed directly by the mapped file.
+        """
+        return numpy.frombuffer(self._map, dtype=batch_dtype(self.payload_size),
+                                count=len(self), offset=_binary_header.size)
+
+    def batch(self):
+        """Return the records as a :class:`~can.MessageBatch`, without copying."""
+        return MessageBatch(array=self.array())
+
+    def close(self):
+        try:
+            self._map.close()
+        except BufferError:
+            # Arrays returned by array() still use the mapping, it is
+            # released once they have been garbage collected.
+            pass
+        self.log_file.close()
+
+
+# One line of a candump -l log, e.g.
+#   (1436509052.249713) vcan0 12345678#0102030405060708
+#   (1436509052.249713) vcan0 123#R
+#   (1436509052.249713) vcan0 123##1AABBCCDDEEFF0011
+_canutils_line = re.compile(r"""
+    \((?P<timestamp>\d+\.\d+)\)\s+
+    (?P<channel>\S+)\s+
+    (?P<can_id>[0-9A-Fa-f]{1,8})\#
+    (?:\#(?P<fd_flags>[0-9A-Fa-f]))?
+    (?:(?P<remote>R)(?P<remote_dlc>\d)?|(?P<data>(?:[0-9A-Fa-f]{2})*))
+    \s*$
+""", re.VERBOSE)
+
+# Error frames carry CAN_ERR_FLAG in the id written to the log
+_CANUTILS_ERROR_FLAG = 0x20000000
+_CANUTILS_BRS = 0x01
+_CANUTILS_ESI = 0x02
+
+
+class CanutilsLogReader(object):
+
+    """Reads a log written by ``candump -l`` (or :class:`CanutilsLogWriter`)
+    one line at a time, so the size of the log doesn't matter.
+
+    Each message's :attr:`~can.Message.channel` is the interface name from
+    the log. Lines which can't be parsed are skipped with a warning.
+
+        >>> for msg in CanutilsLogReader('candump-2015-07-10_075732.log'):
+        ...     print(msg)
+    """
+
+    def __init__(self, filename):
+        self.filename = filename
+
+    def __iter__(self):
+        match = _canutils_line.match
+        unhexlify = binascii.unhexlify
+        with open(self.filename, 'r') as log_file:
+            for line_number, line in enumerate(log_file, 1):
+                fields = match(line)
+                if fields is None:
+                    if line.strip():
+                        log.warning("Skipping line %d of %s: %r", line_number, self.filename, line)
+                    continue
+
+                can_id = int(fields.group('can_id'), 16)
+                is_error_frame = bool(can_id & _CANUTILS_ERROR_FLAG)
+                fd_flags = fields.group('fd_flags')
+                if fields.group('remote'):
+                    data = bytearray()
+                    dlc = int(fields.group('remote_dlc') or 0)
+                else:
+                    data = bytearray(unhexlify(fields.group('data')))
+                    dlc = None
+                if fd_flags is not None:
+                    fd_flags = int(fd_flags, 16)
+
+                try:
+                    msg = Message(timestamp=float(fields.group('timestamp')),
+                                  arbitration_id=can_id & 0x1FFFFFFF,
+                                  extended_id=len(fields.group('can_id')) > 3 and not is_error_frame,
+                                  is_remote_frame=dlc is not None,
+                                  is_error_frame=is_error_frame,
+                                  dlc=dlc,
+                                  data=data,
+                                  is_fd=fd_flags is not None,
+                                  bitrate_switch=bool(fd_flags and fd_flags & _CANUTILS_BRS),
+                                  error_state_indicator=bool(fd_flags and fd_flags & _CANUTILS_ESI),
+                                  channel=fields.group('channel'))
+                except ValueError:
+                    # Such as more data than the frame type can carry
+                    log.warning("Skipping line %d of %s: %r", line_number, self.filename, line)
+                    continue
+                yield msg
+
+
+class CanutilsLogWriter(Listener):
+
+    """Logs messages in the ``candump -l`` format read by ``canplayer``
+    and :class:`CanutilsLogReader`::
+
+        (1436509052.249713) vcan0 12345678#0102030405060708
+
+    :param str filename: The file to write.
+    :param str channel:
+        The interface name written for messages whose
+        :attr:`~can.Message.channel` isn't set.
+    """
+
+    def __init__(self, filename, channel='vcan0'):
+        self.channel = channel
+        self.log_file = open(filename, 'w')
+
+    def on_message_received(self, msg):
+        channel = msg.channel if msg.channel is not None else self.channel
+        if msg.is_error_frame:
+            can_id = "%08X" % (msg.arbitration_id | _CANUTILS_ERROR_FLAG)
+        elif msg.id_type:
+            can_id = "%08X" % msg.arbitration_id
+        else:
+            can_id = "%03X" % msg.arbitration_id
+
+        if msg.is_remote_frame:
+            payload = "R%d" % msg.dlc if msg.dlc else "R"
+        elif msg.is_fd:
+            fd_flags = 0
+            if msg.bitrate_switch:
+                fd_flags |= _CANUTILS_BRS
+            if msg.error_state_indicator:
+                fd_flags |= _CANUTILS_ESI
+            payload = "#%X%s" % (fd_flags, binascii.hexlify(msg.data).decode('ascii').upper())
+        else:
+            payload = binascii.hexlify(msg.data).decode('ascii').upper()
+
+        self.log_file.write("(%.6f) %s %s#%s\n" % (msg.timestamp, channel, can_id, payload))
+
+    def stop(self):
+        """Close the log file."""
+        if not self.log_file.closed:
+            self.log_file.close()
+
+    def __del__(self):
+        self.stop()
+
+
+# Vector ASC flag bits for CAN FD frames
+_ASC_FD_FLAG = 0x1000
+_ASC_BRS_FLAG = 0x2000
+_ASC_ESI_FLAG = 0x4000
+
+_ASC_DATE_FORMAT = "%a %b %d %I:%M:%S.%f %p %Y"
+
+
+class ASCReader(object):
+
+    """Reads a Vector ASCII (``.asc``) trace one line at a time.
+
+    Both ``timestamps absolute`` and ``timestamps relative`` traces are
+    supported, as are ``base hex`` and ``base dec``. Message timestamps are
+    seconds since the start of the measurement, which is available as
+    :attr:`start_time` when the trace's date line could be parsed. Each
+    message's :attr:`~can.Message.channel` is the trace's channel number.
+
+    Lines other than classic frames, CAN FD frames and error frames, such
+    as statistics and comments, are skipped.
+
+        >>> for msg in ASCReader('trace.asc'):
+        ...     print(msg)
+    """
 
     def __init__(self, filename):
-        self.db_file = open(filename, 'wt')
+        self.filename = filename
+        #: The start of the measurement as a Unix timestamp, or None
+        self.start_time = None
+
+    def __iter__(self):
+        base = 16
+        relative = False
+        elapsed = 0.0
+        with open(self.filename, 'r') as log_file:
+            for line in log_file:
+                tokens = line.split()
+                if not tokens:
+                    continue
+                try:
+                    timestamp = float(tokens[0])
+                except ValueError:
+                    # Header lines
+                    keyword = tokens[0].lower()
+                    if keyword == 'date':
+                        self.start_time = _parse_asc_date(" ".join(tokens[1:]))
+                    elif keyword == 'base' and len(tokens) >= 4:
+                        base = 10 if tokens[1].lower() == 'dec' else 16
+                        relative = tokens[3].lower() == 'relative'
+                    continue
+
+                if relative:
+                    elapsed += timestamp
+                    timestamp = elapsed
+                if len(tokens) < 3:
+                    continue
+                try:
+                    if tokens[1] == 'CANFD':
+                        msg = _asc_fd_message(timestamp, tokens, base)
+                    elif tokens[2] == 'ErrorFrame':
+                        msg = Message(timestamp=timestamp, is_error_frame=True,
+                                      extended_id=False, channel=int(tokens[1]))
+                    elif len(tokens) >= 5 and tokens[3] in ('Rx', 'Tx'):
+                        msg = _asc_message(timestamp, tokens, base)
+                    else:
+                        continue
+                except ValueError:
+                    log.warning("Skipping line of %s: %r", self.filename, line)
+                    continue
+                yield msg
+
+
+def _parse_asc_date(text):
+    try:
+        return time.mktime(datetime.datetime.strptime(text, _ASC_DATE_FORMAT).timetuple())
+    except ValueError:
+        log.debug("Couldn't parse the trace start date %r", text)
+        return None
+
+
+def _asc_arbitration_id(text, base):
+    if text[-1] in 'xX':
+        return int(text[:-1], base), True
+    return int(text, base), False
+
+
+def _asc_message(timestamp, tokens, base):
+    # <time> <channel> <id>[x] <dir> d <dlc> <data bytes> ...
+    # <time> <channel> <id>[x] <dir> r [<dlc>]
+    arbitration_id, extended_id = _asc_arbitration_id(tokens[2], base)
+    if tokens[4] == 'r':
+        dlc = int(tokens[5], 16) if len(tokens) > 5 and len(tokens[5]) == 1 else 0
+        return Message(timestamp=timestamp, arbitration_id=arbitration_id, extended_id=extended_id,
+                       is_remote_frame=True, dlc=dlc, channel=int(tokens[1]))
+    dlc = int(tokens[5], 16)
+    data = bytearray(int(byte, base) for byte in tokens[6:6 + dlc])
+    return Message(timestamp=timestamp, arbitration_id=arbitration_id, extended_id=extended_id,
+                   dlc=dlc, data=data, channel=int(tokens[1]))
+
+
+def _asc_fd_message(timestamp, tokens, base):
+    # <time> CANFD <channel> <dir> <id>[x] [<symbolic name>] <brs> <esi> <dlc> <length> <data bytes> ...
+    channel = int(tokens[2])
+    arbitration_id, extended_id = _asc_arbitration_id(tokens[4], base)
+    fields = tokens[5:]
+    if fields[0] not in ('0', '1'):
+        fields = fields[1:]
+    length = int(fields[3])
+    data = bytearray(int(byte, base) for byte in fields[4:4 + length])
+    return Message(timestamp=timestamp, arbitration_id=arbitration_id, extended_id=extended_id,
+                   data=data, is_fd=True, bitrate_switch=fields[0] == '1',
+                   error_state_indicator=fields[1] == '1', channel=channel)
 
-        # create table structure
-        raise NotImplementedError("TODO")
+
+class ASCWriter(Listener):
+
+    """Logs messages as a Vector ASCII (``.asc``) trace with absolute
+    timestamps, measured from the first message.
+
+    :param str filename: The file to write.
+    :param int channel:
+        The channel number written for messages whose
+        :attr:`~can.Message.channel` isn't an int.
+    """
+
+    def __init__(self, filename, channel=1):
+        self.channel = channel
+        self.log_file = open(filename, 'w')
+        self._start = None
+
+    def _write_header(self, start):
+        self._start = start
+        date = datetime.datetime.fromtimestamp(start)
+        date = "%s.%03d %s" % (date.strftime("%a %b %d %I:%M:%S"), date.microsecond // 1000,
+                               date.strftime("%p %Y").lower())
+        self.log_file.write("date {}\n"
+                            "base hex  timestamps absolute\n"
+                            "internal events logged\n"
+                            "Begin Triggerblock {}\n"
+                            "{:>11.6f} Start of measurement\n".format(date, date, 0))
 
     def on_message_received(self, msg):
-        # add row
-        raise NotImplementedError("TODO")
+        if self._start is None:
+            self._write_header(msg.timestamp)
+        timestamp = msg.timestamp - self._start
+        channel = msg.channel if isinstance(msg.channel, int) else self.channel
+
+        if msg.is_error_frame:
+            self.log_file.write("{:>11.6f} {:<2d} ErrorFrame\n".format(timestamp, channel))
+            return
+
+        arbitration_id = "%X" % msg.arbitration_id
+        if msg.id_type:
+            arbitration_id += "x"
+        data = " ".join("%02X" % byte for byte in bytearray(msg.data))
+
+        if msg.is_fd:
+            flags = _ASC_FD_FLAG
+            if msg.bitrate_switch:
+                flags |= _ASC_BRS_FLAG
+            if msg.error_state_indicator:
+                flags |= _ASC_ESI_FLAG
+            self.log_file.write("{:>11.6f} CANFD {:>3d} Rx {:>11}  {:d} {:d} {:x} {:>2d} {} {:>8d} {:>4d} {:>8X} "
+                                "0 0 0 0 0\n".format(timestamp, channel, arbitration_id,
+                                                     msg.bitrate_switch, msg.error_state_indicator,
+                                                     len2dlc(len(msg.data)), len(msg.data), data,
+                                                     0, 0, flags))
+        elif msg.is_remote_frame:
+            self.log_file.write("{:>11.6f} {:<2d} {:<15} Rx   r {:X}\n".format(
+                timestamp, channel, arbitration_id, msg.dlc))
+        else:
+            self.log_file.write("{:>11.6f} {:<2d} {:<15} Rx   d {:X} {}\n".format(
+                timestamp, channel, arbitration_id, msg.dlc, data))
+
+    def stop(self):
+        """Finish the trace and close the file."""
+        if self.log_file.closed:
+            return
+        if self._start is None:
+            self._write_header(time.time())
+        self.log_file.write("End TriggerBlock\n")
+        self.log_file.close()
+
+    def __del__(self):
+        self.stop()
+
+
+#: pcapng link type for SocketCAN frames, see https://www.tcpdump.org/linktypes.html
+LINKTYPE_CAN_SOCKETCAN = 227
+
+_PCAPNG_SECTION_HEADER = 0x0A0D0D0A
+_PCAPNG_INTERFACE_DESCRIPTION = 0x00000001
+_PCAPNG_ENHANCED_PACKET = 0x00000006
+_PCAPNG_BYTE_ORDER_MAGIC = 0x1A2B3C4D
+_PCAPNG_OPT_END = 0
+_PCAPNG_IF_NAME = 2
+_PCAPNG_IF_TSRESOL = 9
+
+# SocketCAN flags found in the can_id and the FD flags byte
+_SOCKETCAN_EFF_FLAG = 0x80000000
+_SOCKETCAN_RTR_FLAG = 0x40000000
+_SOCKETCAN_ERR_FLAG = 0x20000000
+_SOCKETCAN_BRS = 0x01
+_SOCKETCAN_ESI = 0x02
+_SOCKETCAN_FDF = 0x04
+
+# can_id (big endian as on the wire), length, FD flags, 2 reserved bytes
+_socketcan_header = struct.Struct('>IBB2x')
+
+
+def _pcapng_option(code, value):
+    padding = b'\x00' * (-len(value) % 4)
+    return struct.pack('<HH', code, len(value)) + value + padding
+
+
+def _pcapng_block(block_type, body):
+    length = 12 + len(body)
+    return struct.pack('<II', block_type, length) + body + struct.pack('<I', length)
+
+
+class PcapngWriter(Listener):
+
+    """Logs messages to a pcapng capture using the ``LINKTYPE_CAN_SOCKETCAN``
+    link type, which Wireshark dissects as SocketCAN frames.
+
+    Each distinct :attr:`~can.Message.channel` gets its own interface in
+    the capture, named after the channel. Blocks are built as messages
+    arrive and written out together every `buffer_rows` messages.
+
+    :param str filename: The file to write.
+    :param str channel:
+        The interface name used for messages without a channel.
+    :param int buffer_rows: Packets to collect before writing.
+    """
+
+    def __init__(self, filename, channel='can0', buffer_rows=1000):
+        self.channel = channel
+        self.buffer_rows = buffer_rows
+        self._interfaces = {}
+        self._blocks = []
+        self._packets = 0
+        self.log_file = open(filename, 'wb')
+        self.log_file.write(_pcapng_block(_PCAPNG_SECTION_HEADER, struct.pack(
+            '<IHHq', _PCAPNG_BYTE_ORDER_MAGIC, 1, 0, -1)))
+
+    def _interface(self, channel):
+        """Return the interface id for `channel`, describing it first if new."""
+        try:
+            return self._interfaces[channel]
+        except KeyError:
+            pass
+        interface_id = self._interfaces[channel] = len(self._interfaces)
+        options = (_pcapng_option(_PCAPNG_IF_NAME, str(channel).encode('utf-8')) +
+                   _pcapng_option(_PCAPNG_IF_TSRESOL, b'\x06') +
+                   _pcapng_option(_PCAPNG_OPT_END, b''))
+        self._blocks.append(_pcapng_block(_PCAPNG_INTERFACE_DESCRIPTION, struct.pack(
+            '<HHI', LINKTYPE_CAN_SOCKETCAN, 0, 0) + options))
+        return interface_id
+
+    def on_message_received(self, msg):
+        channel = msg.channel if msg.channel is not None else self.channel
+        interface_id = self._interface(channel)
+
+        can_id = msg.arbitration_id
+        if msg.id_type:
+            can_id |= _SOCKETCAN_EFF_FLAG
+        if msg.is_remote_frame:
+            can_id |= _SOCKETCAN_RTR_FLAG
+        if msg.is_error_frame:
+            can_id |= _SOCKETCAN_ERR_FLAG
+        if msg.is_fd:
+            flags = _SOCKETCAN_FDF
+            if msg.bitrate_switch:
+                flags |= _SOCKETCAN_BRS
+            if msg.error_state_indicator:
+                flags |= _SOCKETCAN_ESI
+            length = len(msg.data)
+            payload_size = 64
+        else:
+            flags = 0
+            length = msg.dlc
+            payload_size = 8
+        # Pad to the size of a struct can_frame or canfd_frame, as in a
+        # capture from a SocketCAN interface. Both are a multiple of 4 bytes
+        # so the block needs no further padding.
+        packet = _socketcan_header.pack(can_id, length, flags) + bytes(msg.data).ljust(payload_size, b'\x00')
+
+        timestamp = int(round(msg.timestamp * 1000000))
+        self._blocks.append(_pcapng_block(_PCAPNG_ENHANCED_PACKET, struct.pack(
+            '<IIIII', interface_id, timestamp >> 32, timestamp & 0xFFFFFFFF, len(packet), len(packet)) +
+            packet))
+        self._packets += 1
+        if self._packets >= self.buffer_rows:
+            self.flush()
+
+    def flush(self):
+        """Write out any buffered blocks."""
+        if self._blocks:
+            self.log_file.write(b''.join(self._blocks))
+            self._blocks = []
+            self._packets = 0
+        self.log_file.flush()
+
+    def stop(self):
+        """Write out any buffered blocks and close the file."""
+        if not self.log_file.closed:
+            self.flush()
+            self.log_file.close()
+
+    def __del__(self):
+        self.stop()
+
+
+class PcapngReader(object):
+
+    """Reads the SocketCAN packets of a pcapng capture one block at a time,
+    so captures of any size can be filtered or replayed.
+
+    Packets on interfaces with other link types are skipped, malformed
+    packets are skipped with a warning. Each message's
+    :attr:`~can.Message.channel` is the name of its interface, or its
+    index if the capture doesn't name it.
+
+        >>> for msg in PcapngReader('capture.pcapng'):
+        ...     print(msg)
+    """
+
+    def __init__(self, filename):
+        self.filename = filename
+
+    def __iter__(self):
+        with open(self.filename, 'rb') as capture:
+            endian = '<'
+            # (link type, seconds per timestamp unit, name) for each interface
+            interfaces = []
+            block_number = 0
+            while True:
+                block_number += 1
+                header = capture.read(8)
+                if len(header) < 8:
+                    return
+                block_type, length = struct.unpack(endian + 'II', header)
+                if block_type == _PCAPNG_SECTION_HEADER:
+                    magic = capture.read(4)
+                    endian = '<' if struct.unpack('<I', magic)[0] == _PCAPNG_BYTE_ORDER_MAGIC else '>'
+                    length = struct.unpack(endian + 'I', header[4:])[0]
+                    capture.seek(length - 12, 1)
+                    interfaces = []
+                    continue
+
+                body = capture.read(length - 8)
+                if len(body) < length - 8:
+                    log.warning("%s ends with a truncated block", self.filename)
+                    return
+
+                if block_type == _PCAPNG_INTERFACE_DESCRIPTION:
+                    interfaces.append(_pcapng_interface(body, endian, len(interfaces)))
+                elif block_type == _PCAPNG_ENHANCED_PACKET:
+                    interface_id, high, low, captured = struct.unpack_from(endian + 'IIII', body)
+                    link_type, resolution, name = interfaces[interface_id]
+                    if link_type != LINKTYPE_CAN_SOCKETCAN:
+                        continue
+                    timestamp = ((high << 32) | low) * resolution
+                    msg = _socketcan_packet_to_message(body[20:20 + captured], timestamp, name)
+                    if msg is None:
+                        log.warning("Skipping block %d of %s: not a valid SocketCAN packet",
+                                    block_number, self.filename)
+                        continue
+                    yield msg
+
+
+def _pcapng_interface(body, endian, index):
+    link_type = struct.unpack_from(endian + 'H', body)[0]
+    resolution = 1e-6
+    name = index
+    offset = 8
+    # The body ends with the repeated block length
+    while offset + 4 <= len(body) - 4:
+        code, length = struct.unpack_from(endian + 'HH', body, offset)
+        if code == _PCAPNG_OPT_END:
+            break
+        value = body[offset + 4:offset + 4 + length]
+        if code == _PCAPNG_IF_NAME:
+            name = value.rstrip(b'\x00').decode('utf-8')
+        elif code == _PCAPNG_IF_TSRESOL:
+            exponent = bytearray(value)[0]
+            if exponent & 0x80:
+                resolution = 2.0 ** -(exponent & 0x7F)
+            else:
+                resolution = 10.0 ** -exponent
+        offset += 4 + length + (-length % 4)
+    return link_type, resolution, name
+
+
+def _socketcan_packet_to_message(packet, timestamp, channel):
+    """Return the :class:`~can.Message` in a SocketCAN packet, None if it
+    is too short or its length doesn't fit the frame type."""
+    try:
+        can_id, length, flags = _socketcan_header.unpack_from(packet)
+    except struct.error:
+        return None
+    # FD frames are marked by the FDF flag or, in older captures, by size
+    is_fd = bool(flags & _SOCKETCAN_FDF) or len(packet) == 72
+    is_remote_frame = bool(can_id & _SOCKETCAN_RTR_FLAG)
+    is_extended = bool(can_id & _SOCKETCAN_EFF_FLAG)
+    try:
+        return Message(timestamp=timestamp,
+                       arbitration_id=can_id & (0x1FFFFFFF if is_extended else 0x7FF),
+                       extended_id=is_extended,
+                       is_remote_frame=is_remote_frame,
+                       is_error_frame=bool(can_id & _SOCKETCAN_ERR_FLAG),
+                       dlc=length,
+                       data=b'' if is_remote_frame else packet[8:8 + length],
+                       is_fd=is_fd,
+                       bitrate_switch=bool(flags & _SOCKETCAN_BRS),
+                       error_state_indicator=bool(flags & _SOCKETCAN_ESI),
+                       channel=channel)
+    except ValueError:
+        return None
+
+
+class LogReader(object):
+    """
+    Opens a log file with the reader matching its extension:
+
+    ==========  ===========================
+    extension   reader
+    ==========  ===========================
+    .asc        :class:`ASCReader`
+    .log        :class:`CanutilsLogReader`
+    .bin        :class:`BinaryReader`
+    .pcapng     :class:`PcapngReader`
+    ==========  ===========================
+
+        >>> for msg in LogReader('trace.asc'):
+        ...     print(msg)
+    """
+
+    @classmethod
+    def __new__(cls, other, filename):
+        extension = os.path.splitext(filename)[1].lower()
+        if extension == '.asc':
+            cls = ASCReader
+        elif extension == '.log':
+            cls = CanutilsLogReader
+        elif extension == '.bin':
+            cls = BinaryReader
+        elif extension == '.pcapng':
+            cls = PcapngReader
+        else:
+            raise NotImplementedError("No reader for {} files".format(extension or filename))
+        return cls(filename)
@@ -9,6 +9,7 @@ Modules include:
 
 """
 import logging
+import sys
 log = logging.getLogger('can')
 
 rc = dict(channel=0)
@@ -16,9 +17,18 @@ rc = dict(channel=0)
 class CanError(IOError):
     pass
 
-from can.CAN import BufferedReader, Listener, Printer, CSVWriter, SqliteWriter, set_logging_level
+from can.CAN import BufferedReader, Listener, Printer, CSVWriter, SqliteWriter, BinaryWriter, BinaryReader, \
+    CanutilsLogReader, CanutilsLogWriter, ASCReader, ASCWriter, \
+    PcapngReader, PcapngWriter, LogReader, set_logging_level
 from can.message import Message
+from can.batch import MessageBatch
 from can.bus import BusABC
-from can.notifier import Notifier
-from can.broadcastmanager import send_periodic, CyclicSendTaskABC, MultiRateCyclicSendTaskABC
+from can.notifier import Notifier, MultiBusNotifier
+from can.player import Player
+from can.gateway import Gateway, Route
+from can.broadcastmanager import send_periodic, subscribe_changes, CyclicSendTaskABC, \
+    MultiRateCyclicSendTaskABC, ReceiveFilterTaskABC
 from can.interfaces import interface
+
+if sys.version_info >= (3, 5):
+    from can.aio import AsyncNotifier
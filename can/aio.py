@@ -0,0 +1,190 @@
+"""
+Reading a bus from an :mod:`asyncio` event loop, requires Python 3.5 or newer.
+
+Buses which provide :meth:`~can.BusABC.fileno` are watched by the event loop
+itself, so each frame is read on the loop's thread as soon as it arrives.
+Other buses are read by a helper thread which hands messages to the loop.
+"""
+import asyncio
+import logging
+import threading
+
+from can.notifier import RoutingTable
+
+log = logging.getLogger('can.aio')
+
+# How long the helper thread of an unpollable bus waits in each read, which
+# bounds how long it takes to notice that it should stop.
+_POLL_INTERVAL = 0.1
+
+try:
+    _running_loop = asyncio.get_running_loop
+except AttributeError:
+    # Before Python 3.7, where this is the running loop inside a coroutine
+    _running_loop = asyncio.get_event_loop
+
+
+def _fileno(bus):
+    try:
+        return bus.fileno()
+    except NotImplementedError:
+        return None
+
+
+async def recv_async(bus, timeout=None):
+    """Wait for a message from `bus` without blocking the event loop.
+
+    :return:
+        None on timeout or a :class:`can.Message` object.
+    """
+    loop = _running_loop()
+    fd = _fileno(bus)
+    if fd is None:
+        return await _recv_in_executor(loop, bus, timeout)
+
+    # The bus may already hold frames which won't make the fd readable
+    msg = bus.recv(timeout=0)
+    if msg is not None:
+        return msg
+
+    future = loop.create_future()
+
+    def on_readable():
+        if future.done():
+            return
+        try:
+            msg = bus.recv(timeout=0)
+        except Exception as error:
+            future.set_exception(error)
+            return
+        if msg is not None:
+            future.set_result(msg)
+
+    loop.add_reader(fd, on_readable)
+    try:
+        return await asyncio.wait_for(future, timeout)
+    except asyncio.TimeoutError:
+        return None
+    finally:
+        loop.remove_reader(fd)
+
+
+async def _recv_in_executor(loop, bus, timeout):
+    if timeout is not None:
+        return await loop.run_in_executor(None, bus.recv, timeout)
+    # Wait in short steps so a cancelled wait doesn't leave a thread
+    # blocked in recv forever.
+    while True:
+        msg = await loop.run_in_executor(None, bus.recv, _POLL_INTERVAL)
+        if msg is not None:
+            return msg
+
+
+class AsyncNotifier(object):
+    """Distributes messages from a bus to listeners on an event loop.
+
+    Listeners are called on the loop's thread. If a listener returns a
+    coroutine it is scheduled as a task.
+
+        >>> notifier = AsyncNotifier(bus, [can.Printer()])
+        >>> notifier.subscribe(handler, [{"can_id": 0x123, "can_mask": 0x7FF}])
+        ...
+        >>> await notifier.stop()
+    """
+
+    def __init__(self, bus, listeners, loop=None, max_batch=64):
+        """
+        :param bus: The :class:`~can.BusABC` to listen to.
+        :param listeners: An iterable of :class:`~can.Listener` objects
+            which are notified of every message.
+        :param loop:
+            The event loop to use. Required unless this is called while the
+            loop is running, from a coroutine or callback.
+        :param int max_batch:
+            The most messages read from the bus in one go.
+        """
+        self.bus = bus
+        self.listeners = listeners
+        if loop is None:
+            try:
+                loop = _running_loop()
+            except RuntimeError:
+                raise RuntimeError("AsyncNotifier needs a running event loop or an explicit loop")
+        self.loop = loop
+        self.max_batch = max_batch
+        self._routes = RoutingTable()
+
+        self._fd = _fileno(bus)
+        self._thread = None
+        self._stopped = self.loop.create_future()
+        self.running = threading.Event()
+        self.running.set()
+        if self._fd is not None:
+            self.loop.add_reader(self._fd, self._on_readable)
+            self._stopped.set_result(None)
+        else:
+            log.debug("%s can't be polled, reading it from a thread", bus)
+            self._thread = threading.Thread(target=self._rx_thread)
+            self._thread.daemon = True
+            self._thread.start()
+
+    def subscribe(self, listener, can_filters=None):
+        """Add a listener which is only notified of matching messages,
+        see :meth:`can.Notifier.subscribe`.
+        """
+        self._routes.add(listener, can_filters)
+
+    def _on_readable(self):
+        # Keep reading while full batches come back, in case the bus held
+        # on to frames the fd no longer signals.
+        while True:
+            messages = self.bus.recv_batch(self.max_batch, timeout=0)
+            self._dispatch(messages)
+            if len(messages) < self.max_batch:
+                break
+
+    def _rx_thread(self):
+        try:
+            while self.running.is_set():
+                messages = self.bus.recv_batch(self.max_batch, timeout=_POLL_INTERVAL)
+                if messages:
+                    self.loop.call_soon_threadsafe(self._dispatch, messages)
+        finally:
+            try:
+                self.loop.call_soon_threadsafe(self._thread_finished)
+            except RuntimeError:
+                # The loop was closed, nobody is left waiting
+                pass
+
+    def _thread_finished(self):
+        if not self._stopped.done():
+            self._stopped.set_result(None)
+
+    def _dispatch(self, messages):
+        lookup = self._routes.lookup
+        for msg in messages:
+            for callback in self.listeners:
+                self._call(callback, msg)
+            for callback in lookup(msg.arbitration_id):
+                self._call(callback, msg)
+
+    def _call(self, callback, msg):
+        result = callback(msg)
+        if asyncio.iscoroutine(result):
+            self.loop.create_task(result)
+
+    def stop(self):
+        """Stop reading from the bus.
+
+        Call this on the loop's thread. It returns at once, without waiting
+        for the helper thread of an unpollable bus, which may be stuck in a
+        read the bus doesn't let time out.
+
+        :return:
+            A future which is done once nothing reads from the bus any more.
+            Await it before closing the bus.
+        """
+        self.running.clear()
+        if self._fd is not None:
+            self.loop.remove_reader(self._fd)
+        return self._stopped
@@ -0,0 +1,220 @@
+"""
+A columnar container for many CAN frames.
+
+:class:`MessageBatch` holds frames as a NumPy structured array rather than
+as a list of :class:`can.Message` objects, which makes whole-trace analysis
+cheaper in memory and lets filtering happen without a Python loop per row.
+
+NumPy is only required when a :class:`MessageBatch` is actually used.
+"""
+import logging
+
+try:
+    import numpy
+except ImportError:
+    numpy = None
+
+from can.message import Message, FLAG_EXTENDED_ID, FLAG_REMOTE_FRAME, FLAG_ERROR_FRAME, \
+    FLAG_FD, FLAG_BITRATE_SWITCH, FLAG_ERROR_STATE_INDICATOR
+
+log = logging.getLogger('can.batch')
+
+#: Mask matching every bit of a 29 bit arbitration id
+MATCH_ALL_BITS = 0x1FFFFFFF
+
+
+def batch_dtype(payload_size=8):
+    """Return the NumPy dtype used to store frames with the given payload size.
+
+    :param int payload_size:
+        8 for classic CAN, 64 for CAN FD.
+    """
+    if numpy is None:
+        raise ImportError("NumPy is required to use a MessageBatch")
+    return numpy.dtype([
+        ('timestamp', '<f8'),
+        ('arbitration_id', '<u4'),
+        ('flags', 'u1'),
+        ('dlc', 'u1'),
+        ('data', 'u1', (payload_size,)),
+    ])
+
+
+def message_flags(msg):
+    """Pack the boolean attributes of a :class:`can.Message` into flag bits."""
+    flags = 0
+    if msg.id_type:
+        flags |= FLAG_EXTENDED_ID
+    if msg.is_remote_frame:
+        flags |= FLAG_REMOTE_FRAME
+    if msg.is_error_frame:
+        flags |= FLAG_ERROR_FRAME
+    if msg.is_fd:
+        flags |= FLAG_FD
+    if msg.bitrate_switch:
+        flags |= FLAG_BITRATE_SWITCH
+    if msg.error_state_indicator:
+        flags |= FLAG_ERROR_STATE_INDICATOR
+    return flags
+
+
+class MessageBatch(object):
+    """
+    Stores N frames as parallel columns:
+
+    ==============  =========  ===============================
+    column          type       contents
+    ==============  =========  ===============================
+    timestamp       float64    :attr:`can.Message.timestamp`
+    arbitration_id  uint32     :attr:`can.Message.arbitration_id`
+    flags           uint8      ``FLAG_*`` bits from :mod:`can.message`
+    dlc             uint8      :attr:`can.Message.dlc`
+    data            uint8[8]   payload, zero padded (uint8[64] for CAN FD)
+    ==============  =========  ===============================
+
+    Indexing with an int returns a :class:`can.Message`, indexing with a slice
+    or boolean mask returns a new :class:`MessageBatch`.
+
+        >>> batch = MessageBatch.from_messages(messages)
+        >>> engine = batch.filter([{"can_id": 0x0CF00400, "can_mask": 0x00FFFF00}])
+        >>> engine.timestamp.mean()
+    """
+
+    def __init__(self, size=0, payload_size=8, array=None):
+        """
+        :param int size:
+            Number of zeroed frames to allocate.
+        :param int payload_size:
+            Width of the data column, 8 for classic CAN or 64 for CAN FD.
+        :param numpy.ndarray array:
+            An existing structured array (see :func:`batch_dtype`) to wrap
+            without copying. `size` and `payload_size` are ignored.
+        """
+        if numpy is None:
+            raise ImportError("NumPy is required to use a MessageBatch")
+        if array is None:
+            array = numpy.zeros(size, dtype=batch_dtype(payload_size))
+        self.array = array
+
+    @classmethod
+    def from_messages(cls, messages, payload_size=None):
+        """Build a batch from a sequence of :class:`can.Message` objects.
+
+        :param int payload_size:
+            Width of the data column. By default 8, or 64 if any message
+            is a CAN FD frame or carries more than 8 bytes.
+        """
+        messages = list(messages)
+        if payload_size is None:
+            payload_size = 8
+            for msg in messages:
+                if msg.is_fd or len(msg.data) > 8:
+                    payload_size = 64
+                    break
+
+        batch = cls(len(messages), payload_size)
+        array = batch.array
+        count = len(messages)
+        array['timestamp'] = numpy.fromiter((m.timestamp for m in messages), 'f8', count)
+        array['arbitration_id'] = numpy.fromiter((m.arbitration_id for m in messages), 'u4', count)
+        array['flags'] = numpy.fromiter((message_flags(m) for m in messages), 'u1', count)
+        array['dlc'] = numpy.fromiter((m.dlc for m in messages), 'u1', count)
+
+        padding = b'\x00' * payload_size
+        raw = b''.join((bytes(m.data) + padding)[:payload_size] for m in messages)
+        array['data'] = numpy.frombuffer(raw, 'u1').reshape(count, payload_size)
+        return batch
+
+    def to_messages(self):
+        """Convert the batch into a list of :class:`can.Message` objects."""
+        array = self.array
+        payload_size = self.payload_size
+        raw = array['data'].tobytes()
+        messages = []
+        rows = zip(array['timestamp'].tolist(),
+                   array['arbitration_id'].tolist(),
+                   array['flags'].tolist(),
+                   array['dlc'].tolist())
+        for i, (timestamp, arbitration_id, flags, dlc) in enumerate(rows):
+            is_remote_frame = bool(flags & FLAG_REMOTE_FRAME)
+            if is_remote_frame:
+                data = bytearray()
+            else:
+                start = i * payload_size
+                data = bytearray(raw[start:start + min(dlc, payload_size)])
+            messages.append(Message(timestamp=timestamp,
+                                    arbitration_id=arbitration_id,
+                                    extended_id=bool(flags & FLAG_EXTENDED_ID),
+                                    is_remote_frame=is_remote_frame,
+                                    is_error_frame=bool(flags & FLAG_ERROR_FRAME),
+                                    dlc=dlc,
+                                    data=data,
+                                    is_fd=bool(flags & FLAG_FD),
+                                    bitrate_switch=bool(flags & FLAG_BITRATE_SWITCH),
+                                    error_state_indicator=bool(flags & FLAG_ERROR_STATE_INDICATOR)))
+        return messages
+
+    @classmethod
+    def concatenate(cls, batches):
+        """Join several batches with the same payload size into one."""
+        return cls(array=numpy.concatenate([batch.array for batch in batches]))
+
+    @property
+    def payload_size(self):
+        return self.array.dtype['data'].shape[0]
+
+    @property
+    def timestamp(self):
+        return self.array['timestamp']
+
+    @property
+    def arbitration_id(self):
+        return self.array['arbitration_id']
+
+    @property
+    def flags(self):
+        return self.array['flags']
+
+    @property
+    def dlc(self):
+        return self.array['dlc']
+
+    @property
+    def data(self):
+        return self.array['data']
+
+    def match(self, can_id, can_mask=MATCH_ALL_BITS):
+        """Return a boolean array which is True for each frame where
+        ``arbitration_id & can_mask == can_id & can_mask``.
+        """
+        return (self.array['arbitration_id'] & can_mask) == (can_id & can_mask)
+
+    def filter(self, can_filters):
+        """Return the frames matching any of the given filters.
+
+        :param list can_filters:
+            A list of dictionaries each containing a "can_id" and a "can_mask",
+            the same format accepted by :class:`can.BusABC`.
+        """
+        selected = numpy.zeros(len(self), dtype=bool)
+        for can_filter in can_filters:
+            selected |= self.match(can_filter['can_id'], can_filter['can_mask'])
+        return self[selected]
+
+    def filter_ids(self, arbitration_ids):
+        """Return the frames whose arbitration id is in `arbitration_ids`."""
+        return self[numpy.isin(self.array['arbitration_id'], list(arbitration_ids))]
+
+    def __len__(self):
+        return len(self.array)
+
+    def __getitem__(self, item):
+        if isinstance(item, (int, numpy.integer)):
+            return MessageBatch(array=self.array[item:item + 1 or None]).to_messages()[0]
+        return MessageBatch(array=self.array[item])
+
+    def __iter__(self):
+        return iter(self.to_messages())
+
+    def __repr__(self):
+        return "MessageBatch({} frames, payload_size={})".format(len(self), self.payload_size)
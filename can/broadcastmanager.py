@@ -1,12 +1,18 @@
 #!/usr/bin/env python3
 """
-Exposes several methods for transmitting cyclic messages.
+Exposes several methods for transmitting cyclic messages, and for
+subscribing to changes of received messages.
 20/09/13
 """
 
 import can
 import abc
+import heapq
 import logging
+import threading
+import weakref
+
+from can.util import clock
 
 log = logging.getLogger('can.bcm')
 log.debug("Loading base broadcast manager functionality")
@@ -67,9 +73,272 @@ class MultiRateCyclicSendTaskABC(CyclicSendTaskABC):
         super(MultiRateCyclicSendTaskABC, self).__init__(channel, message, subsequent_period)
 
 
+class CyclicScheduler(object):
+
+    """Sends the messages of many :class:`ThreadBasedCyclicSendTask` objects
+    from a single thread.
+
+    Pending transmissions are kept in a heap ordered by deadline. Each
+    deadline is derived from the previous deadline rather than from the time
+    the message was actually sent, so timing errors don't accumulate.
+
+    The heap only holds weak references, so a task nobody refers to any
+    more is stopped when it is garbage collected, like the kernel's tasks.
+    """
+
+    def __init__(self):
+        self._heap = []
+        self._condition = threading.Condition(threading.RLock())
+        self._counter = 0
+        self._thread = None
+
+    def add(self, task, deadline):
+        """Schedule the next transmission of `task` at `deadline`."""
+        with self._condition:
+            self._push(task, deadline)
+            if self._thread is None:
+                self._thread = threading.Thread(target=self._run, name="can.CyclicScheduler")
+                self._thread.daemon = True
+                self._thread.start()
+            self._condition.notify()
+
+    def _push(self, task, deadline):
+        self._counter += 1
+        # The generation lets stopped or rescheduled tasks be discarded lazily
+        heapq.heappush(self._heap, (deadline, self._counter, weakref.ref(task), task._generation))
+
+    def _run(self):
+        while True:
+            with self._condition:
+                while True:
+                    # Don't keep a task alive while waiting
+                    task = None
+                    if not self._heap:
+                        self._condition.wait()
+                        continue
+                    deadline, _, ref, generation = self._heap[0]
+                    task = ref()
+                    if task is None or generation != task._generation:
+                        heapq.heappop(self._heap)
+                        continue
+                    delay = deadline - clock()
+                    if delay > 0:
+                        task = None
+                        self._condition.wait(delay)
+                        continue
+                    heapq.heappop(self._heap)
+                    break
+
+            next_deadline = task._fire(deadline)
+
+            if next_deadline is not None:
+                with self._condition:
+                    if generation == task._generation:
+                        self._push(task, next_deadline)
+            task = None
+
+
+_default_scheduler = None
+
+
+def default_scheduler():
+    """The :class:`CyclicScheduler` shared by all tasks that don't specify one."""
+    global _default_scheduler
+    if _default_scheduler is None:
+        _default_scheduler = CyclicScheduler()
+    return _default_scheduler
+
+
+class ThreadBasedCyclicSendTask(CyclicSendTaskABC):
+
+    """A pure Python cyclic send task which works with any :class:`can.BusABC`.
+
+    The timing achieved is recorded in :attr:`sent`, :attr:`overruns`,
+    :attr:`max_jitter` and :attr:`mean_jitter`, where jitter is how late a
+    message was sent relative to its deadline.
+    """
+
+    def __init__(self, bus, message, period, count=0, initial_period=0.0, scheduler=None):
+        """
+        :param bus: The :class:`can.BusABC` to send the message on.
+        :param message: The :class:`can.Message` to be sent periodically.
+        :param float period: The rate in seconds at which to send the message.
+        :param int count:
+            Send the message `count` times at `initial_period` before
+            continuing at `period`.
+        :param float initial_period: See `count`.
+        :param scheduler:
+            The :class:`CyclicScheduler` to use, by default one shared thread
+            serves all tasks.
+        """
+        CyclicSendTaskABC.__init__(self, bus, message, period)
+        self.bus = bus
+        self.message = message
+        self.count = count
+        self.initial_period = initial_period
+        self.scheduler = scheduler if scheduler is not None else default_scheduler()
+
+        #: Number of messages sent
+        self.sent = 0
+        #: Number of deadlines skipped because a send was more than a period late
+        self.overruns = 0
+        #: Largest delay in seconds between a deadline and the actual send
+        self.max_jitter = 0.0
+        self._total_jitter = 0.0
+
+        self._generation = 0
+        self._remaining = 0
+        self.start()
+
+    @property
+    def mean_jitter(self):
+        """Mean delay in seconds between a deadline and the actual send."""
+        if self.sent == 0:
+            return 0.0
+        return self._total_jitter / self.sent
+
+    def start(self):
+        with self.scheduler._condition:
+            self._generation += 1
+            self._remaining = self.count
+            self.scheduler.add(self, clock())
+
+    def stop(self):
+        """Remove this task from the scheduler, no more messages are sent."""
+        with self.scheduler._condition:
+            self._generation += 1
+
+    def modify_data(self, message):
+        """Update the contents of this periodically sent message.
+        """
+        assert message.arbitration_id == self.can_id, "You cannot modify the can identifier"
+        self.message = message
+
+    def _fire(self, deadline):
+        """Called by the scheduler: send the message and return the next deadline."""
+        now = clock()
+        try:
+            self.bus.send(self.message)
+        except Exception:
+            log.exception("Cyclic send of 0x%x failed", self.can_id)
+
+        jitter = now - deadline
+        self.sent += 1
+        self._total_jitter += jitter
+        if jitter > self.max_jitter:
+            self.max_jitter = jitter
+
+        if self._remaining > 0:
+            self._remaining -= 1
+            period = self.initial_period
+        else:
+            period = self.period
+        if period <= 0:
+            return None
+
+        next_deadline = deadline + period
+        if now - next_deadline > period:
+            # Fell more than a whole period behind, skip the missed deadlines
+            missed = int((now - next_deadline) / period)
+            self.overruns += missed
+            next_deadline += missed * period
+        return next_deadline
+
+
+class ThreadBasedMultiRateCyclicSendTask(ThreadBasedCyclicSendTask, MultiRateCyclicSendTaskABC):
+
+    """Transmits a message `count` times at `initial_period` then continues
+    to transmit the message at `subsequent_period`, on any bus.
+    """
+
+    def __init__(self, bus, message, count, initial_period, subsequent_period, scheduler=None):
+        ThreadBasedCyclicSendTask.__init__(self, bus, message, subsequent_period,
+                                           count=count, initial_period=initial_period,
+                                           scheduler=scheduler)
+
+
+class ReceiveFilterTaskABC(CyclicTask):
+
+    """Subscribes to a CAN id with the kernel's broadcast manager (RX_SETUP)
+    so that only frames whose content changed, and timeouts for missing
+    frames, are delivered to Python.
+    """
+
+    def __init__(self, channel, can_id, data_mask=None, timeout=0.0, throttle=0.0,
+                 extended_id=True, check_dlc=True, on_timeout=None):
+        """
+        :param str channel: The name of the CAN channel to connect to.
+        :param int can_id: The arbitration id to subscribe to.
+        :param data_mask:
+            A bytes-like mask of up to 8 bytes. A frame is delivered when any
+            of the masked bits differ from the last delivered frame. When None
+            every frame with `can_id` is delivered (subject to `throttle`).
+        :param float timeout:
+            Report a timeout if no frame with `can_id` arrives within this
+            many seconds, 0 disables the timeout monitoring.
+        :param float throttle:
+            The minimum number of seconds between two delivered frames.
+        :param bool extended_id: Whether `can_id` is a 29 bit identifier.
+        :param bool check_dlc: Also deliver a frame when only its dlc changed.
+        :param on_timeout:
+            An optional callable invoked with this task on every timeout.
+        """
+        self.can_id = can_id
+        self.data_mask = data_mask
+        self.timeout = timeout
+        self.throttle = throttle
+        self.extended_id = extended_id
+        self.check_dlc = check_dlc
+        self.on_timeout = on_timeout
+
+        #: The number of timeouts reported by the kernel so far
+        self.timeouts = 0
+
+    def _handle_timeout(self):
+        self.timeouts += 1
+        log.debug("Receive filter for 0x%x timed out", self.can_id)
+        if self.on_timeout is not None:
+            self.on_timeout(self)
+
+    @abc.abstractmethod
+    def recv(self, timeout=None):
+        """Block waiting for the kernel to deliver a changed frame.
+
+        Timeouts reported by the kernel are counted in :attr:`timeouts` and
+        passed to `on_timeout` while waiting.
+
+        :param float timeout: Seconds to wait, None waits forever.
+        :return:
+            None if `timeout` elapsed or a :class:`can.Message` object.
+        """
+
+    def __iter__(self):
+        """Iterate over the changed frames as they are delivered."""
+        while True:
+            m = self.recv(timeout=1.0)
+            if m is not None:
+                yield m
+
+
 def send_periodic(channel, message, period):
     """
     Send a message every `period` seconds on the given channel.
 
+    :param channel:
+        Either the name of a channel or a :class:`can.BusABC` instance. The
+        socketcan backends use the kernel's broadcast manager, everything
+        else uses a :class:`ThreadBasedCyclicSendTask`.
     """
     return can.interfaces.interface.CyclicSendTask(channel, message, period)
+
+
+def subscribe_changes(channel, can_id, data_mask=None, timeout=0.0, throttle=0.0, **kwargs):
+    """
+    Ask the kernel to deliver frames with `can_id` on the given channel only
+    when their masked content changes, and to report when they stop arriving.
+
+    Requires one of the socketcan backends. See :class:`ReceiveFilterTaskABC`
+    for the parameters.
+    """
+    return can.interfaces.interface.ReceiveFilterTask(channel, can_id, data_mask,
+                                                      timeout, throttle, **kwargs)
@@ -14,6 +14,9 @@ class BusABC(object):
         * send
         * recv
 
+    Backends which can read or write several frames per call should also
+    override :meth:`recv_batch` and :meth:`send_batch`.
+
     As well as setting the `channel_info` attribute to a string describing the
     interface.
 
@@ -58,6 +61,81 @@ class BusABC(object):
         """
         raise NotImplementedError("Trying to write to a readonly bus?")
 
+    def recv_batch(self, max_count=64, timeout=None):
+        """Block waiting for a message from the Bus, then return it along with
+        any further messages that are immediately available.
+
+        The default implementation calls :meth:`recv` repeatedly, backends
+        that can drain several frames per call override it.
+
+        :param int max_count:
+            The maximum number of messages to return.
+        :param float timeout:
+            Seconds to wait for the first message.
+
+        :return:
+            A list of up to `max_count` :class:`can.Message` objects, empty
+            on timeout.
+        """
+        msg = self.recv(timeout)
+        if msg is None:
+            return []
+        messages = [msg]
+        while len(messages) < max_count:
+            msg = self.recv(timeout=0)
+            if msg is None:
+                break
+            messages.append(msg)
+        return messages
+
+    def send_batch(self, messages):
+        """Transmit several messages to CAN bus, in order.
+
+        The default implementation calls :meth:`send` for each message,
+        backends that can queue several frames per call override it.
+
+        :param messages: An iterable of :class:`can.Message` objects.
+
+        :raise: :class:`can.CanError`
+            if a message could not be written.
+        """
+        for msg in messages:
+            self.send(msg)
+
+    def fileno(self):
+        """Return a file descriptor which becomes readable when a message
+        can be received without blocking, for use with :mod:`select` or an
+        event loop.
+
+        :raise: NotImplementedError
+            if the backend can't be polled.
+        """
+        raise NotImplementedError("{} can't be polled".format(self.__class__.__name__))
+
+    def recv_async(self, timeout=None):
+        """Wait for a message from the Bus without blocking the event loop.
+        Requires Python 3.5 or newer.
+
+            >>> msg = await bus.recv_async(timeout=1.0)
+
+        :return:
+            An awaitable giving None on timeout or a :class:`can.Message`.
+        """
+        from can.aio import recv_async
+        return recv_async(self, timeout)
+
+    def __aiter__(self):
+        """Allow asynchronous iteration on messages as they are received.
+
+            >>> async for msg in bus:
+            ...     print(msg)
+        """
+        return self
+
+    def __anext__(self):
+        from can.aio import recv_async
+        return recv_async(self)
+
     def __iter__(self):
         """Allow iteration on messages as they are received.
 
@@ -0,0 +1,198 @@
+"""
+Forwards frames between buses according to a table of routes, optionally
+changing their arbitration ids on the way.
+"""
+import logging
+
+from can.message import _replace
+from can.notifier import MultiBusNotifier, RoutingTable
+from can.util import clock
+
+log = logging.getLogger('can.gateway')
+
+
+class Route(object):
+    """One rule of a :class:`Gateway`: which frames to forward, where to,
+    and what to change their ids to.
+
+    A route also keeps count of what it forwarded and how long that took,
+    measured from the gateway reading a batch of frames to each destination
+    accepting its share of it.
+    """
+
+    def __init__(self, destinations, can_filters=None, rewrite=None, sources=None, name=None):
+        """
+        :param destinations: The buses matching frames are sent to.
+        :param list can_filters:
+            A list of dictionaries each containing a "can_id" and a
+            "can_mask", as accepted by :class:`~can.BusABC`. None matches
+            every frame.
+        :param rewrite:
+            None to forward frames unchanged, a dict mapping arbitration ids
+            to the ids to send them with, or a callable taking an id and
+            returning the new one. Ids missing from a dict are left alone.
+            Frames keep their id type either way.
+        :param sources:
+            The buses, from those the gateway reads, whose frames this route
+            applies to. None for all of them.
+        :param str name: A name for :meth:`Gateway.report`.
+        """
+        self.destinations = list(destinations)
+        self.can_filters = can_filters
+        self.rewrite = rewrite
+        self.sources = sources
+        self.name = name
+
+        #: Frames sent, counting each destination separately
+        self.forwarded = 0
+        #: Frames a destination failed to send
+        self.failed = 0
+        #: Longest time between reading a frame and a destination accepting it, in seconds
+        self.max_latency = 0.0
+        self._total_latency = 0.0
+
+    @property
+    def mean_latency(self):
+        """Mean time between reading a frame and a destination accepting it, in seconds."""
+        if not self.forwarded:
+            return 0.0
+        return self._total_latency / self.forwarded
+
+    def new_id(self, arbitration_id):
+        """Return the id to forward `arbitration_id` with, None if unchanged."""
+        if self.rewrite is None:
+            return None
+        if callable(self.rewrite):
+            new_id = self.rewrite(arbitration_id)
+        else:
+            new_id = self.rewrite.get(arbitration_id)
+        return None if new_id == arbitration_id else new_id
+
+    def _record(self, count, latency):
+        self.forwarded += count
+        self._total_latency += count * latency
+        if latency > self.max_latency:
+            self.max_latency = latency
+
+    def __str__(self):
+        return self.name or "route to {}".format(", ".join(
+            getattr(bus, 'channel_info', str(bus)) for bus in self.destinations))
+
+
+class Gateway(MultiBusNotifier):
+    """Reads frames from several buses and forwards them along routes.
+
+    The route table is compiled separately for each source bus with a
+    :class:`~can.notifier.RoutingTable`. The destinations and new id for
+    each arbitration id are worked out the first time it is seen, so after
+    that a frame costs one dict lookup. Each wakeup forwards everything read
+    with one :meth:`~can.BusABC.send_batch` call per destination bus, and a
+    frame is never sent back to the bus it came from. Frames are passed on
+    as the same object unless their id is rewritten.
+
+    Gateways are notifiers, so :meth:`subscribe` taps into the traffic.
+
+        >>> gateway = Gateway({'chassis': chassis, 'diag': diag}, [
+        ...     Route([diag], [{"can_id": 0x100, "can_mask": 0x700}], rewrite=lambda i: i + 0x400),
+        ...     Route([chassis], sources=[diag]),
+        ... ])
+        ...
+        >>> gateway.stop()
+        >>> print(gateway.report())
+    """
+
+    def __init__(self, buses, routes=(), timeout=0.1, poll_interval=0.01, max_batch=64, max_cache_size=65536):
+        """
+        :param buses:
+            The buses to read from, as a list or a dict mapping tags to buses
+            like :class:`~can.MultiBusNotifier` takes.
+        :param routes: An iterable of :class:`Route` objects.
+        :param float timeout:
+            Seconds between checks of whether the gateway was stopped.
+        :param float poll_interval:
+            Seconds between reads of buses without a file descriptor.
+        :param int max_batch: The most messages read from one bus per wakeup.
+        :param int max_cache_size: The most ids remembered for each source bus.
+        """
+        if isinstance(buses, dict):
+            self._sources = dict(buses)
+        else:
+            self._sources = dict(enumerate(buses))
+        self.routes = list(routes)
+        self.max_cache_size = max_cache_size
+        self._compile()
+        super(Gateway, self).__init__(buses, [], timeout, poll_interval=poll_interval, max_batch=max_batch)
+
+    def add_route(self, route):
+        """Start forwarding along `route`."""
+        self.routes.append(route)
+        self._compile()
+
+    def remove_route(self, route):
+        """Stop forwarding along `route`."""
+        self.routes = [r for r in self.routes if r is not route]
+        self._compile()
+
+    def _compile(self):
+        tables = {}
+        for tag, source in self._sources.items():
+            table = RoutingTable(self.max_cache_size)
+            for route in self.routes:
+                if route.sources is None or any(bus is source for bus in route.sources):
+                    destinations = tuple(bus for bus in route.destinations if bus is not source)
+                    if destinations:
+                        table.add((route, destinations), route.can_filters)
+            tables[tag] = (table.lookup, {})
+        # Replaced as a whole so the forwarding thread sees a consistent table
+        self._tables = tables
+
+    def _resolve(self, lookup, cache, arbitration_id):
+        """Compile the forwarding of one id from one source."""
+        forwarding = tuple((route, route.new_id(arbitration_id), destinations)
+                           for route, destinations in lookup(arbitration_id))
+        if len(cache) >= self.max_cache_size:
+            cache.clear()
+        cache[arbitration_id] = forwarding
+        return forwarding
+
+    def _dispatch(self, messages):
+        start = clock()
+        super(Gateway, self)._dispatch(messages)
+
+        tables = self._tables
+        # Per destination bus: the bus, the frames for it and how many each route sent
+        outgoing = {}
+        for tag, msg in messages:
+            lookup, cache = tables[tag]
+            try:
+                forwarding = cache[msg.arbitration_id]
+            except KeyError:
+                forwarding = self._resolve(lookup, cache, msg.arbitration_id)
+            for route, new_id, destinations in forwarding:
+                forwarded = msg if new_id is None else _replace(msg, arbitration_id=new_id)
+                for bus in destinations:
+                    try:
+                        _, frames, counts = outgoing[id(bus)]
+                    except KeyError:
+                        _, frames, counts = outgoing[id(bus)] = (bus, [], {})
+                    frames.append(forwarded)
+                    counts[route] = counts.get(route, 0) + 1
+
+        for bus, frames, counts in outgoing.values():
+            try:
+                bus.send_batch(frames)
+            except Exception:
+                log.exception("Failed to forward %d frames to %s", len(frames), bus)
+                for route, count in counts.items():
+                    route.failed += count
+                continue
+            latency = clock() - start
+            for route, count in counts.items():
+                route._record(count, latency)
+
+    def report(self):
+        """A summary of each route, one per line."""
+        return "\n".join(
+            "{}: forwarded {}, failed {}, latency mean {:.3f} ms, max {:.3f} ms".format(
+                route, route.forwarded, route.failed, 1000 * route.mean_latency, 1000 * route.max_latency)
+            for route in self.routes)
@@ -1,4 +1,8 @@
+import threading
+
 import can
+from can.bus import BusABC
+from can.broadcastmanager import ThreadBasedCyclicSendTask, ThreadBasedMultiRateCyclicSendTask
 from can.util import load_config, choose_socketcan_implementation
 
 
@@ -18,7 +22,9 @@ class Bus(object):
             can.rc['interface'] = kwargs['bustype']
             del kwargs['bustype']
 
-        if can.rc['interface'] not in set(['kvaser', 'serial', 'pcan', 'socketcan_native', 'socketcan_ctypes', 'socketcan']):
+        if can.rc['interface'] not in set(['kvaser', 'serial', 'pcan', 'socketcan_native', 'socketcan_ctypes',
+                                           'socketcan', 'replay', 'virtual', 'shm',
+                                           'network']):
             raise NotImplementedError('Invalid CAN Bus Type - {}'.format(can.rc['interface']))
 
         if can.rc['interface'] == 'socketcan':
@@ -40,9 +46,161 @@ class Bus(object):
         elif can.rc['interface'] == 'pcan':
             from can.interfaces.pcan import PcanBus
             cls = PcanBus
+        elif can.rc['interface'] == 'replay':
+            from can.interfaces.replay import ReplayBus
+            cls = ReplayBus
+        elif can.rc['interface'] == 'virtual':
+            from can.interfaces.virtual import VirtualBus
+            cls = VirtualBus
+        elif can.rc['interface'] == 'shm':
+            from can.interfaces.shm import SharedMemoryBus
+            cls = SharedMemoryBus
+        elif can.rc['interface'] == 'network':
+            from can.interfaces.network import NetworkBus
+            cls = NetworkBus
         else:
             raise NotImplementedError("CAN Interface Not Found")
 
         if channel is None:
             channel = can.rc['channel']
         return cls(channel, **kwargs)
+
+
+# Buses opened by the cyclic task factories for thread based tasks, keyed by
+# (interface, channel), with the number of running tasks using each
+_task_buses = {}
+_task_buses_lock = threading.Lock()
+
+
+def _acquire_task_bus(interface, channel):
+    if interface is None:
+        raise NotImplementedError("No CAN interface is configured, pass a can.BusABC "
+                                  "instance instead of the channel {!r}".format(channel))
+    with _task_buses_lock:
+        bus, users = _task_buses.get((interface, channel), (None, 0))
+        if bus is None:
+            bus = Bus(channel, bustype=interface)
+        _task_buses[(interface, channel)] = (bus, users + 1)
+    return bus
+
+
+def _release_task_bus(interface, channel):
+    with _task_buses_lock:
+        bus, users = _task_buses.pop((interface, channel))
+        if users > 1:
+            _task_buses[(interface, channel)] = (bus, users - 1)
+            return
+    bus.shutdown()
+
+
+class _SharedTaskBus(object):
+    """Makes a thread based task hold a reference to its channel's shared
+    bus while it runs.
+    """
+
+    def start(self):
+        if not self._holds_bus:
+            self.bus = _acquire_task_bus(*self._bus_key)
+            self._holds_bus = True
+        super(_SharedTaskBus, self).start()
+
+    def stop(self):
+        super(_SharedTaskBus, self).stop()
+        if self._holds_bus:
+            self._holds_bus = False
+            _release_task_bus(*self._bus_key)
+
+
+class _SharedBusCyclicSendTask(_SharedTaskBus, ThreadBasedCyclicSendTask):
+
+    def __init__(self, bus_key, bus, *args, **kwargs):
+        self._bus_key = bus_key
+        self._holds_bus = True
+        ThreadBasedCyclicSendTask.__init__(self, bus, *args, **kwargs)
+
+
+class _SharedBusMultiRateCyclicSendTask(_SharedTaskBus, ThreadBasedMultiRateCyclicSendTask):
+
+    def __init__(self, bus_key, bus, *args, **kwargs):
+        self._bus_key = bus_key
+        self._holds_bus = True
+        ThreadBasedMultiRateCyclicSendTask.__init__(self, bus, *args, **kwargs)
+
+
+class CyclicSendTask(object):
+    """
+    Creates a cyclic send task for the given channel.
+
+    The socketcan backends hand the task to the kernel's broadcast manager.
+    For any other backend, or when `channel` is already a
+    :class:`can.BusABC` instance, a
+    :class:`~can.broadcastmanager.ThreadBasedCyclicSendTask` is used. Given
+    a channel name, such tasks share one bus per channel, which is shut
+    down once all of them have been stopped.
+    """
+
+    @classmethod
+    def __new__(cls, other, channel, *args, **kwargs):
+        if isinstance(channel, BusABC):
+            return ThreadBasedCyclicSendTask(channel, *args, **kwargs)
+
+        interface = can.rc.get('interface')
+        if interface == 'socketcan':
+            interface = choose_socketcan_implementation()
+        if interface == 'socketcan_native':
+            from can.interfaces.socketcan_native import CyclicSendTask as cls
+        elif interface == 'socketcan_ctypes':
+            from can.interfaces.socketcan_ctypes import CyclicSendTask as cls
+        else:
+            bus = _acquire_task_bus(interface, channel)
+            return _SharedBusCyclicSendTask((interface, channel), bus, *args, **kwargs)
+        return cls(channel, *args, **kwargs)
+
+
+class MultiRateCyclicSendTask(object):
+    """
+    Creates a multi rate cyclic send task for the given channel, see
+    :class:`CyclicSendTask` for how the implementation is chosen.
+    """
+
+    @classmethod
+    def __new__(cls, other, channel, *args, **kwargs):
+        if isinstance(channel, BusABC):
+            return ThreadBasedMultiRateCyclicSendTask(channel, *args, **kwargs)
+
+        interface = can.rc.get('interface')
+        if interface == 'socketcan':
+            interface = choose_socketcan_implementation()
+        if interface == 'socketcan_ctypes':
+            from can.interfaces.socketcan_ctypes import MultiRateCyclicSendTask as cls
+            return cls(channel, *args, **kwargs)
+        # The native socketcan backend has no multi rate BCM task yet
+        bus = _acquire_task_bus(interface, channel)
+        return _SharedBusMultiRateCyclicSendTask((interface, channel), bus, *args, **kwargs)
+
+
+def _socketcan_implementation():
+    """The socketcan backend to use for broadcast manager tasks."""
+    interface = can.rc.get('interface')
+    if interface == 'socketcan':
+        interface = choose_socketcan_implementation()
+    if interface not in ('socketcan_native', 'socketcan_ctypes'):
+        raise NotImplementedError("The broadcast manager requires a socketcan backend, "
+                                  "not {}".format(interface))
+    return interface
+
+
+class ReceiveFilterTask(object):
+    """
+    Creates a kernel side receive filter (see
+    :class:`can.broadcastmanager.ReceiveFilterTaskABC`) with the configured
+    socketcan backend.
+    """
+
+    @classmethod
+    def __new__(cls, other, channel, *args, **kwargs):
+        if _socketcan_implementation() == 'socketcan_native':
+            from can.interfaces.socketcan_native import ReceiveFilterTask as cls
+        else:
+            from can.interfaces.socketcan_ctypes import ReceiveFilterTask as cls
+        return cls(channel, *args, **kwargs)
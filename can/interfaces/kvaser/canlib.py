@@ -228,6 +228,28 @@ canReadWait = __get_canlib_function("canReadWait",
                                     restype=canstat.c_canStatus,
                                     errcheck=__check_status_read)
 
+canRead = __get_canlib_function("canRead",
+                                argtypes=[c_canHandle, ctypes.c_void_p,
+                                          ctypes.c_void_p, ctypes.c_void_p,
+                                          ctypes.c_void_p, ctypes.c_void_p],
+                                restype=canstat.c_canStatus,
+                                errcheck=__check_status_read)
+
+canWrite = __get_canlib_function("canWrite",
+                                 argtypes=[
+                                     c_canHandle,
+                                     ctypes.c_long,
+                                     ctypes.c_void_p,
+                                     ctypes.c_uint,
+                                     ctypes.c_uint],
+                                 restype=canstat.c_canStatus,
+                                 errcheck=__check_status)
+
+canWriteSync = __get_canlib_function("canWriteSync",
+                                     argtypes=[c_canHandle, ctypes.c_ulong],
+                                     restype=canstat.c_canStatus,
+                                     errcheck=__check_status)
+
 canWriteWait = __get_canlib_function("canWriteWait",
                                      argtypes=[
                                          c_canHandle,
@@ -452,19 +474,79 @@ class KvaserBus(BusABC):
 
         if status == canstat.canOK:
             log.debug('read complete -> status OK')
-            data_array = list(map(ord, data))
-            is_extended = int(flags.value) & canstat.canMSG_EXT
-            msg_timestamp = self.__convert_timestamp(timestamp.value)
-            rx_msg = Message(arbitration_id=arb_id.value,
-                             data=data_array[:dlc.value],
-                             dlc=dlc.value,
-                             extended_id=is_extended,
-                             timestamp=msg_timestamp)
+            rx_msg = self.__build_message(arb_id, data, dlc, flags, timestamp)
             log.info('Got message: %s' % rx_msg)
             return rx_msg
         else:
             log.debug('read complete -> status not okay')
 
+    def recv_batch(self, max_count=64, timeout=None):
+        """
+        Wait for one message with :meth:`recv` then drain the driver's
+        receive queue with non blocking reads.
+        """
+        msg = self.recv(timeout)
+        if msg is None:
+            return []
+        messages = [msg]
+
+        arb_id = ctypes.c_long(0)
+        data = ctypes.create_string_buffer(8)
+        dlc = ctypes.c_uint(0)
+        flags = ctypes.c_uint(0)
+        timestamp = ctypes.c_ulong(0)
+
+        if self.single_handle:
+            self.done_writing.acquire()
+            while self.writing_event.is_set():
+                self.done_writing.wait()
+        try:
+            while len(messages) < max_count:
+                status = canRead(
+                    self._read_handle,
+                    ctypes.byref(arb_id),
+                    ctypes.byref(data),
+                    ctypes.byref(dlc),
+                    ctypes.byref(flags),
+                    ctypes.byref(timestamp)
+                )
+                if status != canstat.canOK:
+                    break
+                messages.append(self.__build_message(arb_id, data, dlc, flags, timestamp))
+        finally:
+            if self.single_handle:
+                self.done_writing.release()
+
+        log.debug('Drained %d messages', len(messages))
+        return messages
+
+    def __build_message(self, arb_id, data, dlc, flags, timestamp):
+        is_extended = int(flags.value) & canstat.canMSG_EXT
+        msg_timestamp = self.__convert_timestamp(timestamp.value)
+        return Message(arbitration_id=arb_id.value,
+                       data=bytearray(data.raw[:dlc.value]),
+                       dlc=dlc.value,
+                       extended_id=is_extended,
+                       timestamp=msg_timestamp)
+
+    def send_batch(self, messages):
+        """
+        Queue every message with the non blocking ``canWrite`` and then wait
+        once for the whole batch to be transmitted.
+        """
+        count = 0
+        for tx_msg in messages:
+            ArrayConstructor = ctypes.c_byte * tx_msg.dlc
+            buf = ArrayConstructor(*tx_msg.data)
+            canWrite(self._write_handle,
+                     tx_msg.arbitration_id,
+                     ctypes.byref(buf),
+                     tx_msg.dlc,
+                     tx_msg.flags)
+            count += 1
+        if count:
+            canWriteSync(self._write_handle, 5 * count)
+
     def send(self, tx_msg):
         #log.debug("Writing a message: {}".format(tx_msg))
         ArrayConstructor = ctypes.c_byte * tx_msg.dlc
@@ -0,0 +1,583 @@
+"""
+A bus carried over UDP or TCP in the packet format of cannelloni, so a bus
+on one machine can be used from others. The machine with the bus runs a
+:class:`NetworkServer`::
+
+    server = NetworkServer(can.interface.Bus('can0', bustype='socketcan'), port=20000)
+
+and clients open it as a bus::
+
+    bus = can.interface.Bus('vehicle:20000', bustype='network')
+
+Many frames are packed into each datagram, or each chunk of the TCP stream,
+which is what makes high frame rates affordable over a network.
+"""
+import logging
+import select
+import socket
+import struct
+import threading
+import time
+from collections import deque
+
+import can
+from can.bus import BusABC
+from can.message import Message
+
+logger = logging.getLogger('can.network')
+
+CANNELLONI_VERSION = 2
+OP_DATA = 0
+
+# version, op code, sequence number, frame count
+_packet_header = struct.Struct('>BBBH')
+# can_id with the SocketCAN flags, payload length
+_frame_header = struct.Struct('>IB')
+
+CAN_EFF_FLAG = 0x80000000
+CAN_RTR_FLAG = 0x40000000
+CAN_ERR_FLAG = 0x20000000
+CAN_EFF_MASK = 0x1FFFFFFF
+# Set in the length byte of CAN FD frames, which are followed by a flags byte
+CANFD_FRAME = 0x80
+CANFD_BRS = 0x01
+CANFD_ESI = 0x02
+
+# Largest UDP payload which fits in an Ethernet frame without fragmenting
+UDP_MAX_PACKET = 1472
+TCP_MAX_PACKET = 65536
+
+# Receive buffer requested for UDP sockets, so bursts aren't dropped while
+# the reader catches up
+UDP_RECEIVE_BUFFER = 4 * 1024 * 1024
+
+# How often blocked threads check whether they should stop
+_POLL_INTERVAL = 0.1
+
+# A sequence number this far behind the expected one belongs to a packet
+# which arrived late, rather than to one after a gap of nearly 256 packets
+_REORDER_WINDOW = 16
+
+# Seconds the server waits for a TCP client to accept data before dropping it
+_CLIENT_SEND_TIMEOUT = 1.0
+
+
+def encode_frame(msg):
+    """Return `msg` packed as a cannelloni frame."""
+    can_id = msg.arbitration_id
+    if msg.id_type:
+        can_id |= CAN_EFF_FLAG
+    if msg.is_error_frame:
+        can_id |= CAN_ERR_FLAG
+    if msg.is_remote_frame:
+        return _frame_header.pack(can_id | CAN_RTR_FLAG, msg.dlc)
+    data = bytes(msg.data)
+    if msg.is_fd:
+        flags = (CANFD_BRS if msg.bitrate_switch else 0) | (CANFD_ESI if msg.error_state_indicator else 0)
+        return _frame_header.pack(can_id, len(data) | CANFD_FRAME) + struct.pack('B', flags) + data
+    return _frame_header.pack(can_id, len(data)) + data
+
+
+def encode_packet(seq, frames):
+    """Return a data packet holding the already encoded `frames`."""
+    return _packet_header.pack(CANNELLONI_VERSION, OP_DATA, seq & 0xFF, len(frames)) + b''.join(frames)
+
+
+def decode_packet(data, offset=0, channel=None):
+    """Decode the packet which starts at `offset` in `data`.
+
+    :return:
+        A tuple of the packet's sequence number, its messages and the offset
+        just past it, or None if `data` ends before the packet does.
+    :raises can.CanError: if the data isn't a cannelloni data packet.
+    """
+    end = len(data)
+    if end - offset < _packet_header.size:
+        return None
+    version, op_code, seq, count = _packet_header.unpack_from(data, offset)
+    if version != CANNELLONI_VERSION or op_code != OP_DATA:
+        raise can.CanError("Not a cannelloni data packet (version {}, op code {})".format(version, op_code))
+
+    timestamp = time.time()
+    messages = []
+    pos = offset + _packet_header.size
+    for _ in range(count):
+        if end - pos < _frame_header.size:
+            return None
+        can_id, length = _frame_header.unpack_from(data, pos)
+        pos += _frame_header.size
+        is_fd = bool(length & CANFD_FRAME)
+        flags = 0
+        if is_fd:
+            if pos >= end:
+                return None
+            flags = struct.unpack_from('B', data, pos)[0]
+            pos += 1
+            length &= ~CANFD_FRAME
+        is_remote_frame = bool(can_id & CAN_RTR_FLAG)
+        if is_remote_frame:
+            payload = b''
+        else:
+            if end - pos < length:
+                return None
+            payload = bytes(data[pos:pos + length])
+            pos += length
+        try:
+            messages.append(Message(timestamp=timestamp,
+                                    arbitration_id=can_id & CAN_EFF_MASK,
+                                    extended_id=bool(can_id & CAN_EFF_FLAG),
+                                    is_remote_frame=is_remote_frame,
+                                    is_error_frame=bool(can_id & CAN_ERR_FLAG),
+                                    dlc=length,
+                                    data=payload,
+                                    is_fd=is_fd,
+                                    bitrate_switch=bool(flags & CANFD_BRS),
+                                    error_state_indicator=bool(flags & CANFD_ESI),
+                                    channel=channel))
+        except ValueError as error:
+            raise can.CanError("Invalid frame in packet: {}".format(error))
+    return seq, messages, pos
+
+
+class _Coalescer(object):
+    """Collects encoded frames and hands them to `send_packet` as packets.
+
+    A packet goes out once it is full, or `window` seconds after its first
+    frame was added. With no window every :meth:`add` sends straight away.
+
+    Finished packets are queued and sent after the frame lock is released,
+    so a slow `send_packet` doesn't hold up threads adding frames. One
+    thread at a time empties the queue, which keeps the packets in order.
+    """
+
+    def __init__(self, send_packet, window=0.0, max_packet_size=UDP_MAX_PACKET, max_frames=None):
+        self.send_packet = send_packet
+        self.window = window
+        self.max_packet_size = max_packet_size
+        self.max_frames = min(max_frames or 0xFFFF, 0xFFFF)
+        #: Number of packets sent so far, the low byte is the sequence number
+        self.packets_sent = 0
+
+        self._frames = []
+        self._size = _packet_header.size
+        self._first = None
+        self._stopped = False
+        self._lock = threading.Condition()
+        self._outgoing = deque()
+        self._send_lock = threading.Lock()
+        self._thread = None
+        if window > 0:
+            self._thread = threading.Thread(target=self._flush_thread)
+            self._thread.daemon = True
+            self._thread.start()
+
+    def add(self, frames):
+        with self._lock:
+            for frame in frames:
+                if self._size + len(frame) > self.max_packet_size:
+                    self._send_pending()
+                self._frames.append(frame)
+                self._size += len(frame)
+                if len(self._frames) >= self.max_frames:
+                    self._send_pending()
+            if self._thread is None:
+                self._send_pending()
+            elif self._frames and self._first is None:
+                self._first = time.time()
+                self._lock.notify()
+        self._deliver()
+
+    def _send_pending(self):
+        """Queue the collected frames as a packet, with the frame lock held."""
+        if not self._frames:
+            return
+        self._outgoing.append(encode_packet(self.packets_sent, self._frames))
+        self.packets_sent += 1
+        self._frames = []
+        self._size = _packet_header.size
+        self._first = None
+
+    def _deliver(self):
+        """Send the queued packets, without the frame lock held."""
+        while self._outgoing:
+            # Whoever holds the send lock also sends what was queued meanwhile,
+            # and checks the queue again after letting go of it.
+            if not self._send_lock.acquire(False):
+                return
+            try:
+                while self._outgoing:
+                    self.send_packet(self._outgoing.popleft())
+            finally:
+                self._send_lock.release()
+
+    def _flush_thread(self):
+        while True:
+            with self._lock:
+                if self._stopped:
+                    return
+                if self._first is None:
+                    self._lock.wait()
+                    continue
+                remaining = self._first + self.window - time.time()
+                if remaining > 0:
+                    self._lock.wait(remaining)
+                    continue
+                self._send_pending()
+            self._deliver()
+
+    def flush(self):
+        with self._lock:
+            self._send_pending()
+        self._deliver()
+
+    def stop(self):
+        with self._lock:
+            self._send_pending()
+            self._stopped = True
+            self._lock.notify()
+        self._deliver()
+        if self._thread is not None:
+            self._thread.join()
+
+
+class _SequenceChecker(object):
+    """Counts packets missing from a stream of sequence numbers.
+
+    The numbers wrap around after 255. One up to :data:`_REORDER_WINDOW`
+    behind the expected number is taken as a packet arriving late: it no
+    longer counts as lost and the expected number stays where it is.
+    """
+
+    def __init__(self):
+        self.expected = None
+        #: Number of packets which never arrived
+        self.lost = 0
+        #: Number of packets which arrived after a later one
+        self.reordered = 0
+
+    def check(self, seq):
+        if self.expected is not None and seq != self.expected:
+            ahead = (seq - self.expected) & 0xFF
+            if ahead > 0x100 - _REORDER_WINDOW:
+                logger.debug("Packet %d arrived late, expected %d", seq, self.expected)
+                self.reordered += 1
+                if self.lost:
+                    self.lost -= 1
+                return
+            logger.debug("Packet sequence jumped from %d to %d", self.expected, seq)
+            self.lost += ahead
+        self.expected = (seq + 1) & 0xFF
+
+
+def _parse_address(channel):
+    host, _, port = channel.rpartition(':')
+    if not host or not port:
+        raise ValueError("Expected a channel of the form host:port, not {!r}".format(channel))
+    return host, int(port)
+
+
+class NetworkBus(BusABC):
+
+    def __init__(self, channel, protocol='udp', coalesce_time=0.0, max_frames=None, check_sequence=True,
+                 **kwargs):
+        """Connects to a :class:`NetworkServer`, or any cannelloni peer.
+
+        Sent messages are packed into as few packets as possible: a call to
+        :meth:`send_batch` fills packets up to the Ethernet MTU, and with a
+        `coalesce_time` messages from separate calls wait up to that long to
+        share a packet. Received messages are timestamped on arrival, since
+        the packet format carries no timestamps.
+
+        Each packet carries an 8 bit sequence number. With `check_sequence`
+        gaps in the received numbers are counted in :attr:`lost_packets`,
+        which for UDP shows how many frames the network dropped. Packets
+        which arrive late fill in their gap again.
+
+        :param str channel: The server address as ``host:port``.
+        :param str protocol: ``'udp'`` or ``'tcp'``.
+        :param float coalesce_time:
+            Seconds a sent message may wait for others to share its packet.
+        :param int max_frames: The most frames in one packet.
+        :param bool check_sequence: Count gaps in the received sequence numbers.
+        """
+        if protocol not in ('udp', 'tcp'):
+            raise ValueError("protocol must be 'udp' or 'tcp', not {!r}".format(protocol))
+        address = _parse_address(channel)
+        self.channel = channel
+        self.channel_info = "cannelloni {} {}".format(protocol, channel)
+        self.protocol = protocol
+        self.check_sequence = check_sequence
+        self._sequence = _SequenceChecker()
+        self._received = deque()
+        self._buffer = bytearray()
+
+        if protocol == 'udp':
+            self.socket = socket.socket(socket.AF_INET, socket.SOCK_DGRAM)
+            self.socket.setsockopt(socket.SOL_SOCKET, socket.SO_RCVBUF, UDP_RECEIVE_BUFFER)
+            self.socket.connect(address)
+            max_packet_size = UDP_MAX_PACKET
+        else:
+            self.socket = socket.create_connection(address)
+            self.socket.setsockopt(socket.IPPROTO_TCP, socket.TCP_NODELAY, 1)
+            max_packet_size = TCP_MAX_PACKET
+        self._coalescer = _Coalescer(self.socket.send, coalesce_time, max_packet_size, max_frames)
+        if protocol == 'udp':
+            # An empty packet registers this client with the server
+            self.socket.send(encode_packet(0, []))
+        super(NetworkBus, self).__init__()
+
+    @property
+    def lost_packets(self):
+        """Number of packets missing from the received sequence numbers."""
+        return self._sequence.lost
+
+    def _receive_packets(self, timeout):
+        """Wait up to `timeout` for data and queue the messages it holds."""
+        ready, _, _ = select.select([self.socket], [], [], timeout)
+        if not ready:
+            return
+        if self.protocol == 'udp':
+            data = self.socket.recv(65535)
+            offset = 0
+        else:
+            data = self.socket.recv(TCP_MAX_PACKET)
+            if not data:
+                raise can.CanError("{} was closed by the server".format(self.channel_info))
+            self._buffer += data
+            data = self._buffer
+            offset = 0
+        while True:
+            try:
+                packet = decode_packet(data, offset, self.channel)
+            except can.CanError as error:
+                # Peers may send other packet types, which mustn't stop reception
+                if self.protocol == 'udp':
+                    logger.warning("Dropping a packet from %s: %s", self.channel_info, error)
+                    return
+                # The rest of the stream can't be framed any more
+                logger.warning("Dropping %d bytes from %s: %s", len(data) - offset, self.channel_info, error)
+                offset = len(data)
+                break
+            if packet is None:
+                break
+            seq, messages, offset = packet
+            # An empty packet is a keepalive or registration, not part of the sequence
+            if self.check_sequence and messages:
+                self._sequence.check(seq)
+            self._received.extend(messages)
+            if self.protocol == 'udp':
+                break
+        if self.protocol == 'tcp':
+            del self._buffer[:offset]
+
+    def recv(self, timeout=None):
+        messages = self.recv_batch(1, timeout)
+        if messages:
+            return messages[0]
+        return None
+
+    def recv_batch(self, max_count=64, timeout=None):
+        received = self._received
+        if not received:
+            end_time = None if timeout is None else time.time() + timeout
+            while not received:
+                remaining = None if end_time is None else max(0, end_time - time.time())
+                self._receive_packets(remaining)
+                if end_time is not None and time.time() >= end_time:
+                    break
+        popleft = received.popleft
+        return [popleft() for _ in range(min(max_count, len(received)))]
+
+    def send(self, msg):
+        self._coalescer.add((encode_frame(msg),))
+
+    def send_batch(self, messages):
+        self._coalescer.add([encode_frame(msg) for msg in messages])
+
+    def flush(self):
+        """Send any messages waiting for their packet to fill."""
+        self._coalescer.flush()
+
+    def fileno(self):
+        return self.socket.fileno()
+
+    def shutdown(self):
+        self._coalescer.stop()
+        self.socket.close()
+        super(NetworkBus, self).shutdown()
+
+
+class NetworkServer(object):
+    """Makes a bus available to :class:`NetworkBus` clients.
+
+    Every message received from the bus is sent to all clients, and messages
+    from any client are sent to the bus. UDP clients are remembered from the
+    first packet they send.
+
+        >>> server = NetworkServer(bus, port=20000, protocol='tcp')
+        ...
+        >>> server.stop()
+    """
+
+    def __init__(self, bus, port, host='', protocol='udp', coalesce_time=0.001, max_frames=None,
+                 max_batch=64):
+        """
+        :param bus: The :class:`~can.BusABC` to serve.
+        :param int port: The port to listen on, 0 picks a free one.
+        :param str host: The address to listen on, by default all of them.
+        :param str protocol: ``'udp'`` or ``'tcp'``.
+        :param float coalesce_time:
+            Seconds a message from the bus may wait for others to share its
+            packet.
+        :param int max_frames: The most frames in one packet.
+        :param int max_batch: The most messages read from the bus in one go.
+        """
+        if protocol not in ('udp', 'tcp'):
+            raise ValueError("protocol must be 'udp' or 'tcp', not {!r}".format(protocol))
+        self.bus = bus
+        self.protocol = protocol
+        self.max_batch = max_batch
+        self._clients = []
+        self._clients_lock = threading.Lock()
+        self._buffers = {}
+        #: Number of packets missing from the clients' sequence numbers
+        self.lost_packets = 0
+        self._sequences = {}
+
+        if protocol == 'udp':
+            self.socket = socket.socket(socket.AF_INET, socket.SOCK_DGRAM)
+            self.socket.setsockopt(socket.SOL_SOCKET, socket.SO_RCVBUF, UDP_RECEIVE_BUFFER)
+            max_packet_size = UDP_MAX_PACKET
+        else:
+            self.socket = socket.socket(socket.AF_INET, socket.SOCK_STREAM)
+            self.socket.setsockopt(socket.SOL_SOCKET, socket.SO_REUSEADDR, 1)
+            max_packet_size = TCP_MAX_PACKET
+        self.socket.bind((host, port))
+        if protocol == 'tcp':
+            self.socket.listen(5)
+        #: The address the server listens on
+        self.address = self.socket.getsockname()
+        self._coalescer = _Coalescer(self._send_to_clients, coalesce_time, max_packet_size, max_frames)
+
+        self.running = threading.Event()
+        self.running.set()
+        self._threads = [threading.Thread(target=self._bus_thread),
+                         threading.Thread(target=self._network_thread)]
+        for thread in self._threads:
+            thread.daemon = True
+            thread.start()
+
+    def _send_to_clients(self, packet):
+        with self._clients_lock:
+            clients = list(self._clients)
+        for client in clients:
+            try:
+                if self.protocol == 'udp':
+                    self.socket.sendto(packet, client)
+                else:
+                    client.sendall(packet)
+            except socket.error as error:
+                logger.warning("Dropping client %s: %s", client, error)
+                self._drop(client)
+
+    def _drop(self, client):
+        with self._clients_lock:
+            if client in self._clients:
+                self._clients.remove(client)
+        self._buffers.pop(client, None)
+        self._sequences.pop(client, None)
+        if self.protocol == 'tcp':
+            client.close()
+
+    def _bus_thread(self):
+        while self.running.is_set():
+            messages = self.bus.recv_batch(self.max_batch, timeout=_POLL_INTERVAL)
+            if messages:
+                self._coalescer.add([encode_frame(msg) for msg in messages])
+
+    def _received(self, client, seq, messages):
+        if not messages:
+            return
+        checker = self._sequences.setdefault(client, _SequenceChecker())
+        lost = checker.lost
+        checker.check(seq)
+        self.lost_packets += checker.lost - lost
+        self.bus.send_batch(messages)
+
+    def _network_thread(self):
+        while self.running.is_set():
+            with self._clients_lock:
+                sockets = [self.socket] + (self._clients if self.protocol == 'tcp' else [])
+            try:
+                ready, _, _ = select.select(sockets, [], [], _POLL_INTERVAL)
+            except (ValueError, socket.error):
+                # A socket was closed while waiting
+                continue
+            for sock in ready:
+                try:
+                    if self.protocol == 'udp':
+                        self._read_datagram()
+                    elif sock is self.socket:
+                        self._accept()
+                    else:
+                        self._read_stream(sock)
+                except can.CanError as error:
+                    logger.warning("Discarding data from a client: %s", error)
+                    if self.protocol == 'tcp':
+                        # The rest of the stream can't be framed any more
+                        self._drop(sock)
+
+    def _read_datagram(self):
+        data, client = self.socket.recvfrom(65535)
+        with self._clients_lock:
+            if client not in self._clients:
+                logger.info("New client %s:%d", *client)
+                self._clients.append(client)
+        packet = decode_packet(data)
+        if packet is not None:
+            self._received(client, packet[0], packet[1])
+
+    def _accept(self):
+        client, address = self.socket.accept()
+        client.setsockopt(socket.IPPROTO_TCP, socket.TCP_NODELAY, 1)
+        # A client which stops reading is dropped rather than holding up the rest
+        client.settimeout(_CLIENT_SEND_TIMEOUT)
+        logger.info("New client %s:%d", *address)
+        self._buffers[client] = bytearray()
+        with self._clients_lock:
+            self._clients.append(client)
+
+    def _read_stream(self, client):
+        try:
+            data = client.recv(TCP_MAX_PACKET)
+        except socket.error:
+            data = b''
+        if not data:
+            logger.info("Client disconnected")
+            self._drop(client)
+            return
+        buffer = self._buffers.get(client)
+        if buffer is None:
+            return
+        buffer += data
+        offset = 0
+        while True:
+            packet = decode_packet(buffer, offset)
+            if packet is None:
+                break
+            seq, messages, offset = packet
+            self._received(client, seq, messages)
+        del buffer[:offset]
+
+    def stop(self):
+        """Stop serving and disconnect the clients. The bus is left open."""
+        self.running.clear()
+        for thread in self._threads:
+            thread.join()
+        self._coalescer.stop()
+        with self._clients_lock:
+            clients, self._clients = self._clients, []
+        if self.protocol == 'tcp':
+            for client in clients:
+                client.close()
+        self.socket.close()
@@ -64,9 +64,23 @@ class PcanBus(BusABC):
             return stsReturn[1]
 
     def recv(self, timeout=None):
-        rx_msg = Message()
-
         log.debug("Trying to read a msg")
+        return self._read()
+
+    def recv_batch(self, max_count=64, timeout=None):
+        """Read from the driver's receive queue until it is empty or
+        `max_count` messages have been read.
+        """
+        messages = []
+        while len(messages) < max_count:
+            rx_msg = self._read()
+            if rx_msg is None:
+                break
+            messages.append(rx_msg)
+        return messages
+
+    def _read(self):
+        rx_msg = Message()
 
         result = self.m_objPCANBasic.Read(self.m_PcanHandle)
         if result[0] == PCAN_ERROR_QRCVEMPTY or result[0] == PCAN_ERROR_BUSLIGHT or result[0] == PCAN_ERROR_BUSHEAVY:
@@ -0,0 +1,116 @@
+"""
+A bus which reads its messages from a recorded log file, so code written
+against a live bus can be run on a capture.
+
+    bus = can.interface.Bus('trace.asc', bustype='replay')
+
+"""
+import itertools
+import logging
+import threading
+
+from can.bus import BusABC
+from can.CAN import LogReader
+from can.notifier import filter_matcher
+from can.util import clock
+
+logger = logging.getLogger('can.replay')
+
+
+class ReplayBus(BusABC):
+
+    def __init__(self, channel, realtime=False, speed=1.0, can_filters=None, **kwargs):
+        """Serves the messages of a log file as though they were received.
+
+        Messages keep their recorded timestamps. By default each
+        :meth:`recv` returns the next message straight away, so a capture is
+        processed as fast as the consumer can go. In `realtime` mode
+        messages are held back until the recorded gap since the first one
+        has elapsed.
+
+        Once the log is exhausted the bus behaves like a quiet bus and
+        :attr:`finished` is set. Messages sent to the bus are discarded.
+
+        :param str channel:
+            The log file to read, any format :class:`can.LogReader` opens.
+        :param bool realtime:
+            Deliver messages with their recorded timing.
+        :param float speed:
+            Playback speed in realtime mode, 2.0 is twice as fast as recorded.
+        :param list can_filters:
+            A list of dictionaries each containing a "can_id" and a "can_mask".
+            Only matching messages are delivered.
+        """
+        self.channel_info = "Replay of " + channel
+        self.realtime = realtime
+        self.speed = speed
+        self.can_filters = can_filters
+        #: Set once every message of the log has been received
+        self.finished = False
+
+        self._messages = self._selected(iter(LogReader(channel)))
+        self._pending = None
+        self._start = None
+        self._origin = None
+        self._shutdown = threading.Event()
+        super(ReplayBus, self).__init__()
+
+    def _selected(self, messages):
+        wanted = filter_matcher(self.can_filters)
+        if wanted is None:
+            return messages
+        return (msg for msg in messages if wanted(msg.arbitration_id))
+
+    def _next(self):
+        """Return the next message, None once the log is exhausted."""
+        if self._pending is not None:
+            msg, self._pending = self._pending, None
+            return msg
+        msg = next(self._messages, None)
+        if msg is None and not self.finished:
+            logger.debug("Reached the end of %s", self.channel_info)
+            self.finished = True
+        return msg
+
+    def _wait_at_end(self, timeout):
+        self._shutdown.wait(timeout)
+        return None
+
+    def recv(self, timeout=None):
+        msg = self._next()
+        if msg is None:
+            return self._wait_at_end(timeout)
+        if not self.realtime:
+            return msg
+
+        if self._start is None:
+            self._start = clock()
+            self._origin = msg.timestamp
+        delay = self._start + (msg.timestamp - self._origin) / self.speed - clock()
+        if delay > 0:
+            if timeout is not None and timeout < delay:
+                # Not due yet, keep it for the next call
+                self._pending = msg
+                self._shutdown.wait(timeout)
+                return None
+            self._shutdown.wait(delay)
+        return msg
+
+    def recv_batch(self, max_count=64, timeout=None):
+        if self.realtime:
+            return super(ReplayBus, self).recv_batch(max_count, timeout)
+        messages = []
+        if self._pending is not None:
+            messages.append(self._next())
+        messages.extend(itertools.islice(self._messages, max_count - len(messages)))
+        if not messages:
+            self.finished = True
+            self._wait_at_end(timeout)
+        return messages
+
+    def send(self, msg):
+        logger.debug("Discarding message sent to %s: %s", self.channel_info, msg)
+
+    def shutdown(self):
+        self._shutdown.set()
+        super(ReplayBus, self).shutdown()
@@ -67,3 +67,16 @@ class SerialBus(BusABC):
 
         else:
             return None
+
+    def recv_batch(self, max_count=64, timeout=None):
+        """Read one message, then keep reading while the serial port has
+        buffered bytes waiting.
+        """
+        messages = []
+        while len(messages) < max_count:
+            msg = self._get_message(timeout)
+            if msg is not None:
+                messages.append(msg)
+            if not self.ser.inWaiting():
+                break
+        return messages
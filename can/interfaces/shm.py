@@ -0,0 +1,187 @@
+"""
+A bus backed by a ring buffer in a shared memory mapped file, which lets
+one process hand frames to any number of others without serialising each
+one.
+
+The producer creates the ring and is the only bus that can send on it::
+
+    ring = can.interface.Bus('/dev/shm/can0_ring', bustype='shm', create=True)
+    source = can.interface.Bus('can0', bustype='socketcan')
+    while True:
+        ring.send_batch(source.recv_batch())
+
+Consumers, in this or other processes, open it by the same path and each
+read at their own pace::
+
+    bus = can.interface.Bus('/dev/shm/can0_ring', bustype='shm')
+    for msg in bus:
+        decode(msg)
+
+"""
+import logging
+import mmap
+import struct
+import time
+
+import can
+from can.bus import BusABC
+from can.batch import message_flags
+from can.CAN import _binary_record, _record_to_message
+from can.notifier import filter_matcher
+
+logger = logging.getLogger('can.shm')
+
+RING_MAGIC = b'PYCANSHM'
+RING_VERSION = 1
+
+# magic, version, payload size, capacity, slot size
+_ring_header = struct.Struct('<8sHHII')
+# Offset of the u64 count of records written so far
+_WRITE_SEQ_OFFSET = 32
+# Records start after a header padded to a cache line
+_RING_HEADER_SIZE = 64
+
+# Each slot starts with a u64 marker: 0 while the producer writes the slot,
+# otherwise one more than the sequence number of the record it holds.
+_marker = struct.Struct('<Q')
+
+
+class SharedMemoryBus(BusABC):
+
+    def __init__(self, channel, create=False, capacity=65536, payload_size=8, poll_interval=0.0005,
+                 can_filters=None, **kwargs):
+        """Opens a shared memory ring, creating it if `create` is set.
+
+        The ring holds the last `capacity` frames as fixed size records.
+        Each consumer keeps its own read position and starts with the next
+        frame written after it opened the ring. A consumer which falls more
+        than `capacity` frames behind skips the frames it missed and counts
+        them in :attr:`overruns`.
+
+        There is no cross process wakeup, so a waiting :meth:`recv` checks
+        the ring every `poll_interval` seconds.
+
+        :param str channel:
+            Path of the file backing the ring, preferably on a tmpfs such as
+            ``/dev/shm``.
+        :param bool create:
+            Create (or reset) the ring and become its producer.
+        :param int capacity: Number of frames the ring holds, when creating it.
+        :param int payload_size: 8, or 64 for CAN FD, when creating the ring.
+        :param float poll_interval: Seconds between checks for new frames.
+        :param list can_filters:
+            A list of dictionaries each containing a "can_id" and a "can_mask".
+            Only matching messages are received by this consumer.
+        """
+        self.channel_info = "Shared memory ring " + channel
+        self.poll_interval = poll_interval
+        self.is_producer = create
+        #: Number of frames this consumer missed because the producer overwrote them
+        self.overruns = 0
+        self._wants = filter_matcher(can_filters)
+
+        if create:
+            if payload_size not in (8, 64):
+                raise ValueError("payload_size must be 8 or 64, not {}".format(payload_size))
+            record = _binary_record(payload_size)
+            # Keep each slot's marker 8 byte aligned
+            slot_size = (_marker.size + record.size + 7) // 8 * 8
+            self._file = open(channel, 'w+b')
+            self._file.truncate(_RING_HEADER_SIZE + capacity * slot_size)
+            self._map = mmap.mmap(self._file.fileno(), 0)
+            _ring_header.pack_into(self._map, 0, RING_MAGIC, RING_VERSION, payload_size, capacity, slot_size)
+        else:
+            self._file = open(channel, 'rb')
+            self._map = mmap.mmap(self._file.fileno(), 0, access=mmap.ACCESS_READ)
+            magic, version, payload_size, capacity, slot_size = _ring_header.unpack_from(self._map)
+            if magic != RING_MAGIC or version != RING_VERSION:
+                raise can.CanError("{} is not a shared memory ring".format(channel))
+            record = _binary_record(payload_size)
+
+        self.capacity = capacity
+        self.payload_size = payload_size
+        self._record = record
+        self._slot_size = slot_size
+        #: Sequence number of the next frame to write (producer) or read (consumer)
+        self.cursor = _marker.unpack_from(self._map, _WRITE_SEQ_OFFSET)[0]
+        super(SharedMemoryBus, self).__init__()
+
+    def _slot_offset(self, seq):
+        return _RING_HEADER_SIZE + (seq % self.capacity) * self._slot_size
+
+    def send(self, msg):
+        self.send_batch((msg,))
+
+    def send_batch(self, messages):
+        if not self.is_producer:
+            raise can.CanError("Only the bus which created the ring can send to it")
+        ring = self._map
+        pack_marker = _marker.pack_into
+        pack_record = self._record.pack_into
+        payload_size = self.payload_size
+        seq = self.cursor
+        for msg in messages:
+            if len(msg.data) > payload_size:
+                raise ValueError("Can't store {} data bytes in a ring with a payload size of {}".format(
+                    len(msg.data), payload_size))
+            offset = self._slot_offset(seq)
+            # Invalidate the slot, fill it, then publish it under its new sequence number
+            pack_marker(ring, offset, 0)
+            pack_record(ring, offset + _marker.size, msg.timestamp, msg.arbitration_id,
+                        message_flags(msg), msg.dlc, bytes(msg.data))
+            seq += 1
+            pack_marker(ring, offset, seq)
+            pack_marker(ring, _WRITE_SEQ_OFFSET, seq)
+        self.cursor = seq
+
+    def _read(self, max_count):
+        ring = self._map
+        unpack_marker = _marker.unpack_from
+        unpack_record = self._record.unpack_from
+        written = unpack_marker(ring, _WRITE_SEQ_OFFSET)[0]
+        cursor = self.cursor
+        if written - cursor > self.capacity:
+            missed = written - self.capacity - cursor
+            logger.warning("%s: consumer fell behind, skipping %d frames", self.channel_info, missed)
+            self.overruns += missed
+            cursor += missed
+
+        wants = self._wants
+        messages = []
+        while cursor < written and len(messages) < max_count:
+            offset = self._slot_offset(cursor)
+            cursor += 1
+            # The slot must hold this record both before and after reading
+            # it, otherwise the producer has overwritten it meanwhile.
+            before = unpack_marker(ring, offset)[0]
+            fields = unpack_record(ring, offset + _marker.size)
+            if before != cursor or unpack_marker(ring, offset)[0] != cursor:
+                self.overruns += 1
+            elif wants is None or wants(fields[1]):
+                messages.append(_record_to_message(*fields))
+        self.cursor = cursor
+        return messages
+
+    def recv(self, timeout=None):
+        messages = self.recv_batch(1, timeout)
+        if messages:
+            return messages[0]
+        return None
+
+    def recv_batch(self, max_count=64, timeout=None):
+        if self.is_producer:
+            raise can.CanError("The producer of a shared memory ring can't receive from it")
+        messages = self._read(max_count)
+        if messages or timeout == 0:
+            return messages
+        end_time = None if timeout is None else time.time() + timeout
+        while True:
+            time.sleep(self.poll_interval)
+            messages = self._read(max_count)
+            if messages or (end_time is not None and time.time() >= end_time):
+                return messages
+
+    def shutdown(self):
+        self._map.close()
+        self._file.close()
+        super(SharedMemoryBus, self).shutdown()
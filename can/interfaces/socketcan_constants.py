@@ -8,10 +8,13 @@ canMSG_EXT = 0x0004
 # BCM opcodes
 CAN_BCM_TX_SETUP = 1
 CAN_BCM_TX_DELETE = 2
+CAN_BCM_RX_SETUP = 5
+CAN_BCM_RX_DELETE = 6
 
 CAN_BCM_TX_EXPIRED = 9
 
 CAN_BCM_RX_TIMEOUT = 11
+CAN_BCM_RX_CHANGED = 12
 
 
 # BCM flags
@@ -40,6 +43,10 @@ CAN_RAW_LOOPBACK      = 3
 CAN_RAW_RECV_OWN_MSGS = 4
 CAN_RAW_FD_FRAMES     = 5
 
+# struct canfd_frame flags
+CANFD_BRS = 0x01
+CANFD_ESI = 0x02
+
 MSK_ARBID =     0x1FFFFFFF
 MSK_FLAGS =     0xE0000000
 
@@ -49,6 +56,14 @@ SOCK_DGRAM =    2
 SOCK_MAC = 		4
 AF_CAN =        PF_CAN
 
+MSG_DONTWAIT =  0x40
+
+# SOL_SOCKET options for receive timestamps delivered as ancillary data
+SO_TIMESTAMP =      29
+SO_TIMESTAMPNS =    35
+SCM_TIMESTAMP =     SO_TIMESTAMP
+SCM_TIMESTAMPNS =   SO_TIMESTAMPNS
+
 SIOCGIFINDEX =  0x8933
 SIOCGSTAMP =    0x8906
 EXTFLG =        0x0004
@@ -3,6 +3,7 @@ import sys
 import ctypes
 import logging
 import select
+import time
 
 from ctypes.util import find_library
 
@@ -10,7 +11,7 @@ import can
 from can.interfaces.socketcan_constants import *  # CAN_RAW
 from can.bus import BusABC
 from can.message import Message
-from can.broadcastmanager import CyclicSendTaskABC, MultiRateCyclicSendTaskABC
+from can.broadcastmanager import CyclicSendTaskABC, MultiRateCyclicSendTaskABC, ReceiveFilterTaskABC
 
 # Set up logging
 log = logging.getLogger('can.socketcan.ctypes')
@@ -44,6 +45,9 @@ class SocketscanCtypes_Bus(BusABC):
 
         super(SocketscanCtypes_Bus, self).__init__(*args, **kwargs)
 
+    def fileno(self):
+        return self.socket
+
     def recv(self, timeout=None):
 
         log.debug("Trying to read a msg")
@@ -55,27 +59,49 @@ class SocketscanCtypes_Bus(BusABC):
             # socket wasn't readable or timeout occurred
             return None
 
+        if packet is None:
+            return None
+
         log.debug("Receiving a message")
+        return _packet_to_message(packet)
 
-        arbitration_id = packet['CAN ID'] & MSK_ARBID
+    def recv_batch(self, max_count=64, timeout=None):
+        """Wait for the socket to become readable once, then read frames
+        without blocking until the kernel queue is empty or `max_count`
+        frames have been read.
+        """
+        if timeout is not None and len(select.select([self.socket],
+                                                     [], [], timeout)[0]) == 0:
+            return []
+
+        messages = []
+        packet = capturePacket(self.socket)
+        while packet is not None:
+            messages.append(_packet_to_message(packet))
+            if len(messages) >= max_count:
+                break
+            packet = capturePacket(self.socket, MSG_DONTWAIT)
+        return messages
 
-        # Flags: EXT, RTR, ERR
-        flags = (packet['CAN ID'] & MSK_FLAGS) >> 29
+    def send(self, msg):
+        return sendPacket(self.socket, msg)
 
-        rx_msg = Message(
-            timestamp=packet['Timestamp'],
-            is_remote_frame=bool(flags & SKT_RTRFLG),
-            extended_id=bool(flags & EXTFLG),
-            is_error_frame=bool(flags & SKT_ERRFLG),
-            arbitration_id=arbitration_id,
-            dlc=packet['DLC'],
-            data=packet['Data']
-        )
 
-        return rx_msg
+def _packet_to_message(packet):
+    arbitration_id = packet['CAN ID'] & MSK_ARBID
 
-    def send(self, msg):
-        return sendPacket(self.socket, msg)
+    # Flags: EXT, RTR, ERR
+    flags = (packet['CAN ID'] & MSK_FLAGS) >> 29
+
+    return Message(
+        timestamp=packet['Timestamp'],
+        is_remote_frame=bool(flags & SKT_RTRFLG),
+        extended_id=bool(flags & EXTFLG),
+        is_error_frame=bool(flags & SKT_ERRFLG),
+        arbitration_id=arbitration_id,
+        dlc=packet['DLC'],
+        data=packet['Data']
+    )
 
 
 log.debug("Loading libc with ctypes...")
@@ -295,13 +321,17 @@ def sendPacket(socket, message):
     return bytes_sent
 
 
-def capturePacket(socketID):
+def capturePacket(socketID, flags=0):
     """
     Captures a packet of data from the given socket.
 
     :param int socketID:
         The socket to read from
 
+    :param int flags:
+        Flags passed on to ``recv``, e.g. ``MSG_DONTWAIT`` to return None
+        rather than block when no frame is queued.
+
     :return:
         A dictionary with the following keys:
         +-----------+----------------------------+
@@ -314,6 +344,7 @@ def capturePacket(socketID):
         |'Timestamp'|   float                    |
         +-----------+----------------------------+
 
+        or None if no frame could be read.
     """
     packet = {}
 
@@ -321,7 +352,10 @@ def capturePacket(socketID):
     time = TIME_VALUE()
 
     # Fetching the Arb ID, DLC and Data
-    bytes_read = libc.read(socketID, ctypes.byref(frame), ctypes.sizeof(frame))
+    bytes_read = libc.recv(socketID, ctypes.byref(frame), ctypes.sizeof(frame), flags)
+    if bytes_read < 0:
+        log.debug('Captured no data')
+        return None
 
     # Fetching the timestamp
     error = libc.ioctl(socketID, SIOCGSTAMP, ctypes.byref(time))
@@ -470,6 +504,113 @@ class MultiRateCyclicSendTask(CyclicSendTask):
         if bytes_sent == -1:
             logging.debug("Error sending frame :-/")
 
+class ReceiveFilterTask(SocketCanCtypesBCMBase, ReceiveFilterTaskABC):
+
+    def __init__(self, channel, can_id, data_mask=None, timeout=0.0, throttle=0.0, **kwargs):
+        """
+        :param channel: The name of the CAN channel to connect to.
+        :param can_id: The arbitration id to subscribe to.
+
+        See :class:`can.broadcastmanager.ReceiveFilterTaskABC` for the other
+        parameters.
+        """
+        super(ReceiveFilterTask, self).__init__(channel, can_id, data_mask, timeout, throttle, **kwargs)
+        self._rx_setup()
+
+    def _bcm_can_id(self):
+        if self.extended_id:
+            return self.can_id | 0x80000000
+        return self.can_id
+
+    def _rx_setup(self):
+        msg_frame = CAN_FRAME()
+        msg_frame.can_id = self._bcm_can_id()
+        flags = 0
+        if self.timeout > 0 or self.throttle > 0:
+            flags |= SETTIMER | STARTTIMER
+        if self.data_mask is None:
+            # No content filtering, just timeout monitoring and throttling
+            flags |= RX_FILTER_ID
+            nframes = 0
+        else:
+            if self.check_dlc:
+                flags |= RX_CHECK_DLC
+            mask = bytearray(self.data_mask)
+            msg_frame.can_dlc = len(mask)
+            msg_frame.data[:len(mask)] = mask
+            nframes = 1
+
+        frame = _create_bcm_frame(opcode=CAN_BCM_RX_SETUP,
+                                  flags=flags,
+                                  count=0,
+                                  ival1_seconds=int(self.timeout),
+                                  ival1_usec=int(1e6 * (self.timeout - int(self.timeout))),
+                                  ival2_seconds=int(self.throttle),
+                                  ival2_usec=int(1e6 * (self.throttle - int(self.throttle))),
+                                  can_id=msg_frame.can_id,
+                                  nframes=nframes,
+                                  msg_frame=msg_frame)
+
+        # Without a frame only the header is sent
+        size = ctypes.sizeof(frame) if nframes else BCM_HEADER.frames.offset
+        log.info("Sending BCM RX_SETUP command")
+        bytes_sent = libc.send(self.bcm_socket, ctypes.byref(frame), size, 0)
+        if bytes_sent == -1:
+            log.error("Error sending RX_SETUP to the broadcast manager")
+
+    def recv(self, timeout=None):
+        end_time = None if timeout is None else time.time() + timeout
+        frame = BCM_HEADER()
+        while True:
+            remaining = None if end_time is None else max(0, end_time - time.time())
+            if len(select.select([self.bcm_socket], [], [], remaining)[0]) == 0:
+                return None
+
+            bytes_read = libc.recv(self.bcm_socket, ctypes.byref(frame), ctypes.sizeof(frame), 0)
+            if bytes_read < 0:
+                return None
+
+            if frame.opcode == CAN_BCM_RX_TIMEOUT:
+                self._handle_timeout()
+            elif frame.opcode == CAN_BCM_RX_CHANGED and bytes_read == ctypes.sizeof(frame):
+                time_value = TIME_VALUE()
+                if libc.ioctl(self.bcm_socket, SIOCGSTAMP, ctypes.byref(time_value)) < 0:
+                    timestamp = time.time()
+                else:
+                    timestamp = time_value.tv_sec + (time_value.tv_usec / 1000000.0)
+                can_frame = frame.frames
+                return _packet_to_message({
+                    'CAN ID': can_frame.can_id,
+                    'DLC': can_frame.can_dlc,
+                    'Data': [can_frame.data[i] for i in range(can_frame.can_dlc)],
+                    'Timestamp': timestamp,
+                })
+            else:
+                log.debug("Ignoring BCM opcode %d", frame.opcode)
+
+    def start(self):
+        self._rx_setup()
+
+    def stop(self):
+        """Send a RX_DELETE message to remove this subscription."""
+        frame = _create_bcm_frame(
+            opcode=CAN_BCM_RX_DELETE,
+            flags=0,
+            count=0,
+            ival1_seconds=0,
+            ival1_usec=0,
+            ival2_seconds=0,
+            ival2_usec=0,
+            can_id=self._bcm_can_id(),
+            nframes=0,
+            msg_frame=CAN_FRAME()
+        )
+
+        bytes_sent = libc.send(self.bcm_socket, ctypes.byref(frame), BCM_HEADER.frames.offset, 0)
+        if bytes_sent == -1:
+            logging.debug("Error sending RX_DELETE to the broadcast manager")
+
+
 if __name__ == "__main__":
     socket_id = createSocket(CAN_RAW)
     print("Created socket (id = {})".format(socket_id))
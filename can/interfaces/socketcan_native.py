@@ -9,8 +9,9 @@ import socket
 import fcntl
 import struct
 import logging
-from collections import namedtuple
+from collections import namedtuple, deque
 import select
+import time
 
 log = logging.getLogger('can.socketcan.native')
 #log.setLevel(logging.DEBUG)
@@ -25,12 +26,27 @@ except:
 
 from can import Message
 from can.interfaces.socketcan_constants import *  # CAN_RAW
+from can.util import dlc2len, len2dlc
 from ..bus import BusABC
 
-from ..broadcastmanager import CyclicSendTaskABC
+from ..broadcastmanager import CyclicSendTaskABC, ReceiveFilterTaskABC
 
 can_frame_fmt = "=IB3x8s"
 can_frame_size = struct.calcsize(can_frame_fmt)
+can_frame_struct = struct.Struct(can_frame_fmt)
+
+canfd_frame_fmt = "=IBB2x64s"
+canfd_frame_size = struct.calcsize(canfd_frame_fmt)
+canfd_frame_struct = struct.Struct(canfd_frame_fmt)
+
+bcm_header_fmt = "@IIIllllII"
+bcm_header_size = struct.calcsize(bcm_header_fmt)
+bcm_frames_offset = (bcm_header_size + 7) & ~7
+
+# struct timeval and struct timespec, as delivered with SCM_TIMESTAMP(NS)
+timeval_fmt = "@ll"
+timeval_size = struct.calcsize(timeval_fmt)
+ancillary_data_size = socket.CMSG_SPACE(timeval_size)
 
 
 def build_can_frame(can_id, data):
@@ -52,6 +68,33 @@ def build_can_frame(can_id, data):
     return struct.pack(can_frame_fmt, can_id, can_dlc, data)
 
 
+def build_canfd_frame(can_id, data, flags=0):
+    """ CAN FD frame packing (see 'struct canfd_frame' in <linux/can.h>)
+    /**
+     * struct canfd_frame - CAN flexible data rate frame structure
+     * @can_id: CAN ID of the frame and CAN_*_FLAG flags, see canid_t definition
+     * @len:    frame payload length in byte (0 .. CANFD_MAX_DLEN)
+     * @flags:  additional flags for CAN FD
+     * @__res0: reserved / padding
+     * @__res1: reserved / padding
+     * @data:   CAN FD frame payload (up to CANFD_MAX_DLEN byte)
+     */
+    struct canfd_frame {
+        canid_t can_id;
+        __u8    len;
+        __u8    flags;
+        __u8    __res0;
+        __u8    __res1;
+        __u8    data[CANFD_MAX_DLEN] __attribute__((aligned(8)));
+    };
+
+    The payload is zero padded up to the next valid CAN FD length.
+    """
+    length = dlc2len(len2dlc(len(data)))
+    data = bytes(data).ljust(64, b'\x00')
+    return canfd_frame_struct.pack(can_id, length, flags, data)
+
+
 def build_bcm_header(opcode, flags, count, ival1_seconds, ival1_usec, ival2_seconds, ival2_usec, can_id, nframes):
     # == Must use native not standard types for packing ==
     # struct bcm_msg_head {
@@ -61,18 +104,19 @@ def build_bcm_header(opcode, flags, count, ival1_seconds, ival1_usec, ival2_seco
     #     struct timeval ival1, ival2; ->  llll ...
     #     canid_t can_id; -> I
     #     __u32 nframes; -> I
-    bcm_cmd_msg_fmt = "@IIIllllII"
-
-    return struct.pack(bcm_cmd_msg_fmt,
-                       opcode,
-                       flags,
-                       count,
-                       ival1_seconds,
-                       ival1_usec,
-                       ival2_seconds,
-                       ival2_usec,
-                       can_id,
-                       nframes)
+    #
+    # The frames following the header are aligned to 8 bytes.
+    header = struct.pack(bcm_header_fmt,
+                         opcode,
+                         flags,
+                         count,
+                         ival1_seconds,
+                         ival1_usec,
+                         ival2_seconds,
+                         ival2_usec,
+                         can_id,
+                         nframes)
+    return header.ljust(bcm_frames_offset, b'\x00')
 
 
 def build_bcm_tx_delete_header(can_id):
@@ -89,12 +133,6 @@ def build_bcm_transmit_header(can_id, count, initial_period, subsequent_period):
         # Note `TX_COUNTEVT` creates the message TX_EXPIRED when count expires
         flags |= TX_COUNTEVT
 
-    def split_time(value):
-        """Given seconds as a float, return whole seconds and microseconds"""
-        seconds = int(value)
-        microseconds = int(1e6 * (value - seconds))
-        return seconds, microseconds
-
     ival1_seconds, ival1_usec = split_time(initial_period)
     ival2_seconds, ival2_usec = split_time(subsequent_period)
     nframes = 1
@@ -102,11 +140,35 @@ def build_bcm_transmit_header(can_id, count, initial_period, subsequent_period):
     return build_bcm_header(opcode, flags, count, ival1_seconds, ival1_usec, ival2_seconds, ival2_usec, can_id, nframes)
 
 
+def build_bcm_rx_setup_header(can_id, flags, timeout, throttle, nframes):
+    """RX_SETUP: `timeout` is sent as ival1 and `throttle` as ival2."""
+    ival1_seconds, ival1_usec = split_time(timeout)
+    ival2_seconds, ival2_usec = split_time(throttle)
+    return build_bcm_header(CAN_BCM_RX_SETUP, flags, 0, ival1_seconds, ival1_usec,
+                            ival2_seconds, ival2_usec, can_id, nframes)
+
+
+def build_bcm_rx_delete_header(can_id):
+    return build_bcm_header(CAN_BCM_RX_DELETE, 0, 0, 0, 0, 0, 0, can_id, 0)
+
+
+def split_time(value):
+    """Given seconds as a float, return whole seconds and microseconds"""
+    seconds = int(value)
+    microseconds = int(1e6 * (value - seconds))
+    return seconds, microseconds
+
+
 def dissect_can_frame(frame):
     can_id, can_dlc, data = struct.unpack(can_frame_fmt, frame)
     return (can_id, can_dlc, data[:can_dlc])
 
 
+def dissect_canfd_frame(frame):
+    can_id, length, flags, data = canfd_frame_struct.unpack(frame)
+    return (can_id, length, flags, data[:length])
+
+
 def create_bcm_socket(channel):
     """create a broadcast manager socket and connect to the given interface"""
     try:
@@ -160,6 +222,75 @@ class CyclicSendTask(CyclicSendTaskABC):
         self._tx_setup(message)
 
 
+class ReceiveFilterTask(ReceiveFilterTaskABC):
+
+    def __init__(self, channel, can_id, data_mask=None, timeout=0.0, throttle=0.0, **kwargs):
+        """
+        :param channel: The name of the CAN channel to connect to.
+        :param can_id: The arbitration id to subscribe to.
+
+        See :class:`can.broadcastmanager.ReceiveFilterTaskABC` for the other
+        parameters.
+        """
+        super(ReceiveFilterTask, self).__init__(channel, can_id, data_mask, timeout, throttle, **kwargs)
+        self.bcm_socket = create_bcm_socket(channel)
+        enable_timestamps(self.bcm_socket)
+        self._rx_setup()
+
+    def _bcm_can_id(self):
+        if self.extended_id:
+            return self.can_id | 0x80000000
+        return self.can_id
+
+    def _rx_setup(self):
+        can_id = self._bcm_can_id()
+        flags = 0
+        if self.timeout > 0 or self.throttle > 0:
+            flags |= SETTIMER | STARTTIMER
+        if self.data_mask is None:
+            # No content filtering, just timeout monitoring and throttling
+            flags |= RX_FILTER_ID
+            frames = b''
+        else:
+            if self.check_dlc:
+                flags |= RX_CHECK_DLC
+            frames = build_can_frame(can_id, bytes(bytearray(self.data_mask)))
+        header = build_bcm_rx_setup_header(can_id, flags, self.timeout, self.throttle,
+                                           1 if frames else 0)
+        log.info("Sending BCM RX_SETUP command")
+        self.bcm_socket.send(header + frames)
+
+    def recv(self, timeout=None):
+        end_time = None if timeout is None else time.time() + timeout
+        while True:
+            remaining = None if end_time is None else max(0, end_time - time.time())
+            if len(select.select([self.bcm_socket], [], [], remaining)[0]) == 0:
+                return None
+
+            data, ancdata, _, _ = self.bcm_socket.recvmsg(bcm_frames_offset + can_frame_size,
+                                                          ancillary_data_size)
+            opcode = struct.unpack_from("@I", data)[0]
+            if opcode == CAN_BCM_RX_TIMEOUT:
+                self._handle_timeout()
+            elif opcode == CAN_BCM_RX_CHANGED and len(data) >= bcm_frames_offset + can_frame_size:
+                timestamp_ns = _ancillary_timestamp_ns(ancdata)
+                if timestamp_ns is None:
+                    timestamp_ns = int(time.time() * 1000000000)
+                return _frame_to_message(memoryview(data)[bcm_frames_offset:], can_frame_size, timestamp_ns)
+            else:
+                log.debug("Ignoring BCM opcode %d", opcode)
+
+    def start(self):
+        self._rx_setup()
+
+    def stop(self):
+        """Send a RX_DELETE message to remove this subscription."""
+        try:
+            self.bcm_socket.send(build_bcm_rx_delete_header(self._bcm_can_id()))
+        except:
+            pass
+
+
 def createSocket(can_protocol=None):
     """Creates a CAN socket. The socket can be BCM or RAW. The socket will
     be returned unbound to any interface.
@@ -207,16 +338,27 @@ _CanPacket = namedtuple('_CanPacket',
                          'is_extended_frame_format',
                          'is_remote_transmission_request',
                          'dlc',
-                         'data'])
+                         'data',
+                         'is_fd',
+                         'bitrate_switch',
+                         'error_state_indicator',
+                         'timestamp_ns'])
 
 
-def capturePacket(sock):
+def capturePacket(sock, flags=0):
     """
     Captures a packet of data from the given socket.
 
+    The timestamp is fetched with a separate ``SIOCGSTAMP`` ioctl, see
+    :func:`capturePacketAncillary` for a single syscall alternative.
+
     :param socket sock:
         The socket to read a packet from.
 
+    :param int flags:
+        Flags passed on to :meth:`socket.recvfrom`, e.g. ``socket.MSG_DONTWAIT``
+        to return None rather than block when no frame is queued.
+
     :return: A namedtuple with the following fields:
          * timestamp
          * arbitration_id
@@ -225,10 +367,17 @@ def capturePacket(sock):
          * is_error_frame
          * dlc
          * data
+         * is_fd
+         * bitrate_switch
+         * error_state_indicator
+         * timestamp_ns, the timestamp as integer nanoseconds
+
+    CAN FD frames are only received once :func:`enable_fd_frames` has been
+    called on the socket.
     """
     # Fetching the Arb ID, DLC and Data
     try:
-        cf, addr = sock.recvfrom(can_frame_size)
+        cf, addr = sock.recvfrom(canfd_frame_size, flags)
     except BlockingIOError:
         log.debug('Captured no data, socket in non-blocking mode.')
         return None
@@ -236,15 +385,97 @@ def capturePacket(sock):
         log.debug('Captured no data, socket read timed out.')
         return None
 
-    can_id, can_dlc, data = dissect_can_frame(cf)
-    log.debug('Received: can_id=%x, can_dlc=%x, data=%s', can_id, can_dlc, data)
+    return _decode_packet(cf, _ioctl_timestamp_ns(sock))
 
+
+def capturePacketAncillary(sock, flags=0):
+    """
+    Captures a packet of data and its receive timestamp from the given socket
+    with a single ``recvmsg`` call.
+
+    The socket must have had :func:`enable_timestamps` called on it, otherwise
+    this falls back to the ``SIOCGSTAMP`` ioctl.
+
+    :param socket sock:
+        The socket to read a packet from.
+
+    :param int flags:
+        Flags passed on to :meth:`socket.recvmsg`.
+
+    :return: The same namedtuple as :func:`capturePacket`
+    """
+    try:
+        cf, ancdata, msg_flags, addr = sock.recvmsg(canfd_frame_size, ancillary_data_size, flags)
+    except BlockingIOError:
+        log.debug('Captured no data, socket in non-blocking mode.')
+        return None
+    except socket.timeout:
+        log.debug('Captured no data, socket read timed out.')
+        return None
+
+    timestamp_ns = _ancillary_timestamp_ns(ancdata)
+    if timestamp_ns is None:
+        timestamp_ns = _ioctl_timestamp_ns(sock)
+
+    return _decode_packet(cf, timestamp_ns)
+
+
+def enable_fd_frames(sock):
+    """
+    Set ``CAN_RAW_FD_FRAMES`` so the raw socket can send and receive 72 byte
+    ``canfd_frame`` structures as well as classic frames. The interface
+    itself must have an MTU of 72 (``ip link set can0 mtu 72``).
+    """
+    sock.setsockopt(SOL_CAN_RAW, CAN_RAW_FD_FRAMES, 1)
+
+
+def enable_timestamps(sock, nanoseconds=False):
+    """
+    Ask the kernel to attach the receive time of every frame as ancillary
+    data, for use with :func:`capturePacketAncillary`.
+
+    :param bool nanoseconds:
+        Use ``SO_TIMESTAMPNS`` rather than ``SO_TIMESTAMP``. The float
+        ``timestamp`` only resolves roughly a quarter of a microsecond, the
+        exact value is kept as integer nanoseconds in ``timestamp_ns``.
+    """
+    option = SO_TIMESTAMPNS if nanoseconds else SO_TIMESTAMP
+    sock.setsockopt(socket.SOL_SOCKET, option, 1)
+
+
+def _ancillary_timestamp_ns(ancdata):
+    """The receive time in the ancillary data as integer nanoseconds since
+    the epoch, or None if there isn't one."""
+    for cmsg_level, cmsg_type, cmsg_data in ancdata:
+        if cmsg_level != socket.SOL_SOCKET:
+            continue
+        if cmsg_type == SCM_TIMESTAMPNS:
+            seconds, nanoseconds = struct.unpack(timeval_fmt, cmsg_data[:timeval_size])
+            return seconds * 1000000000 + nanoseconds
+        elif cmsg_type == SCM_TIMESTAMP:
+            seconds, microseconds = struct.unpack(timeval_fmt, cmsg_data[:timeval_size])
+            return seconds * 1000000000 + microseconds * 1000
+    return None
+
+
+def _ioctl_timestamp_ns(sock):
     # Fetching the timestamp
     binary_structure = "@LL"
     res = fcntl.ioctl(sock, SIOCGSTAMP, struct.pack(binary_structure, 0, 0))
 
     seconds, microseconds = struct.unpack(binary_structure, res)
-    timestamp = seconds + microseconds / 1000000
+    return seconds * 1000000000 + microseconds * 1000
+
+
+def _decode_packet(cf, timestamp_ns):
+    if len(cf) == canfd_frame_size:
+        can_id, can_dlc, fd_flags, data = dissect_canfd_frame(cf)
+        is_fd = True
+    else:
+        can_id, can_dlc, data = dissect_can_frame(cf)
+        fd_flags = 0
+        is_fd = False
+    log.debug('Received: can_id=%x, can_dlc=%x, data=%s', can_id, can_dlc, data)
 
     # EXT, RTR, ERR flags -> boolean attributes
     #   /* special address description flags for the CAN_ID */
@@ -263,7 +494,79 @@ def capturePacket(sock):
         log.debug("CAN: Standard")
         arbitration_id = can_id & 0x000007FF
 
-    return _CanPacket(timestamp, arbitration_id, CAN_ERR_FLAG, CAN_EFF_FLAG, CAN_RTR_FLAG, can_dlc, data)
+    return _CanPacket(timestamp_ns / 1e9, arbitration_id, CAN_ERR_FLAG, CAN_EFF_FLAG, CAN_RTR_FLAG, can_dlc, data,
+                      is_fd, bool(fd_flags & CANFD_BRS), bool(fd_flags & CANFD_ESI), timestamp_ns)
+
+
+def _packet_to_message(packet):
+    return Message(timestamp=packet.timestamp,
+                   arbitration_id=packet.arbitration_id,
+                   extended_id=packet.is_extended_frame_format,
+                   is_remote_frame=packet.is_remote_transmission_request,
+                   is_error_frame=packet.is_error_frame,
+                   dlc=packet.dlc,
+                   data=packet.data,
+                   is_fd=packet.is_fd,
+                   bitrate_switch=packet.bitrate_switch,
+                   error_state_indicator=packet.error_state_indicator,
+                   timestamp_ns=packet.timestamp_ns
+                   )
+
+
+def _frame_to_message(frame, nbytes, timestamp_ns):
+    """Build a Message straight from a packed can_frame or canfd_frame of
+    `nbytes` bytes, e.g. held in a reused receive buffer."""
+    if nbytes == canfd_frame_size:
+        can_id, can_dlc, fd_flags, data = canfd_frame_struct.unpack_from(frame)
+        is_fd = True
+    else:
+        can_id, can_dlc, data = can_frame_struct.unpack_from(frame)
+        fd_flags = 0
+        is_fd = False
+    if can_id & 0x80000000:
+        arbitration_id = can_id & 0x1FFFFFFF
+    else:
+        arbitration_id = can_id & 0x000007FF
+    return Message(timestamp=timestamp_ns / 1e9,
+                   timestamp_ns=timestamp_ns,
+                   arbitration_id=arbitration_id,
+                   extended_id=bool(can_id & 0x80000000),
+                   is_remote_frame=bool(can_id & 0x40000000),
+                   is_error_frame=bool(can_id & 0x20000000),
+                   dlc=can_dlc,
+                   data=data[:can_dlc],
+                   is_fd=is_fd,
+                   bitrate_switch=bool(fd_flags & CANFD_BRS),
+                   error_state_indicator=bool(fd_flags & CANFD_ESI)
+                   )
+
+
+def _build_frame(message):
+    """Pack a Message as a can_frame, or a canfd_frame if it is a CAN FD
+    message."""
+    can_id = _compose_arbitration_id(message)
+    if message.is_fd:
+        flags = 0
+        if message.bitrate_switch:
+            flags |= CANFD_BRS
+        if message.error_state_indicator:
+            flags |= CANFD_ESI
+        return build_canfd_frame(can_id, message.data, flags)
+    return build_can_frame(can_id, message.data)
+
+
+def _compose_arbitration_id(message):
+    arbitration_id = message.arbitration_id
+    if message.id_type:
+        log.debug("sending an extended id type message")
+        arbitration_id |= 0x80000000
+    if message.is_remote_frame:
+        log.debug("requesting a remote frame")
+        arbitration_id |= 0x40000000
+    if message.is_error_frame:
+        log.warning("Trying to send an error frame - this won't work")
+        arbitration_id |= 0x20000000
+    return arbitration_id
 
 
 class SocketscanNative_Bus(BusABC):
@@ -277,9 +580,48 @@ class SocketscanNative_Bus(BusABC):
 
         :param list can_filters:
             A list of dictionaries, each containing a "can_id" and a "can_mask".
+
+        :param bool ancillary_timestamps:
+            Receive each frame's timestamp as ancillary data in the same
+            ``recvmsg`` call rather than with a separate ioctl. Defaults to True.
+
+        :param bool nanosecond_timestamps:
+            Request nanosecond rather than microsecond resolution timestamps
+            from the kernel when using ancillary timestamps. The full
+            resolution is in each message's :attr:`~can.Message.timestamp_ns`.
+
+        :param bool drain:
+            When :meth:`recv` finds the socket readable, read every queued
+            frame (up to `drain_limit`) without blocking and hand them out
+            from an internal queue on subsequent calls. Defaults to False.
+            :meth:`recv_batch` always drains.
+
+        :param int drain_limit:
+            The most frames :meth:`recv` reads in one go in drain mode.
+
+        :param bool fd:
+            Enable ``CAN_RAW_FD_FRAMES`` to send and receive CAN FD frames.
         """
         self.socket = createSocket(CAN_RAW)
 
+        self.fd = kwargs.get('fd', False)
+        if self.fd:
+            enable_fd_frames(self.socket)
+
+        self._ancillary = kwargs.get('ancillary_timestamps', True)
+        if self._ancillary:
+            enable_timestamps(self.socket, kwargs.get('nanosecond_timestamps', False))
+            self._capture = capturePacketAncillary
+        else:
+            self._capture = capturePacket
+
+        self.drain = kwargs.get('drain', False)
+        self.drain_limit = kwargs.get('drain_limit', 256)
+        self._rx_queue = deque()
+        # Receive buffer reused for every frame read by _drain
+        self._rx_buffer = bytearray(canfd_frame_size)
+        self._rx_buffers = [memoryview(self._rx_buffer)]
+
         # Add any socket options such as can frame filters
         if 'can_filters' in kwargs and len(kwargs['can_filters']) > 0:
             log.debug("Creating a filtered can bus")
@@ -299,11 +641,26 @@ class SocketscanNative_Bus(BusABC):
     def __del__(self):
         self.socket.close()
 
+    def fileno(self):
+        return self.socket.fileno()
+
     def recv(self, timeout=None):
+        if self._rx_queue:
+            return self._rx_queue.popleft()
+
+        if self.drain:
+            # Block until a frame arrives (forever with no timeout), then
+            # read the rest of the backlog along with it.
+            if len(select.select([self.socket], [], [], timeout)[0]) == 0:
+                return None
+            self._rx_queue.extend(self._drain(self.drain_limit))
+            if self._rx_queue:
+                return self._rx_queue.popleft()
+            return None
 
         if timeout is None or len(select.select([self.socket],
                                                 [], [], timeout)[0]) > 0:
-            packet = capturePacket(self.socket)
+            packet = self._capture(self.socket)
 
             # The capturePacket function can return None if
             # self.socket.settimeout has been called.
@@ -313,36 +670,68 @@ class SocketscanNative_Bus(BusABC):
             # socket wasn't readable or timeout occurred
             return None
 
-        rx_msg = Message(timestamp=packet.timestamp,
-                         arbitration_id=packet.arbitration_id,
-                         extended_id=packet.is_extended_frame_format,
-                         is_remote_frame=packet.is_remote_transmission_request,
-                         is_error_frame=packet.is_error_frame,
-                         dlc=packet.dlc,
-                         data=packet.data
-                         )
+        return _packet_to_message(packet)
 
-        return rx_msg
+    def recv_batch(self, max_count=64, timeout=None):
+        """Wait for the socket to become readable once, then read frames
+        without blocking until the kernel queue is empty or `max_count`
+        frames have been read.
+
+        Frames already drained by :meth:`recv` are returned first.
+        """
+        queued = self._rx_queue
+        if queued:
+            return [queued.popleft() for _ in range(min(max_count, len(queued)))]
+
+        if len(select.select([self.socket], [], [], timeout)[0]) == 0:
+            return []
+        return self._drain(max_count)
+
+    def _drain(self, max_count):
+        """Read frames into the reusable receive buffer without blocking
+        until the socket would block or `max_count` frames have been read.
+        """
+        sock = self.socket
+        frame = self._rx_buffer
+        buffers = self._rx_buffers
+        dontwait = socket.MSG_DONTWAIT
+        messages = []
+        while len(messages) < max_count:
+            try:
+                if self._ancillary:
+                    nbytes, ancdata, _, _ = sock.recvmsg_into(buffers, ancillary_data_size, dontwait)
+                    timestamp_ns = _ancillary_timestamp_ns(ancdata)
+                    if timestamp_ns is None:
+                        timestamp_ns = _ioctl_timestamp_ns(sock)
+                else:
+                    nbytes = sock.recv_into(frame, canfd_frame_size, dontwait)
+                    timestamp_ns = _ioctl_timestamp_ns(sock)
+            except (BlockingIOError, socket.timeout):
+                break
+            messages.append(_frame_to_message(frame, nbytes, timestamp_ns))
+        log.debug('Drained %d frames', len(messages))
+        return messages
 
     def send(self, message):
         log.debug("We've been asked to write a message to the bus")
-        arbitration_id = message.arbitration_id
-        if message.id_type:
-            log.debug("sending an extended id type message")
-            arbitration_id |= 0x80000000
-        if message.is_remote_frame:
-            log.debug("requesting a remote frame")
-            arbitration_id |= 0x40000000
-        if message.is_error_frame:
-            log.warning("Trying to send an error frame - this won't work")
-            arbitration_id |= 0x20000000
         l = log.getChild("tx")
         l.debug("sending: %s", message)
         try:
-            self.socket.send(build_can_frame(arbitration_id, message.data))
+            self.socket.send(_build_frame(message))
         except OSError:
             l.warning("Failed to send: %s", message)
 
+    def send_batch(self, messages):
+        """Pack every frame up front then write them back to back."""
+        messages = list(messages)
+        frames = [_build_frame(m) for m in messages]
+        send = self.socket.send
+        for message, frame in zip(messages, frames):
+            try:
+                send(frame)
+            except OSError:
+                log.getChild("tx").warning("Failed to send: %s", message)
+
 
 if __name__ == "__main__":
     # Create two sockets on vcan0 to test send and receive
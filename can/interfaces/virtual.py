@@ -0,0 +1,117 @@
+"""
+An in-process loopback bus. Every bus opened on the same channel name in
+the same process receives the messages the others send, without any
+kernel support or serialisation.
+
+    bus1 = can.interface.Bus('test', bustype='virtual')
+    bus2 = can.interface.Bus('test', bustype='virtual')
+    bus1.send(msg)
+    assert bus2.recv() is msg
+
+"""
+import logging
+import threading
+from collections import deque
+
+from can.bus import BusABC
+from can.notifier import filter_matcher
+
+logger = logging.getLogger('can.virtual')
+
+# Maps each channel name to a tuple of the buses open on it. The tuples are
+# replaced rather than modified so send() can iterate without locking.
+_channels = {}
+_channels_lock = threading.Lock()
+
+
+class VirtualBus(BusABC):
+
+    def __init__(self, channel, receive_own_messages=False, queue_size=0, can_filters=None, **kwargs):
+        """Joins the in-process channel called `channel`.
+
+        Sent messages are not copied: every other bus on the channel
+        receives the very same :class:`~can.Message` object, timestamp
+        included, so neither sender nor receivers may modify a message once
+        it has been sent.
+
+        :param channel: Any hashable channel name.
+        :param bool receive_own_messages:
+            Also deliver messages sent by this bus to itself.
+        :param int queue_size:
+            The most messages waiting to be received, after which the oldest
+            are discarded. 0 for no limit.
+        :param list can_filters:
+            A list of dictionaries each containing a "can_id" and a "can_mask".
+            Only matching messages are queued for this bus.
+        """
+        self.channel = channel
+        self.channel_info = "Virtual bus channel {}".format(channel)
+        self.receive_own_messages = receive_own_messages
+
+        self._queue = deque(maxlen=queue_size or None)
+        self._event = threading.Event()
+        self._wants = filter_matcher(can_filters)
+
+        with _channels_lock:
+            _channels[channel] = _channels.get(channel, ()) + (self,)
+        super(VirtualBus, self).__init__()
+
+    def _deliver(self, msg):
+        if self._wants is not None and not self._wants(msg.arbitration_id):
+            return
+        self._queue.append(msg)
+        self._event.set()
+
+    def send(self, msg):
+        for bus in _channels.get(self.channel, ()):
+            if bus is not self or self.receive_own_messages:
+                bus._deliver(msg)
+
+    def send_batch(self, messages):
+        messages = list(messages)
+        for bus in _channels.get(self.channel, ()):
+            if bus is not self or self.receive_own_messages:
+                if bus._wants is None:
+                    bus._queue.extend(messages)
+                    bus._event.set()
+                else:
+                    for msg in messages:
+                        bus._deliver(msg)
+
+    def recv(self, timeout=None):
+        queue = self._queue
+        if not queue:
+            # Clear before checking again so a message delivered in between
+            # sets the event after we start waiting on it.
+            self._event.clear()
+            if not queue and not self._event.wait(timeout):
+                return None
+        try:
+            return queue.popleft()
+        except IndexError:
+            return None
+
+    def recv_batch(self, max_count=64, timeout=None):
+        queue = self._queue
+        if not queue:
+            self._event.clear()
+            if not queue and not self._event.wait(timeout):
+                return []
+        popleft = queue.popleft
+        messages = []
+        try:
+            for _ in range(min(max_count, len(queue))):
+                messages.append(popleft())
+        except IndexError:
+            pass
+        return messages
+
+    def shutdown(self):
+        """Leave the channel."""
+        with _channels_lock:
+            buses = tuple(bus for bus in _channels.get(self.channel, ()) if bus is not self)
+            if buses:
+                _channels[self.channel] = buses
+            else:
+                _channels.pop(self.channel, None)
+        super(VirtualBus, self).shutdown()
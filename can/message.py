@@ -1,14 +1,59 @@
 import logging
 logger = logging.getLogger(__name__)
 
+# Bit flags used when a message is stored in a packed or columnar form
+FLAG_EXTENDED_ID = 0x01
+FLAG_REMOTE_FRAME = 0x02
+FLAG_ERROR_FRAME = 0x04
+FLAG_FD = 0x08
+FLAG_BITRATE_SWITCH = 0x10
+FLAG_ERROR_STATE_INDICATOR = 0x20
+
 
 class Message(object):
     """
     Represents a CAN message.
+
+    Messages are created for every received frame so the class uses
+    ``__slots__`` rather than a per instance ``__dict__``. Subclasses that
+    don't declare their own ``__slots__`` can still add arbitrary attributes.
+
+    A ``bytes`` or ``bytearray`` payload is stored as given rather than being
+    copied; any other iterable of ints is converted to a ``bytearray``.
+
+    CAN FD frames set `is_fd` and may carry up to 64 bytes, in which case
+    :attr:`dlc` is the payload length in bytes rather than the 4 bit code
+    sent on the wire (see :func:`can.util.len2dlc`).
+
+    :attr:`channel` identifies the bus a message was received on when
+    messages from several buses are handled together, and is None otherwise.
+
+    :attr:`timestamp_ns` is the receive time as integer nanoseconds since the
+    epoch, exactly as the backend read it, since the float :attr:`timestamp`
+    only resolves about a quarter of a microsecond. It is None for backends
+    which don't provide it.
     """
 
+    __slots__ = (
+        'timestamp',
+        'id_type',
+        'is_remote_frame',
+        'is_error_frame',
+        'arbitration_id',
+        'data',
+        'is_fd',
+        'bitrate_switch',
+        'error_state_indicator',
+        'channel',
+        'timestamp_ns',
+        '_dlc',
+        '__weakref__',
+    )
+
     def __init__(self, timestamp=0.0, is_remote_frame=False, extended_id=True,
-                 is_error_frame=False, arbitration_id=0, dlc=None, data=None):
+                 is_error_frame=False, arbitration_id=0, dlc=None, data=None,
+                 is_fd=False, bitrate_switch=False, error_state_indicator=False, channel=None,
+                 timestamp_ns=None):
 
         self.timestamp = timestamp
         self.id_type = extended_id
@@ -17,21 +62,39 @@ class Message(object):
         self.is_error_frame = is_error_frame
         self.arbitration_id = arbitration_id
 
-        #if isinstance(data, list):
-        #    data = bytes(data)
-
         if data is None:
-            data = []
-        try:
-            self.data = bytearray(data)
-        except TypeError:
-            logger.error("Couldn't create message from %r (%r)", data, type(data))
-        if dlc is None:
-            self.dlc = len(data)
-        else:
-            self.dlc = dlc
+            data = bytearray()
+        elif type(data) is not bytearray:
+            # Anything else, bytes included, is copied so data is always mutable
+            try:
+                data = bytearray(data)
+            except TypeError:
+                logger.error("Couldn't create message from %r (%r)", data, type(data))
+        self.data = data
+
+        self.is_fd = is_fd
+        self.bitrate_switch = bitrate_switch
+        self.error_state_indicator = error_state_indicator
+        self.channel = channel
+        self.timestamp_ns = timestamp_ns
+
+        # The dlc is derived from the data on first access unless given
+        self._dlc = dlc
+        length = len(data) if dlc is None else dlc
+        max_dlc = 64 if is_fd else 8
+        if length > max_dlc:
+            raise ValueError("data link count was {} but it must be less than or equal to {}".format(length, max_dlc))
+
+    @property
+    def dlc(self):
+        """The data link count, defaults to the length of :attr:`data`."""
+        if self._dlc is None:
+            return len(self.data)
+        return self._dlc
 
-        assert self.dlc <= 8, "data link count was {} but it must be less than or equal to 8".format(self.dlc)
+    @dlc.setter
+    def dlc(self, value):
+        self._dlc = value
 
     def __str__(self):
         field_strings = ["%15.6f" % self.timestamp]
@@ -60,7 +123,7 @@ class Message(object):
         field_strings.append("%d" % self.dlc)
         data_strings = []
         if self.data is not None:
-            for byte in self.data:
+            for byte in bytearray(self.data):
                 data_strings.append("%.2x" % byte)
         if len(data_strings) > 0:
             field_strings.append(" ".join(data_strings).ljust(24, " "))
@@ -68,3 +131,17 @@ class Message(object):
             field_strings.append(" " * 24)
 
         return "    ".join(field_strings).strip()
+
+
+def _replace(msg, **changes):
+    """Return a shallow copy of `msg` with some attributes changed.
+
+    The payload is shared rather than copied, and no checks are repeated,
+    so this is much cheaper than constructing a new :class:`Message`.
+    """
+    copy = msg.__class__.__new__(msg.__class__)
+    for name in Message.__slots__[:-1]:
+        setattr(copy, name, getattr(msg, name))
+    for name, value in changes.items():
+        setattr(copy, name, value)
+    return copy
@@ -1,24 +1,187 @@
+import logging
+import select
 import threading
-try:
-    import queue
-except ImportError:
-    import Queue as queue
+import time
+
+from can.CAN import BufferedReader, OVERFLOW_POLICIES, BLOCK, DROP_OLDEST, DROP_NEWEST
+from can.message import _replace
+
+log = logging.getLogger('can.notifier')
+
+#: Mask matching every bit of a 29 bit arbitration id
+MATCH_ALL_BITS = 0x1FFFFFFF
+
+
+class RoutingTable(object):
+    """Maps arbitration ids to the targets subscribed to them.
+
+    Subscriptions use the same ``{"can_id": ..., "can_mask": ...}`` filters
+    as :class:`can.BusABC`. Filters with a full mask are kept in a dict keyed
+    by id, the remaining filters in a list which is only scanned the first
+    time an id is seen. The result for each id is memoized, so routing a
+    frame usually costs one dict lookup however many targets there are.
+
+    Targets are returned in the order they were added, each at most once.
+    """
+
+    def __init__(self, max_cache_size=65536):
+        self.max_cache_size = max_cache_size
+        self._subscriptions = []
+        # (targets, exact, masked, wildcard, cache), replaced as a whole on
+        # change so lookups from another thread see a consistent table.
+        self._state = ((), {}, [], [], {})
+
+    def add(self, target, can_filters=None):
+        """Route matching ids to `target`.
+
+        :param target: Any object, usually a callable taking a message.
+        :param list can_filters:
+            Filters selecting the ids to route, or None for every id.
+        """
+        self._subscriptions.append((target, can_filters))
+        self._compile()
+
+    def remove(self, target):
+        """Stop routing ids to `target`."""
+        self._subscriptions = [(t, f) for t, f in self._subscriptions if t is not target]
+        self._compile()
+
+    def _compile(self):
+        exact, masked, wildcard = {}, [], []
+        for index, (target, can_filters) in enumerate(self._subscriptions):
+            if can_filters is None:
+                wildcard.append(index)
+                continue
+            for can_filter in can_filters:
+                can_mask = can_filter['can_mask'] & MATCH_ALL_BITS
+                can_id = can_filter['can_id'] & can_mask
+                if can_mask == MATCH_ALL_BITS:
+                    exact.setdefault(can_id, []).append(index)
+                elif can_mask == 0:
+                    wildcard.append(index)
+                else:
+                    masked.append((can_id, can_mask, index))
+        targets = tuple(target for target, _ in self._subscriptions)
+        self._state = (targets, exact, masked, wildcard, {})
+
+    def lookup(self, arbitration_id):
+        """Return a tuple of the targets subscribed to `arbitration_id`."""
+        targets, exact, masked, wildcard, cache = self._state
+        try:
+            return cache[arbitration_id]
+        except KeyError:
+            pass
+        indices = set(wildcard)
+        indices.update(exact.get(arbitration_id, ()))
+        for can_id, can_mask, index in masked:
+            if arbitration_id & can_mask == can_id:
+                indices.add(index)
+        matching = tuple(targets[index] for index in sorted(indices))
+        if len(cache) >= self.max_cache_size:
+            cache.clear()
+        cache[arbitration_id] = matching
+        return matching
+
+
+def filter_matcher(can_filters):
+    """Return a function telling whether an arbitration id matches any of
+    `can_filters`, the ``{"can_id": ..., "can_mask": ...}`` dictionaries a
+    bus accepts. The answer for each id is remembered by a
+    :class:`RoutingTable`.
+
+    :return: The function, or None when there are no filters and every id matches.
+    """
+    if not can_filters:
+        return None
+    table = RoutingTable()
+    table.add(True, can_filters)
+    lookup = table.lookup
+
+    def matches(arbitration_id):
+        return bool(lookup(arbitration_id))
+    return matches
+
+
+class _ListenerWorker(object):
+    """Feeds one listener from its own bounded buffer on its own thread."""
+
+    def __init__(self, listener, queue_size, overflow):
+        self.listener = listener
+        self.buffer = BufferedReader(queue_size, overflow)
+        self.put = self.buffer.on_message_received
+
+        self._thread = threading.Thread(target=self.run)
+        self._thread.daemon = True
+        self._thread.start()
+
+    @property
+    def dropped(self):
+        return self.buffer.dropped
+
+    def run(self):
+        listener = self.listener
+        while True:
+            messages = self.buffer.get_messages(timeout=None)
+            if not messages:
+                # Stopped and drained
+                return
+            for msg in messages:
+                try:
+                    listener(msg)
+                except Exception:
+                    log.exception("Listener %r failed to handle a message", listener)
+
+    def stop(self, timeout=None):
+        # The worker handles any backlog before it exits
+        self.buffer.stop()
+        self._thread.join(timeout)
 
 
 class Notifier(object):
 
-    def __init__(self, bus, listeners, timeout=None):
+    def __init__(self, bus, listeners, timeout=None, threaded=False, queue_size=1000, overflow=BLOCK):
         """Manages the distribution of **Messages** from a given bus to a
         list of listeners.
 
+        By default every listener is called on the receive thread, so a
+        listener which blocks also stops reception. With `threaded` set each
+        listener instead gets its own bounded queue and worker thread, and
+        the receive thread only has to enqueue each message.
+
+        Listeners given here receive every message. Listeners only
+        interested in a few ids should be added with :meth:`subscribe`, so
+        they are not called at all for the others.
+
         :param bus: The :class:`~can.Bus` to listen too.
         :param listeners: An iterable of :class:`~can.Listeners`
         :param timeout: An optional maximum number of seconds to wait for any message.
+        :param bool threaded: Dispatch to each listener on its own worker thread.
+        :param int queue_size:
+            Maximum number of messages waiting for each listener when threaded,
+            0 for no limit.
+        :param str overflow:
+            What to do when a listener's queue is full, one of
+            ``'block'``, ``'drop_oldest'`` or ``'drop_newest'``.
         """
+        if overflow not in OVERFLOW_POLICIES:
+            raise ValueError("overflow must be one of {}, not {!r}".format(OVERFLOW_POLICIES, overflow))
+
         self.listeners = listeners
         self.bus = bus
         self.timeout = timeout
 
+        self._threaded = threaded
+        self._queue_size = queue_size
+        self._overflow = overflow
+        self._workers = []
+        self._routes = RoutingTable()
+
+        # Without workers the list is used as is, so listeners appended to
+        # it later are notified too.
+        self._broadcast = self.listeners
+        if threaded:
+            self._broadcast = [self._callback(listener) for listener in listeners]
+
         self.running = threading.Event()
         self.running.set()
 
@@ -27,9 +190,180 @@ class Notifier(object):
 
         self._reader.start()
 
+    def subscribe(self, listener, can_filters=None):
+        """Add a listener which is only notified of matching messages.
+
+        :param listener: A :class:`~can.Listener` or other callable.
+        :param list can_filters:
+            A list of dictionaries each containing a "can_id" and a
+            "can_mask", as accepted by :class:`~can.BusABC`. A message is
+            passed on if ``arbitration_id & can_mask == can_id & can_mask``
+            for any of them. None subscribes to every message.
+        """
+        self._routes.add(self._callback(listener), can_filters)
+
+    def _callback(self, listener):
+        if not self._threaded:
+            return listener
+        worker = _ListenerWorker(listener, self._queue_size, self._overflow)
+        self._workers.append(worker)
+        return worker.put
+
     def rx_thread(self):
+        broadcast = self._broadcast
+        lookup = self._routes.lookup
         while self.running.is_set():
-            msg = self.bus.recv(self.timeout)
-            if msg is not None:
-                for callback in self.listeners:
+            for msg in self.bus.recv_batch(timeout=self.timeout):
+                for callback in broadcast:
+                    callback(msg)
+                for callback in lookup(msg.arbitration_id):
                     callback(msg)
+
+    @property
+    def dropped(self):
+        """A dict with the number of messages dropped for each listener.
+        Always empty unless the notifier is threaded.
+        """
+        return dict((worker.listener, worker.dropped) for worker in self._workers)
+
+    def stop(self, timeout=None):
+        """Stop receiving, then wait for every listener to handle the
+        messages already queued for it. The receive thread only notices
+        once the bus returns from its current read, so give the notifier a
+        `timeout` if it is to be stopped.
+
+        :param float timeout:
+            Maximum number of seconds to wait for each thread.
+        """
+        self.running.clear()
+        if self._reader is not threading.current_thread():
+            self._reader.join(timeout)
+        for worker in self._workers:
+            worker.stop(timeout)
+
+
+class MultiBusNotifier(Notifier):
+    """Distributes messages from several buses to a list of listeners
+    using a single thread.
+
+    The thread waits on the file descriptors of every bus at once (with
+    ``epoll`` where available), reads whatever is ready and dispatches it in
+    timestamp order. Listeners see each message with its
+    :attr:`~can.Message.channel` set to the tag of the bus it came from. A
+    message received with a different channel is copied rather than
+    changed, as a bus may share message objects between its readers.
+
+    Ordering is by timestamp across the frames read in one wakeup, which
+    all arrived within the same short window, not across the whole stream.
+
+    Buses which can't be polled (see :meth:`can.BusABC.fileno`) are read
+    without blocking every `poll_interval` seconds.
+
+        >>> notifier = MultiBusNotifier({'engine': bus0, 'body': bus1}, [can.Printer()])
+    """
+
+    def __init__(self, buses, listeners, timeout=None, poll_interval=0.01, max_batch=64, **kwargs):
+        """
+        :param buses:
+            A list of buses, tagged by their index, or a dict mapping tags
+            to buses.
+        :param listeners: An iterable of :class:`~can.Listeners`
+        :param float timeout:
+            An optional maximum number of seconds to wait for any message.
+        :param float poll_interval:
+            Seconds between reads of buses without a file descriptor.
+        :param int max_batch:
+            The most messages read from one bus per wakeup.
+
+        The remaining keyword arguments are passed to :class:`Notifier`.
+        """
+        if isinstance(buses, dict):
+            tagged = list(buses.items())
+        else:
+            tagged = list(enumerate(buses))
+        self.buses = buses
+        self.poll_interval = poll_interval
+        self.max_batch = max_batch
+
+        self._by_fd = {}
+        self._unpollable = []
+        for tag, bus in tagged:
+            try:
+                self._by_fd[bus.fileno()] = (tag, bus)
+            except NotImplementedError:
+                self._unpollable.append((tag, bus))
+
+        if hasattr(select, 'epoll'):
+            self._epoll = select.epoll()
+            for fd in self._by_fd:
+                self._epoll.register(fd, select.EPOLLIN)
+        else:
+            self._epoll = None
+
+        super(MultiBusNotifier, self).__init__(None, listeners, timeout, **kwargs)
+
+    def _wait(self, timeout):
+        """Return the file descriptors which are readable."""
+        if self._epoll is not None:
+            return [fd for fd, _ in self._epoll.poll(-1 if timeout is None else timeout)]
+        if not self._by_fd:
+            time.sleep(self.poll_interval if timeout is None else timeout)
+            return []
+        return select.select(list(self._by_fd), [], [], timeout)[0]
+
+    def _read(self, tag, bus, messages):
+        """Read what `bus` has ready into `messages` as (tag, message)
+        pairs, return True if there may be more.
+        """
+        batch = bus.recv_batch(self.max_batch, timeout=0)
+        messages.extend((tag, msg) for msg in batch)
+        return len(batch) == self.max_batch
+
+    def _dispatch(self, messages):
+        """Hand the (tag, message) pairs read in one wakeup to the listeners."""
+        broadcast = self._broadcast
+        lookup = self._routes.lookup
+        for tag, msg in messages:
+            callbacks = lookup(msg.arbitration_id)
+            if not broadcast and not callbacks:
+                continue
+            if msg.channel != tag:
+                # Buses may hand the same object to other readers, so tag a copy
+                msg = _replace(msg, channel=tag)
+            for callback in broadcast:
+                callback(msg)
+            for callback in callbacks:
+                callback(msg)
+
+    def rx_thread(self):
+        dispatch = self._dispatch
+        by_fd = self._by_fd
+        unpollable = self._unpollable
+        # Buses which returned a full batch and may have frames buffered
+        # that won't make their fd readable again
+        pending = []
+
+        try:
+            while self.running.is_set():
+                timeout = self.timeout
+                if unpollable and (timeout is None or timeout > self.poll_interval):
+                    timeout = self.poll_interval
+                if pending:
+                    timeout = 0
+                ready = [by_fd[fd] for fd in self._wait(timeout)]
+
+                messages = []
+                sources = pending + [source for source in ready if source not in pending] + unpollable
+                pending = [source for source in sources if self._read(source[0], source[1], messages)]
+
+                if len(sources) > 1:
+                    messages.sort(key=_timestamp)
+                if messages:
+                    dispatch(messages)
+        finally:
+            if self._epoll is not None:
+                self._epoll.close()
+
+
+def _timestamp(tagged):
+    return tagged[1].timestamp
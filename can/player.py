@@ -0,0 +1,148 @@
+"""
+Replays recorded messages onto a bus with their original timing.
+"""
+import logging
+import threading
+
+from can.notifier import filter_matcher
+from can.util import clock
+
+log = logging.getLogger('can.player')
+
+# Sleep until this close to a deadline, then spin for the rest so the
+# send isn't at the mercy of the scheduler's wakeup granularity.
+_SPIN_THRESHOLD = 0.002
+
+# Messages sent per send_batch call when playing as fast as possible
+_FAST_BATCH_SIZE = 64
+
+
+class Player(object):
+    """Sends the messages from a log reader, or any iterable of
+    :class:`~can.Message` objects, to a bus.
+
+    Each message is scheduled at an absolute deadline computed from the
+    start of playback and its timestamp, so time spent sending or a late
+    wakeup delays only that message rather than everything after it.
+
+        >>> player = Player(can.LogReader('trace.asc'), bus, speed=2.0)
+        >>> player.play()
+        >>> print(player.report())
+    """
+
+    def __init__(self, messages, bus, speed=1.0, can_filters=None, skip=0.0):
+        """
+        :param messages: An iterable of messages in timestamp order.
+        :param bus: The :class:`~can.BusABC` to send to.
+        :param float speed:
+            Playback speed, 2.0 plays twice as fast as recorded. None plays
+            as fast as the bus accepts messages.
+        :param list can_filters:
+            Only messages matching one of these ``can_id``/``can_mask``
+            dictionaries are sent, as accepted by :class:`~can.BusABC`.
+        :param float skip:
+            Seconds of the recording, from its first message, to skip
+            before playback starts.
+        """
+        if speed is not None and speed <= 0:
+            raise ValueError("speed must be positive or None, not {}".format(speed))
+        self.messages = messages
+        self.bus = bus
+        self.speed = speed
+        self.can_filters = can_filters
+        self.skip = skip
+
+        #: Messages sent so far
+        self.sent = 0
+        #: Messages not sent because of the filters
+        self.filtered = 0
+        #: Largest difference between a deadline and the actual send, in seconds
+        self.max_error = 0.0
+        self._total_error = 0.0
+
+        self._stopped = threading.Event()
+        self._wanted = filter_matcher(can_filters)
+
+    @property
+    def mean_error(self):
+        """Mean difference between the deadlines and the actual sends, in seconds."""
+        if not self.sent or self.speed is None:
+            return 0.0
+        return self._total_error / self.sent
+
+    def _selected(self):
+        """Yield the messages to send, after skipping and filtering."""
+        first = None
+        for msg in self.messages:
+            if first is None:
+                first = msg.timestamp
+            if msg.timestamp - first < self.skip:
+                continue
+            if self._wanted is not None and not self._wanted(msg.arbitration_id):
+                self.filtered += 1
+                continue
+            yield msg
+
+    def play(self):
+        """Send the messages, returning once they have all been sent or
+        :meth:`stop` is called.
+        """
+        if self.speed is None:
+            self._play_fast()
+        else:
+            self._play_timed()
+
+    def _play_fast(self):
+        batch = []
+        for msg in self._selected():
+            batch.append(msg)
+            if len(batch) >= _FAST_BATCH_SIZE:
+                if self._stopped.is_set():
+                    return
+                self.bus.send_batch(batch)
+                self.sent += len(batch)
+                batch = []
+        if batch and not self._stopped.is_set():
+            self.bus.send_batch(batch)
+            self.sent += len(batch)
+
+    def _play_timed(self):
+        send = self.bus.send
+        stopped = self._stopped
+        speed = self.speed
+        start = origin = None
+        for msg in self._selected():
+            if start is None:
+                start = clock()
+                origin = msg.timestamp
+            deadline = start + (msg.timestamp - origin) / speed
+
+            remaining = deadline - clock()
+            if remaining > _SPIN_THRESHOLD:
+                # Wait on the event so stop() takes effect immediately
+                if stopped.wait(remaining - _SPIN_THRESHOLD):
+                    return
+            elif stopped.is_set():
+                return
+            now = clock()
+            while now < deadline:
+                now = clock()
+
+            send(msg)
+            error = now - deadline
+            self.sent += 1
+            self._total_error += error
+            if error > self.max_error:
+                self.max_error = error
+
+    def stop(self):
+        """Stop playback, from another thread."""
+        self._stopped.set()
+
+    def report(self):
+        """A one line summary of the playback."""
+        summary = "Sent {} messages, filtered {}".format(self.sent, self.filtered)
+        if self.speed is not None:
+            summary += ", timing error mean {:.3f} ms, max {:.3f} ms".format(
+                1000 * self.mean_error, 1000 * self.max_error)
+        return summary
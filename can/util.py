@@ -11,6 +11,7 @@ import os.path
 import sys
 import platform
 import re
+import time
 
 
 REQUIRED_KEYS = [
@@ -113,6 +114,36 @@ def load_config(path=None):
 
     return config
 
+#: The best clock available for measuring intervals and scheduling against
+#: absolute deadlines
+clock = getattr(time, 'perf_counter', time.time)
+
+#: Payload length in bytes for each CAN FD data length code
+CAN_FD_DLC_LENGTHS = [0, 1, 2, 3, 4, 5, 6, 7, 8, 12, 16, 20, 24, 32, 48, 64]
+
+
+def dlc2len(dlc):
+    """Return the payload length in bytes for a CAN FD data length code.
+
+    :param int dlc: A data length code from 0 to 15.
+    """
+    return CAN_FD_DLC_LENGTHS[dlc] if dlc <= 15 else 64
+
+
+def len2dlc(length):
+    """Return the smallest CAN FD data length code which can carry
+    `length` bytes.
+
+    :param int length: A payload length from 0 to 64.
+    """
+    if length <= 8:
+        return length
+    for dlc, dlc_length in enumerate(CAN_FD_DLC_LENGTHS):
+        if dlc_length >= length:
+            return dlc
+    return 15
+
+
 def choose_socketcan_implementation():
     """Set the best version of SocketCAN for this system.
 
@@ -0,0 +1,46 @@
+#!/usr/bin/env python
+"""
+Measures the sustained rows per second :class:`can.CSVWriter` writes, one
+row at a time and with buffered flushing.
+
+    python scripts/benchmark_csvwriter.py
+
+"""
+from __future__ import print_function
+
+import os
+import tempfile
+import time
+
+from can import CSVWriter, Message
+
+N = 500000
+
+
+def make_messages():
+    return [Message(timestamp=i * 1e-4, arbitration_id=0x0CF00400 + (i % 16),
+                    data=b'\x01\x02\x03\x04\x05\x06\x07\x08')
+            for i in range(N)]
+
+
+def rows_per_second(messages, **kwargs):
+    handle, filename = tempfile.mkstemp(suffix='.csv')
+    os.close(handle)
+    try:
+        writer = CSVWriter(filename, **kwargs)
+        start = time.time()
+        for msg in messages:
+            writer.on_message_received(msg)
+        writer.stop()
+        return len(messages) / (time.time() - start)
+    finally:
+        os.remove(filename)
+
+
+if __name__ == "__main__":
+    messages = make_messages()
+    print("{:<24}{:>12}".format("", "rows / s"))
+    for name, kwargs in (("unbuffered", {}),
+                         ("buffer_rows=100", {'buffer_rows': 100}),
+                         ("buffer_rows=1000", {'buffer_rows': 1000})):
+        print("{:<24}{:>12.0f}".format(name, rows_per_second(messages, **kwargs)))
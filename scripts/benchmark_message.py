@@ -0,0 +1,74 @@
+#!/usr/bin/env python
+"""
+Compares construction time and per instance memory of :class:`can.Message`
+against the previous ``__dict__`` based implementation.
+
+    python scripts/benchmark_message.py
+
+"""
+from __future__ import print_function
+
+import sys
+import timeit
+import tracemalloc
+
+from can import Message
+
+
+class LegacyMessage(object):
+    """The pre ``__slots__`` Message, kept here as the baseline."""
+
+    def __init__(self, timestamp=0.0, is_remote_frame=False, extended_id=True,
+                 is_error_frame=False, arbitration_id=0, dlc=None, data=None):
+        self.timestamp = timestamp
+        self.id_type = extended_id
+        self.is_remote_frame = is_remote_frame
+        self.is_error_frame = is_error_frame
+        self.arbitration_id = arbitration_id
+        if data is None:
+            data = []
+        self.data = bytearray(data)
+        if dlc is None:
+            self.dlc = len(data)
+        else:
+            self.dlc = dlc
+        assert self.dlc <= 8
+
+
+# A bytearray payload is stored by can.Message as is, bytes are copied
+PAYLOADS = (
+    ("bytes", lambda: b'\x01\x02\x03\x04\x05\x06\x07\x08'),
+    ("bytearray", lambda: bytearray(b'\x01\x02\x03\x04\x05\x06\x07\x08')),
+)
+N = 200000
+
+
+def construction_time(cls, payload):
+    data = payload()
+
+    def build():
+        cls(timestamp=1.0, arbitration_id=0x123, dlc=8, data=data)
+    return min(timeit.repeat(build, number=N, repeat=5)) / N
+
+
+def memory_per_instance(cls, payload):
+    # Each message gets its own payload, as when decoding received frames
+    payloads = [payload() for _ in range(N)]
+    tracemalloc.start()
+    before = tracemalloc.take_snapshot()
+    messages = [cls(timestamp=float(i), arbitration_id=0x123, dlc=8, data=data)
+                for i, data in enumerate(payloads)]
+    after = tracemalloc.take_snapshot()
+    tracemalloc.stop()
+    total = sum(stat.size_diff for stat in after.compare_to(before, 'filename'))
+    # Don't count the list holding the messages
+    total -= sys.getsizeof(messages)
+    return float(total) / N
+
+
+if __name__ == "__main__":
+    print("{:<16}{:<12}{:>16}{:>20}".format("", "payload", "construct (us)", "bytes / instance"))
+    for payload_name, payload in PAYLOADS:
+        for name, cls in (("legacy", LegacyMessage), ("can.Message", Message)):
+            print("{:<16}{:<12}{:>16.3f}{:>20.1f}".format(
+                name, payload_name, 1e6 * construction_time(cls, payload), memory_per_instance(cls, payload)))
@@ -0,0 +1,70 @@
+"""
+Buses shared by several test modules.
+"""
+import socket
+import threading
+import time
+from collections import deque
+
+import can
+
+try:
+    from can.interfaces import socketcan_native
+except ImportError:
+    socketcan_native = None
+
+
+class QueueBus(can.BusABC):
+    """A minimal bus which reads from and writes to in-memory queues."""
+
+    def __init__(self, messages=()):
+        self.rx = deque(messages)
+        self.tx = []
+        self.recv_timeouts = []
+        super(QueueBus, self).__init__()
+
+    def recv(self, timeout=None):
+        self.recv_timeouts.append(timeout)
+        if self.rx:
+            return self.rx.popleft()
+        return None
+
+    def send(self, msg):
+        self.tx.append(msg)
+
+
+class RecordingBus(can.BusABC):
+    """Records the time each message is sent."""
+
+    def __init__(self):
+        self.sent = []
+        self.lock = threading.Lock()
+        super(RecordingBus, self).__init__()
+
+    def recv(self, timeout=None):
+        return None
+
+    def send(self, msg):
+        with self.lock:
+            self.sent.append((time.time(), msg))
+
+
+def socketpair_bus(drain=False):
+    """A native socketcan bus reading from one end of a unix socket pair,
+    along with the socket which writes to it.
+    """
+    rx, tx = socket.socketpair(socket.AF_UNIX, socket.SOCK_DGRAM)
+    socketcan_native.enable_timestamps(rx)
+
+    # Skip __init__, which needs a real CAN interface, and wire the
+    # receive state up to the socket pair instead.
+    bus = socketcan_native.SocketscanNative_Bus.__new__(socketcan_native.SocketscanNative_Bus)
+    bus.socket = rx
+    bus._ancillary = True
+    bus._capture = socketcan_native.capturePacketAncillary
+    bus.drain = drain
+    bus.drain_limit = 256
+    bus._rx_queue = socketcan_native.deque()
+    bus._rx_buffer = bytearray(socketcan_native.canfd_frame_size)
+    bus._rx_buffers = [memoryview(bus._rx_buffer)]
+    return bus, tx
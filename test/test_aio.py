@@ -0,0 +1,133 @@
+import sys
+import threading
+import time
+import unittest
+
+import can
+
+try:
+    import asyncio
+except ImportError:
+    asyncio = None
+
+try:
+    from can.interfaces import socketcan_native
+except ImportError:
+    socketcan_native = None
+
+from test.helpers import QueueBus, socketpair_bus
+
+
+@unittest.skipIf(sys.version_info < (3, 5), "Needs Python 3.5 or newer")
+class ExecutorFallbackTest(unittest.TestCase):
+
+    def setUp(self):
+        self.loop = asyncio.new_event_loop()
+
+    def tearDown(self):
+        self.loop.close()
+
+    def test_bus_without_fileno(self):
+        with self.assertRaises(NotImplementedError):
+            QueueBus().fileno()
+
+    def test_recv_async(self):
+        msg = can.Message(arbitration_id=1)
+        bus = QueueBus([msg])
+        self.assertIs(self.loop.run_until_complete(bus.recv_async(timeout=0.1)), msg)
+        self.assertIsNone(self.loop.run_until_complete(bus.recv_async(timeout=0.01)))
+
+    def test_async_iteration(self):
+        messages = [can.Message(arbitration_id=i) for i in range(3)]
+        bus = QueueBus(messages)
+        iterator = bus.__aiter__()
+        received = [self.loop.run_until_complete(iterator.__anext__()) for _ in messages]
+        self.assertEqual(received, messages)
+
+    def test_notifier_thread(self):
+        messages = [can.Message(arbitration_id=i) for i in range(5)]
+        received, subscribed = [], []
+        notifier = can.AsyncNotifier(QueueBus(messages), [received.append], loop=self.loop)
+        notifier.subscribe(subscribed.append, [{'can_id': 3, 'can_mask': 0x1FFFFFFF}])
+        self.loop.run_until_complete(asyncio.sleep(0.2))
+        self.loop.run_until_complete(notifier.stop())
+        self.assertEqual(received, messages)
+        self.assertEqual(subscribed, messages[3:4])
+
+    @unittest.skipIf(sys.version_info < (3, 7), "Needs asyncio.get_running_loop")
+    def test_notifier_needs_loop(self):
+        with self.assertRaises(RuntimeError):
+            can.AsyncNotifier(QueueBus(), [])
+
+        async def create():
+            return can.AsyncNotifier(QueueBus(), [])
+        notifier = self.loop.run_until_complete(create())
+        self.assertIs(notifier.loop, self.loop)
+        self.loop.run_until_complete(notifier.stop())
+
+    def test_stop_does_not_block_loop(self):
+        release = threading.Event()
+
+        class StuckBus(QueueBus):
+            # Ignores the timeout, like a bus whose reads can't be interrupted
+            def recv(self, timeout=None):
+                release.wait()
+                return None
+
+        notifier = can.AsyncNotifier(StuckBus(), [], loop=self.loop)
+        start = time.time()
+        stopped = notifier.stop()
+        self.assertLess(time.time() - start, 0.05)
+        self.assertFalse(stopped.done())
+        self.loop.call_later(0.05, release.set)
+        self.loop.run_until_complete(asyncio.wait_for(stopped, 1.0))
+        self.assertFalse(notifier._thread.is_alive())
+
+
+@unittest.skipIf(sys.version_info < (3, 5), "Needs Python 3.5 or newer")
+@unittest.skipIf(socketcan_native is None, "Native socketcan isn't available")
+class PollableBusTest(unittest.TestCase):
+
+    def setUp(self):
+        self.loop = asyncio.new_event_loop()
+        self.bus, self.tx = socketpair_bus()
+
+    def tearDown(self):
+        self.tx.close()
+        self.bus.socket.close()
+        self.loop.close()
+
+    def send_later(self, *arbitration_ids):
+        for arbitration_id in arbitration_ids:
+            frame = socketcan_native.build_can_frame(arbitration_id, b'\x01')
+            self.loop.call_later(0.02, self.tx.send, frame)
+
+    def test_fileno(self):
+        self.assertEqual(self.bus.fileno(), self.bus.socket.fileno())
+
+    def test_recv_async(self):
+        self.send_later(0x123)
+        msg = self.loop.run_until_complete(self.bus.recv_async(timeout=1.0))
+        self.assertEqual(msg.arbitration_id, 0x123)
+        self.assertIsNone(self.loop.run_until_complete(self.bus.recv_async(timeout=0.01)))
+
+    def test_notifier(self):
+        received, async_received = [], []
+
+        def coroutine_listener(msg):
+            # A listener returning a coroutine has it run as a task
+            async_received.append(msg.arbitration_id)
+            return asyncio.sleep(0)
+
+        notifier = can.AsyncNotifier(self.bus, [lambda msg: received.append(msg.arbitration_id)],
+                                     loop=self.loop)
+        notifier.subscribe(coroutine_listener, [{'can_id': 0x200, 'can_mask': 0x700}])
+        self.send_later(0x100, 0x200, 0x201)
+        self.loop.run_until_complete(asyncio.sleep(0.1))
+        notifier.stop()
+        self.assertEqual(received, [0x100, 0x200, 0x201])
+        self.assertEqual(async_received, [0x200, 0x201])
+
+
+if __name__ == '__main__':
+    unittest.main()
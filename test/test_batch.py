@@ -0,0 +1,78 @@
+import unittest
+
+try:
+    import numpy
+except ImportError:
+    numpy = None
+
+import can
+from can.message import FLAG_EXTENDED_ID, FLAG_REMOTE_FRAME
+
+
+def make_messages():
+    return [
+        can.Message(timestamp=1.0, arbitration_id=0x0CF00400, data=[1, 2, 3, 4, 5, 6, 7, 8]),
+        can.Message(timestamp=1.5, arbitration_id=0x123, extended_id=False, data=[9]),
+        can.Message(timestamp=2.0, arbitration_id=0x18FEF100, is_remote_frame=True, dlc=8),
+        can.Message(timestamp=2.5, arbitration_id=0x0CF00401, data=b''),
+    ]
+
+
+@unittest.skipIf(numpy is None, "NumPy isn't installed")
+class MessageBatchTest(unittest.TestCase):
+
+    def setUp(self):
+        self.messages = make_messages()
+        self.batch = can.MessageBatch.from_messages(self.messages)
+
+    def assertMessagesEqual(self, a, b):
+        self.assertEqual(len(a), len(b))
+        for m1, m2 in zip(a, b):
+            self.assertEqual(m1.timestamp, m2.timestamp)
+            self.assertEqual(m1.arbitration_id, m2.arbitration_id)
+            self.assertEqual(m1.id_type, m2.id_type)
+            self.assertEqual(m1.is_remote_frame, m2.is_remote_frame)
+            self.assertEqual(m1.is_error_frame, m2.is_error_frame)
+            self.assertEqual(m1.dlc, m2.dlc)
+            self.assertEqual(bytearray(m1.data), bytearray(m2.data))
+
+    def test_columns(self):
+        self.assertEqual(len(self.batch), 4)
+        self.assertEqual(self.batch.payload_size, 8)
+        self.assertEqual(self.batch.timestamp.tolist(), [1.0, 1.5, 2.0, 2.5])
+        self.assertEqual(self.batch.dlc.tolist(), [8, 1, 8, 0])
+        self.assertEqual(self.batch.flags[0], FLAG_EXTENDED_ID)
+        self.assertEqual(self.batch.flags[1], 0)
+        self.assertEqual(self.batch.flags[2], FLAG_EXTENDED_ID | FLAG_REMOTE_FRAME)
+        self.assertEqual(self.batch.data[1].tolist(), [9, 0, 0, 0, 0, 0, 0, 0])
+
+    def test_round_trip(self):
+        self.assertMessagesEqual(self.batch.to_messages(), self.messages)
+        self.assertMessagesEqual(list(self.batch), self.messages)
+
+    def test_indexing(self):
+        self.assertMessagesEqual([self.batch[1]], [self.messages[1]])
+        self.assertMessagesEqual([self.batch[-1]], [self.messages[-1]])
+        self.assertEqual(len(self.batch[1:3]), 2)
+
+    def test_filter_by_mask(self):
+        engine = self.batch.filter([{"can_id": 0x0CF00400, "can_mask": 0x1FFFFF00}])
+        self.assertEqual(engine.arbitration_id.tolist(), [0x0CF00400, 0x0CF00401])
+
+    def test_filter_ids(self):
+        selected = self.batch.filter_ids([0x123, 0x18FEF100])
+        self.assertEqual(selected.timestamp.tolist(), [1.5, 2.0])
+
+    def test_fd_payload(self):
+        messages = [can.Message(arbitration_id=1, data=bytearray(range(8)))]
+        batch = can.MessageBatch.from_messages(messages, payload_size=64)
+        self.assertEqual(batch.payload_size, 64)
+        self.assertMessagesEqual(batch.to_messages(), messages)
+
+    def test_concatenate(self):
+        joined = can.MessageBatch.concatenate([self.batch, self.batch])
+        self.assertEqual(len(joined), 8)
+
+
+if __name__ == '__main__':
+    unittest.main()
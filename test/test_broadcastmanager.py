@@ -0,0 +1,141 @@
+import gc
+import threading
+import time
+import unittest
+
+import can
+from can.broadcastmanager import ThreadBasedCyclicSendTask, ThreadBasedMultiRateCyclicSendTask, \
+    CyclicScheduler
+from can.interfaces.virtual import VirtualBus, _channels
+from test.helpers import RecordingBus
+
+
+class ThreadBasedCyclicSendTaskTest(unittest.TestCase):
+
+    def setUp(self):
+        self.bus = RecordingBus()
+        self.scheduler = CyclicScheduler()
+
+    def test_sends_periodically(self):
+        msg = can.Message(arbitration_id=0x123, data=[1])
+        task = ThreadBasedCyclicSendTask(self.bus, msg, 0.01, scheduler=self.scheduler)
+        time.sleep(0.205)
+        task.stop()
+        sent = len(self.bus.sent)
+        # The first message goes out immediately
+        self.assertTrue(18 <= sent <= 23, sent)
+        self.assertEqual(task.sent, sent)
+        self.assertTrue(0 <= task.mean_jitter <= task.max_jitter)
+
+        time.sleep(0.05)
+        self.assertEqual(len(self.bus.sent), sent)
+
+    def test_modify_data(self):
+        task = ThreadBasedCyclicSendTask(self.bus, can.Message(arbitration_id=1, data=[1]), 0.01,
+                                         scheduler=self.scheduler)
+        time.sleep(0.05)
+        task.modify_data(can.Message(arbitration_id=1, data=[2]))
+        time.sleep(0.05)
+        task.stop()
+        self.assertEqual(self.bus.sent[0][1].data, bytearray([1]))
+        self.assertEqual(self.bus.sent[-1][1].data, bytearray([2]))
+
+    def test_restart(self):
+        task = ThreadBasedCyclicSendTask(self.bus, can.Message(arbitration_id=1), 0.01,
+                                         scheduler=self.scheduler)
+        task.stop()
+        count = len(self.bus.sent)
+        task.start()
+        time.sleep(0.05)
+        task.stop()
+        self.assertTrue(len(self.bus.sent) > count)
+
+    def test_many_tasks_share_one_thread(self):
+        before = threading.active_count()
+        tasks = [ThreadBasedCyclicSendTask(self.bus, can.Message(arbitration_id=i), 0.02,
+                                           scheduler=self.scheduler)
+                 for i in range(200)]
+        self.assertTrue(threading.active_count() <= before + 1)
+        time.sleep(0.1)
+        for task in tasks:
+            task.stop()
+        ids = set(msg.arbitration_id for _, msg in self.bus.sent)
+        self.assertEqual(ids, set(range(200)))
+
+    def test_multi_rate(self):
+        task = ThreadBasedMultiRateCyclicSendTask(self.bus, can.Message(arbitration_id=1), 5, 0.005, 1.0,
+                                                  scheduler=self.scheduler)
+        self.assertIsInstance(task, can.MultiRateCyclicSendTaskABC)
+        time.sleep(0.1)
+        task.stop()
+        # count fast messages and then the first of the slow ones
+        self.assertEqual(len(self.bus.sent), 6)
+
+    def test_send_periodic_with_bus(self):
+        task = can.send_periodic(self.bus, can.Message(arbitration_id=1), 0.01)
+        self.assertIsInstance(task, ThreadBasedCyclicSendTask)
+        time.sleep(0.03)
+        task.stop()
+        self.assertTrue(len(self.bus.sent) >= 2)
+
+    def test_dropped_task_stops(self):
+        task = ThreadBasedCyclicSendTask(self.bus, can.Message(arbitration_id=1), 0.01,
+                                         scheduler=self.scheduler)
+        time.sleep(0.03)
+        del task
+        gc.collect()
+        time.sleep(0.03)
+        sent = len(self.bus.sent)
+        time.sleep(0.05)
+        self.assertEqual(len(self.bus.sent), sent)
+
+
+class CyclicSendTaskFactoryTest(unittest.TestCase):
+
+    def setUp(self):
+        self.rc = dict(can.rc)
+        can.rc['interface'] = 'virtual'
+        self.receiver = VirtualBus('cyclic')
+
+    def tearDown(self):
+        self.receiver.shutdown()
+        can.rc.clear()
+        can.rc.update(self.rc)
+
+    def test_tasks_share_a_bus_per_channel(self):
+        first = can.interface.CyclicSendTask('cyclic', can.Message(arbitration_id=1), 0.01)
+        second = can.interface.MultiRateCyclicSendTask('cyclic', can.Message(arbitration_id=2), 1, 0.01, 0.01)
+        self.assertIs(first.bus, second.bus)
+        bus = first.bus
+        self.assertIsNotNone(self.receiver.recv(timeout=1))
+
+        first.stop()
+        self.assertIn(bus, _channels['cyclic'])
+        second.stop()
+        # The last task to stop shuts the bus down
+        self.assertNotIn(bus, _channels['cyclic'])
+
+        first.start()
+        self.assertIsNot(first.bus, bus)
+        self.assertIsNotNone(self.receiver.recv(timeout=1))
+        first.stop()
+        first.stop()
+        self.assertEqual(_channels['cyclic'], (self.receiver,))
+
+    def test_dropped_tasks_release_the_bus(self):
+        task = can.interface.CyclicSendTask('cyclic', can.Message(arbitration_id=1), 0.01)
+        bus = task.bus
+        self.assertIsNotNone(self.receiver.recv(timeout=1))
+        del task
+        gc.collect()
+        self.assertNotIn(bus, _channels['cyclic'])
+
+    def test_no_interface(self):
+        can.rc.pop('interface')
+        with self.assertRaises(NotImplementedError):
+            can.interface.CyclicSendTask('cyclic', can.Message(), 0.01)
+        self.assertNotIn('interface', can.rc)
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,172 @@
+import threading
+import time
+import unittest
+
+import can
+from test.helpers import QueueBus
+
+
+class BatchIOTest(unittest.TestCase):
+
+    def test_recv_batch_drains_available(self):
+        messages = [can.Message(arbitration_id=i) for i in range(5)]
+        bus = QueueBus(messages)
+        self.assertEqual(bus.recv_batch(timeout=1.0), messages)
+        # The first read honours the timeout, the rest don't block
+        self.assertEqual(bus.recv_timeouts, [1.0, 0, 0, 0, 0, 0])
+
+    def test_recv_batch_max_count(self):
+        bus = QueueBus(can.Message(arbitration_id=i) for i in range(5))
+        self.assertEqual(len(bus.recv_batch(max_count=3)), 3)
+        self.assertEqual(len(bus.recv_batch(max_count=3)), 2)
+
+    def test_recv_batch_timeout(self):
+        self.assertEqual(QueueBus().recv_batch(timeout=0.1), [])
+
+    def test_send_batch(self):
+        bus = QueueBus()
+        messages = [can.Message(arbitration_id=i) for i in range(3)]
+        bus.send_batch(iter(messages))
+        self.assertEqual(bus.tx, messages)
+
+
+class NotifierTest(unittest.TestCase):
+
+    def test_listeners_receive_every_message(self):
+        messages = [can.Message(arbitration_id=i) for i in range(10)]
+        bus = QueueBus(messages)
+        reader = can.BufferedReader()
+        notifier = can.Notifier(bus, [reader], timeout=0.01)
+        received = [reader.get_message(1.0) for _ in messages]
+        notifier.running.clear()
+        self.assertEqual(received, messages)
+
+    def test_threaded_listeners(self):
+        messages = [can.Message(arbitration_id=i) for i in range(100)]
+        readers = [can.BufferedReader(), can.BufferedReader()]
+        notifier = can.Notifier(QueueBus(messages), readers, timeout=0.01, threaded=True)
+        for reader in readers:
+            self.assertEqual([reader.get_message(1.0) for _ in messages], messages)
+        notifier.stop()
+        self.assertEqual(list(notifier.dropped.values()), [0, 0])
+
+    def check_slow_listener(self, overflow):
+        """Feed 20 messages through a queue of 5 to a listener which is
+        blocked until every message has been received.
+        """
+        messages = [can.Message(arbitration_id=i) for i in range(20)]
+        bus = QueueBus(messages[:1])
+        started, release = threading.Event(), threading.Event()
+        slow = []
+
+        def slow_listener(msg):
+            started.set()
+            release.wait()
+            slow.append(msg.arbitration_id)
+
+        notifier = can.Notifier(bus, [slow_listener], timeout=0.01, threaded=True,
+                                queue_size=5, overflow=overflow)
+        self.assertTrue(started.wait(1.0))
+        bus.rx.extend(messages[1:])
+        # Reception carries on despite the stuck listener
+        deadline = time.time() + 1.0
+        while sum(notifier.dropped.values()) < 14 and time.time() < deadline:
+            time.sleep(0.01)
+        release.set()
+        notifier.stop()
+        return slow, notifier.dropped[slow_listener]
+
+    def test_drop_newest(self):
+        slow, dropped = self.check_slow_listener(can.notifier.DROP_NEWEST)
+        # One message was taken by the worker before it blocked
+        self.assertEqual(slow, list(range(6)))
+        self.assertEqual(dropped, 14)
+
+    def test_drop_oldest(self):
+        slow, dropped = self.check_slow_listener(can.notifier.DROP_OLDEST)
+        self.assertEqual(slow, [0] + list(range(15, 20)))
+        self.assertEqual(dropped, 14)
+
+    def test_block_stalls_reception(self):
+        messages = [can.Message(arbitration_id=i) for i in range(20)]
+        bus = QueueBus(messages[:1])
+        started, release = threading.Event(), threading.Event()
+        seen = []
+
+        def slow_listener(msg):
+            started.set()
+            release.wait()
+
+        notifier = can.Notifier(bus, [slow_listener, seen.append], timeout=0.01,
+                                threaded=True, queue_size=5)
+        self.assertTrue(started.wait(1.0))
+        bus.rx.extend(messages[1:])
+        time.sleep(0.1)
+        # One being handled and five queued, the next waits for room
+        self.assertEqual(len(seen), 6)
+        release.set()
+        notifier.stop()
+        self.assertEqual(seen, messages)
+        self.assertEqual(list(notifier.dropped.values()), [0, 0])
+
+    def test_invalid_overflow(self):
+        with self.assertRaises(ValueError):
+            can.Notifier(QueueBus(), [], overflow='sometimes')
+
+
+class RoutingTableTest(unittest.TestCase):
+
+    def setUp(self):
+        self.routes = can.notifier.RoutingTable()
+
+    def test_exact_and_masked(self):
+        self.routes.add('engine', [{'can_id': 0x0CF00400, 'can_mask': 0x1FFFFFFF}])
+        self.routes.add('pgn', [{'can_id': 0x00FEF100, 'can_mask': 0x00FFFF00}])
+        self.routes.add('all')
+        self.assertEqual(self.routes.lookup(0x0CF00400), ('engine', 'all'))
+        self.assertEqual(self.routes.lookup(0x18FEF1FE), ('pgn', 'all'))
+        self.assertEqual(self.routes.lookup(0x123), ('all',))
+
+    def test_target_returned_once_in_order(self):
+        self.routes.add('a', [{'can_id': 0x100, 'can_mask': 0x1FFFFFFF},
+                              {'can_id': 0x100, 'can_mask': 0x700}])
+        self.routes.add('b', [{'can_id': 0x100, 'can_mask': 0x1FFFFFFF}])
+        self.assertEqual(self.routes.lookup(0x100), ('a', 'b'))
+
+    def test_changes_invalidate_cache(self):
+        self.routes.add('a', [{'can_id': 0x100, 'can_mask': 0x1FFFFFFF}])
+        self.assertEqual(self.routes.lookup(0x100), ('a',))
+        self.routes.add('b', [{'can_id': 0, 'can_mask': 0}])
+        self.assertEqual(self.routes.lookup(0x100), ('a', 'b'))
+        self.routes.remove('a')
+        self.assertEqual(self.routes.lookup(0x100), ('b',))
+
+    def test_filter_matcher(self):
+        self.assertIsNone(can.notifier.filter_matcher(None))
+        self.assertIsNone(can.notifier.filter_matcher([]))
+        wants = can.notifier.filter_matcher([{'can_id': 0x100, 'can_mask': 0x1FFFFFFF},
+                                             {'can_id': 0x200, 'can_mask': 0x700}])
+        self.assertTrue(wants(0x100))
+        self.assertTrue(wants(0x2AB))
+        self.assertFalse(wants(0x101))
+        self.assertFalse(wants(0x300))
+
+    def test_notifier_subscriptions(self):
+        messages = [can.Message(arbitration_id=i) for i in range(0x100, 0x110)]
+        bus = QueueBus()
+        everything, exact, masked = [], [], []
+        notifier = can.Notifier(bus, [everything.append], timeout=0.01)
+        notifier.subscribe(exact.append, [{'can_id': 0x105, 'can_mask': 0x1FFFFFFF}])
+        notifier.subscribe(masked.append, [{'can_id': 0x108, 'can_mask': 0x1FFFFFF8}])
+        bus.rx.extend(messages)
+        deadline = time.time() + 1.0
+        while len(everything) < len(messages) and time.time() < deadline:
+            time.sleep(0.01)
+        notifier.stop()
+        self.assertEqual(everything, messages)
+        self.assertEqual(exact, messages[5:6])
+        self.assertEqual(masked, messages[8:16])
+
+
+if __name__ == '__main__':
+    unittest.main()
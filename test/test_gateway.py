@@ -0,0 +1,120 @@
+import time
+import unittest
+
+import can
+from can.gateway import Gateway, Route
+from can.interfaces.virtual import VirtualBus
+
+
+class FailingBus(can.BusABC):
+
+    channel_info = "failing"
+
+    def send(self, msg):
+        raise can.CanError("Transmit buffer full")
+
+
+class GatewayTest(unittest.TestCase):
+
+    def setUp(self):
+        self.buses = []
+        self.gateway = None
+        # Each gateway port and a test node on the same virtual channel
+        self.chassis, self.chassis_node = self.bus('chassis'), self.bus('chassis')
+        self.diag, self.diag_node = self.bus('diag'), self.bus('diag')
+
+    def tearDown(self):
+        if self.gateway is not None:
+            self.gateway.stop()
+        for bus in self.buses:
+            bus.shutdown()
+
+    def bus(self, channel):
+        bus = VirtualBus(channel)
+        self.buses.append(bus)
+        return bus
+
+    def start(self, routes, buses=None):
+        self.gateway = Gateway(buses or {'chassis': self.chassis, 'diag': self.diag}, routes,
+                               timeout=0.01, poll_interval=0.001)
+        return self.gateway
+
+    def receive(self, bus, count, timeout=2):
+        messages = []
+        end_time = time.time() + timeout
+        while len(messages) < count and time.time() < end_time:
+            messages.extend(bus.recv_batch(count - len(messages), timeout=0.05))
+        return messages
+
+    def test_forward_with_filter(self):
+        self.start([Route([self.diag], [{"can_id": 0x100, "can_mask": 0x700}])])
+        msg = can.Message(arbitration_id=0x123, extended_id=False)
+        self.chassis_node.send_batch([can.Message(arbitration_id=0x200, extended_id=False), msg])
+        received = self.receive(self.diag_node, 1)
+        self.assertEqual(len(received), 1)
+        # Unchanged frames are forwarded as they are
+        self.assertIs(received[0], msg)
+        self.assertIsNone(self.diag_node.recv(timeout=0.05))
+
+    def test_rewrite(self):
+        self.start([
+            Route([self.diag], [{"can_id": 0x100, "can_mask": 0x7FF}], rewrite={0x100: 0x600}),
+            Route([self.diag], [{"can_id": 0x200, "can_mask": 0x700}], rewrite=lambda i: i | 0x400),
+        ])
+        original = can.Message(arbitration_id=0x100, extended_id=False, data=[1, 2])
+        self.chassis_node.send_batch([original, can.Message(arbitration_id=0x234, extended_id=False)])
+        received = self.receive(self.diag_node, 2)
+        self.assertEqual([msg.arbitration_id for msg in received], [0x600, 0x634])
+        self.assertFalse(received[0].id_type)
+        self.assertEqual(received[0].data, original.data)
+        self.assertEqual(original.arbitration_id, 0x100)
+
+    def test_sources_and_no_echo(self):
+        # Applies to both sources but never sends a frame back where it came from
+        both = Route([self.chassis, self.diag])
+        self.start([both])
+        self.chassis_node.send(can.Message(arbitration_id=1))
+        self.diag_node.send(can.Message(arbitration_id=2))
+        self.assertEqual([msg.arbitration_id for msg in self.receive(self.diag_node, 1)], [1])
+        self.assertEqual([msg.arbitration_id for msg in self.receive(self.chassis_node, 1)], [2])
+        self.assertIsNone(self.chassis_node.recv(timeout=0.05))
+
+        self.gateway.remove_route(both)
+        self.gateway.add_route(Route([self.chassis, self.diag], sources=[self.diag]))
+        self.chassis_node.send(can.Message(arbitration_id=3))
+        self.diag_node.send(can.Message(arbitration_id=4))
+        self.assertEqual([msg.arbitration_id for msg in self.receive(self.chassis_node, 1)], [4])
+        self.assertIsNone(self.diag_node.recv(timeout=0.05))
+
+    def test_statistics(self):
+        route = Route([self.diag], name="chassis to diag")
+        self.start([route])
+        self.chassis_node.send_batch([can.Message(arbitration_id=i) for i in range(100)])
+        self.assertEqual(len(self.receive(self.diag_node, 100)), 100)
+        self.assertEqual(route.forwarded, 100)
+        self.assertGreater(route.max_latency, 0)
+        self.assertLessEqual(route.mean_latency, route.max_latency)
+        self.assertTrue(self.gateway.report().startswith("chassis to diag: forwarded 100, failed 0"))
+
+    def test_failing_destination(self):
+        route = Route([FailingBus()])
+        self.start([route])
+        self.chassis_node.send_batch([can.Message(), can.Message()])
+        for _ in range(100):
+            if route.failed:
+                break
+            time.sleep(0.01)
+        self.assertEqual(route.failed, 2)
+        self.assertEqual(route.forwarded, 0)
+
+    def test_subscribe(self):
+        self.start([Route([self.diag])])
+        seen = []
+        self.gateway.subscribe(seen.append, [{"can_id": 0x10, "can_mask": 0x7FF}])
+        self.chassis_node.send_batch([can.Message(arbitration_id=0x10), can.Message(arbitration_id=0x11)])
+        self.assertEqual(len(self.receive(self.diag_node, 2)), 2)
+        self.assertEqual([(msg.arbitration_id, msg.channel) for msg in seen], [(0x10, 'chassis')])
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,594 @@
+import os
+import queue
+import shutil
+import sqlite3
+import struct
+import tempfile
+import threading
+import time
+import unittest
+
+try:
+    import numpy
+except ImportError:
+    numpy = None
+
+import can
+from can.message import FLAG_EXTENDED_ID, FLAG_REMOTE_FRAME
+
+
+def messages(count):
+    return [can.Message(arbitration_id=i) for i in range(count)]
+
+
+class BufferedReaderTest(unittest.TestCase):
+
+    def fill(self, reader, count):
+        for msg in messages(count):
+            reader.on_message_received(msg)
+
+    def ids(self, msgs):
+        return [msg.arbitration_id for msg in msgs]
+
+    def test_unbounded(self):
+        reader = can.BufferedReader()
+        self.fill(reader, 1000)
+        self.assertEqual(len(reader), 1000)
+        self.assertEqual(reader.get_message().arbitration_id, 0)
+        self.assertEqual(reader.dropped, 0)
+
+    def test_get_message_timeout(self):
+        reader = can.BufferedReader()
+        start = time.time()
+        self.assertIsNone(reader.get_message(0.05))
+        self.assertTrue(time.time() - start >= 0.04)
+
+    def test_get_messages(self):
+        reader = can.BufferedReader()
+        self.fill(reader, 10)
+        self.assertEqual(self.ids(reader.get_messages(4)), [0, 1, 2, 3])
+        self.assertEqual(self.ids(reader.get_messages()), list(range(4, 10)))
+        self.assertEqual(reader.get_messages(timeout=0.01), [])
+
+    def test_get_messages_waits_for_first(self):
+        reader = can.BufferedReader()
+        threading.Timer(0.02, self.fill, (reader, 3)).start()
+        self.assertEqual(len(reader.get_messages(timeout=1.0)), 3)
+
+    def test_drop_oldest(self):
+        reader = can.BufferedReader(max_size=5)
+        self.fill(reader, 12)
+        self.assertEqual(reader.dropped, 7)
+        self.assertEqual(self.ids(reader.get_messages()), [7, 8, 9, 10, 11])
+
+    def test_drop_newest(self):
+        reader = can.BufferedReader(max_size=5, overflow='drop_newest')
+        self.fill(reader, 12)
+        self.assertEqual(reader.dropped, 7)
+        self.assertEqual(self.ids(reader.get_messages()), [0, 1, 2, 3, 4])
+
+    def test_block(self):
+        reader = can.BufferedReader(max_size=2, overflow='block')
+        filler = threading.Thread(target=self.fill, args=(reader, 5))
+        filler.start()
+        time.sleep(0.05)
+        self.assertTrue(filler.is_alive())
+        received = []
+        while len(received) < 5:
+            received.extend(reader.get_messages(timeout=1.0))
+        filler.join(1.0)
+        self.assertEqual(self.ids(received), list(range(5)))
+        self.assertEqual(reader.dropped, 0)
+
+    def test_high_water_callback(self):
+        calls = []
+        reader = can.BufferedReader(max_size=10, high_water_mark=4, on_high_water=calls.append)
+        self.fill(reader, 6)
+        self.assertEqual(calls, [reader])
+        reader.get_messages(1)
+        self.fill(reader, 1)
+        # Still above the mark, so not re-armed
+        self.assertEqual(len(calls), 1)
+        reader.get_messages()
+        self.fill(reader, 4)
+        self.assertEqual(len(calls), 2)
+
+    def test_stop_wakes_waiting_reader(self):
+        reader = can.BufferedReader()
+        self.fill(reader, 1)
+        threading.Timer(0.02, reader.stop).start()
+        self.assertEqual(len(reader.get_messages(timeout=None)), 1)
+        self.assertEqual(reader.get_messages(timeout=None), [])
+        self.fill(reader, 1)
+        self.assertEqual(len(reader), 0)
+
+    def test_block_discards_after_stop(self):
+        reader = can.BufferedReader(max_size=1, overflow='block')
+        self.fill(reader, 1)
+        filler = threading.Thread(target=self.fill, args=(reader, 1))
+        filler.start()
+        time.sleep(0.02)
+        reader.stop()
+        filler.join(1.0)
+        self.assertFalse(filler.is_alive())
+        self.assertEqual(len(reader), 1)
+
+    def test_queue_interface(self):
+        reader = can.BufferedReader(max_size=2)
+        self.assertTrue(reader.buffer.empty())
+        reader.buffer.put(can.Message(arbitration_id=1))
+        self.fill(reader, 1)
+        self.assertEqual(reader.buffer.qsize(), 2)
+        self.assertTrue(reader.buffer.full())
+        self.assertEqual(reader.buffer.get(timeout=0.1).arbitration_id, 1)
+        self.assertEqual(reader.buffer.get_nowait().arbitration_id, 0)
+        with self.assertRaises(queue.Empty):
+            reader.buffer.get(timeout=0.01)
+
+    def test_invalid_overflow(self):
+        with self.assertRaises(ValueError):
+            can.BufferedReader(10, overflow='never')
+
+
+class SqliteWriterTest(unittest.TestCase):
+
+    def setUp(self):
+        self.directory = tempfile.mkdtemp()
+        self.filename = os.path.join(self.directory, 'log.db')
+
+    def tearDown(self):
+        shutil.rmtree(self.directory)
+
+    def query(self, sql):
+        db = sqlite3.connect(self.filename)
+        try:
+            return db.execute(sql).fetchall()
+        finally:
+            db.close()
+
+    def test_round_trip(self):
+        writer = can.SqliteWriter(self.filename)
+        writer(can.Message(timestamp=1.5, arbitration_id=0x123, extended_id=False, data=[1, 2, 3]))
+        writer(can.Message(timestamp=2.0, arbitration_id=0x0CF00400, is_remote_frame=True, dlc=8))
+        writer.stop()
+        self.assertEqual(self.query("SELECT * FROM messages"), [
+            (1.5, 0x123, 0, 3, b'\x01\x02\x03'),
+            (2.0, 0x0CF00400, FLAG_EXTENDED_ID | FLAG_REMOTE_FRAME, 8, b''),
+        ])
+
+    def test_schema(self):
+        can.SqliteWriter(self.filename).stop()
+        self.assertEqual(self.query("PRAGMA journal_mode"), [('wal',)])
+        indexes = self.query("SELECT sql FROM sqlite_master WHERE type = 'index'")
+        self.assertEqual(len(indexes), 1)
+        self.assertIn("(arbitration_id, ts)", indexes[0][0])
+
+    def test_batches(self):
+        writer = can.SqliteWriter(self.filename, batch_size=100, max_delay=10.0)
+        for msg in messages(250):
+            writer(msg)
+        # Two full batches are written straight away, the rest waits
+        deadline = time.time() + 2.0
+        while writer.written < 200 and time.time() < deadline:
+            time.sleep(0.01)
+        self.assertEqual(writer.written, 200)
+        writer.stop()
+        self.assertEqual(writer.written, 250)
+        self.assertEqual(self.query("SELECT count(*) FROM messages"), [(250,)])
+
+    def test_max_delay(self):
+        writer = can.SqliteWriter(self.filename, batch_size=100, max_delay=0.05)
+        writer(can.Message())
+        time.sleep(0.3)
+        self.assertEqual(self.query("SELECT count(*) FROM messages"), [(1,)])
+        writer.stop()
+
+    def test_appends_to_existing_table(self):
+        for _ in range(2):
+            writer = can.SqliteWriter(self.filename)
+            writer(can.Message())
+            writer.stop()
+        self.assertEqual(self.query("SELECT count(*) FROM messages"), [(2,)])
+
+    def test_bad_path(self):
+        with self.assertRaises(sqlite3.Error):
+            can.SqliteWriter(os.path.join(self.directory, 'missing', 'log.db'))
+
+    def test_write_error(self):
+        writer = can.SqliteWriter(self.filename, max_delay=0.01)
+        self.query("DROP TABLE messages")
+        with self.assertLogs('can', 'ERROR'):
+            writer(can.Message())
+            writer._writer.join(1.0)
+        # Messages are discarded rather than buffered with nobody to write them
+        writer(can.Message())
+        self.assertEqual(len(writer._buffer), 0)
+        with self.assertRaises(sqlite3.OperationalError):
+            writer.stop()
+
+
+class CSVWriterTest(unittest.TestCase):
+
+    def setUp(self):
+        self.directory = tempfile.mkdtemp()
+        self.filename = os.path.join(self.directory, 'log.csv')
+
+    def tearDown(self):
+        shutil.rmtree(self.directory)
+
+    def lines(self):
+        with open(self.filename) as f:
+            return f.read().splitlines()
+
+    def test_rows(self):
+        writer = can.CSVWriter(self.filename)
+        writer(can.Message(timestamp=1.5, arbitration_id=0x0CF00400, data=[0xff, 0x7d]))
+        writer(can.Message(timestamp=2.25, arbitration_id=0x12, extended_id=False, is_remote_frame=True))
+        writer(can.Message(timestamp=3.0, arbitration_id=0x123, extended_id=False, is_fd=True,
+                           bitrate_switch=True, data=bytearray(12)))
+        writer.stop()
+        self.assertEqual(self.lines(), [
+            "timestamp,arbitration_id,flags,dlc,data",
+            "1.500000,0x0CF00400,1,2,FF7D",
+            "2.250000,0x012,2,0,",
+            "3.000000,0x123,24,12," + "00" * 12,
+        ])
+
+    def test_buffered_rows(self):
+        writer = can.CSVWriter(self.filename, buffer_rows=10, flush_interval=60)
+        for msg in messages(15):
+            writer(msg)
+        # Only the first ten have been written
+        self.assertEqual(len(self.lines()), 11)
+        writer.stop()
+        self.assertEqual(len(self.lines()), 16)
+
+    def test_flush_interval(self):
+        writer = can.CSVWriter(self.filename, buffer_rows=1000, flush_interval=0.05)
+        writer(can.Message())
+        time.sleep(0.06)
+        writer(can.Message())
+        self.assertEqual(len(self.lines()), 3)
+        writer.stop()
+
+
+class BinaryLogTest(unittest.TestCase):
+
+    def setUp(self):
+        self.directory = tempfile.mkdtemp()
+        self.filename = os.path.join(self.directory, 'log.bin')
+        self.messages = [
+            can.Message(timestamp=1.5, arbitration_id=0x0CF00400, data=[1, 2, 3, 4, 5, 6, 7, 8]),
+            can.Message(timestamp=2.0, arbitration_id=0x123, extended_id=False, data=[9]),
+            can.Message(timestamp=2.5, arbitration_id=0x18FEF100, is_remote_frame=True, dlc=8),
+        ]
+
+    def tearDown(self):
+        shutil.rmtree(self.directory)
+
+    def write(self, messages, **kwargs):
+        writer = can.BinaryWriter(self.filename, **kwargs)
+        for msg in messages:
+            writer(msg)
+        writer.stop()
+
+    def assertMessagesEqual(self, a, b):
+        self.assertEqual(len(a), len(b))
+        for m1, m2 in zip(a, b):
+            for name in ('timestamp', 'arbitration_id', 'id_type', 'is_remote_frame', 'is_error_frame',
+                         'dlc', 'is_fd', 'bitrate_switch', 'error_state_indicator'):
+                self.assertEqual(getattr(m1, name), getattr(m2, name), name)
+            self.assertEqual(bytes(m1.data), bytes(m2.data))
+
+    def test_round_trip(self):
+        self.write(self.messages, buffer_rows=2)
+        self.assertEqual(os.path.getsize(self.filename), 16 + 3 * 22)
+        reader = can.BinaryReader(self.filename)
+        self.assertEqual(len(reader), 3)
+        self.assertMessagesEqual(list(reader), self.messages)
+        self.assertMessagesEqual([reader[-1]], self.messages[-1:])
+        with self.assertRaises(IndexError):
+            reader[3]
+        reader.close()
+
+    def test_fd_records(self):
+        messages = [can.Message(arbitration_id=1, is_fd=True, bitrate_switch=True, data=bytearray(range(64)))]
+        self.write(messages, payload_size=64)
+        reader = can.BinaryReader(self.filename)
+        self.assertEqual(reader.payload_size, 64)
+        self.assertMessagesEqual(list(reader), messages)
+        reader.close()
+
+    def test_payload_too_large(self):
+        writer = can.BinaryWriter(self.filename)
+        with self.assertLogs('can', 'WARNING'):
+            writer(can.Message(is_fd=True, data=bytearray(12)))
+        writer(self.messages[0])
+        writer.stop()
+        self.assertEqual(writer.skipped, 1)
+        reader = can.BinaryReader(self.filename)
+        self.assertMessagesEqual(list(reader), self.messages[:1])
+        reader.close()
+
+    def test_partial_record_ignored(self):
+        self.write(self.messages)
+        with open(self.filename, 'ab') as f:
+            f.write(b'\x00' * 5)
+        reader = can.BinaryReader(self.filename)
+        self.assertEqual(len(reader), 3)
+        reader.close()
+
+    def test_not_a_log(self):
+        with open(self.filename, 'wb') as f:
+            f.write(b'timestamp, arbitration_id\n')
+        with self.assertRaises(ValueError):
+            can.BinaryReader(self.filename)
+
+    @unittest.skipIf(numpy is None, "NumPy isn't installed")
+    def test_array_view(self):
+        self.write(self.messages)
+        reader = can.BinaryReader(self.filename)
+        array = reader.array()
+        self.assertFalse(array.flags.owndata)
+        self.assertEqual(array['arbitration_id'].tolist(), [0x0CF00400, 0x123, 0x18FEF100])
+        self.assertEqual(array['dlc'].tolist(), [8, 1, 8])
+        self.assertMessagesEqual(reader.batch().to_messages(), self.messages)
+        del array
+        reader.close()
+
+
+CANDUMP_LOG = """\
+(1436509052.249713) vcan0 12345678#0102030405060708
+(1436509052.250000) vcan0 123#
+(1436509052.251000) can1 7FF#R
+(1436509052.252000) vcan0 123#R5
+(1436509052.253000) vcan0 20000004#0000000000000000
+(1436509052.254000) vcan0 1FFFFFFF##3AABBCCDDEEFF001122334455
+garbage
+(1436509052.255000) vcan0 321##0
+"""
+
+
+class CanutilsLogTest(unittest.TestCase):
+
+    def setUp(self):
+        self.directory = tempfile.mkdtemp()
+        self.filename = os.path.join(self.directory, 'candump.log')
+
+    def tearDown(self):
+        shutil.rmtree(self.directory)
+
+    def read(self):
+        return list(can.CanutilsLogReader(self.filename))
+
+    def test_read(self):
+        with open(self.filename, 'w') as f:
+            f.write(CANDUMP_LOG)
+        messages = self.read()
+        self.assertEqual(len(messages), 7)
+        first, empty, remote, remote_dlc, error, fd, fd_empty = messages
+
+        self.assertEqual(first.timestamp, 1436509052.249713)
+        self.assertEqual(first.channel, 'vcan0')
+        self.assertEqual(first.arbitration_id, 0x12345678)
+        self.assertTrue(first.id_type)
+        self.assertEqual(bytes(first.data), b'\x01\x02\x03\x04\x05\x06\x07\x08')
+
+        self.assertFalse(empty.id_type)
+        self.assertEqual(empty.dlc, 0)
+
+        self.assertEqual(remote.channel, 'can1')
+        self.assertTrue(remote.is_remote_frame)
+        self.assertEqual(remote_dlc.dlc, 5)
+
+        self.assertTrue(error.is_error_frame)
+        self.assertEqual(error.arbitration_id, 4)
+
+        self.assertTrue(fd.is_fd)
+        self.assertTrue(fd.bitrate_switch)
+        self.assertTrue(fd.error_state_indicator)
+        self.assertEqual(fd.dlc, 12)
+
+        self.assertTrue(fd_empty.is_fd)
+        self.assertFalse(fd_empty.bitrate_switch)
+        self.assertEqual(fd_empty.dlc, 0)
+
+    def test_skips_too_much_data(self):
+        with open(self.filename, 'w') as f:
+            f.write("(1.0) can0 123#0102030405060708090A\n(2.0) can0 124#01\n")
+        with self.assertLogs('can', 'WARNING'):
+            messages = self.read()
+        self.assertEqual([msg.arbitration_id for msg in messages], [0x124])
+
+    def test_write_matches_candump(self):
+        source = os.path.join(self.directory, 'source.log')
+        with open(source, 'w') as f:
+            f.write(CANDUMP_LOG)
+        writer = can.CanutilsLogWriter(self.filename)
+        for msg in can.CanutilsLogReader(source):
+            writer(msg)
+        writer.stop()
+        with open(self.filename) as f:
+            self.assertEqual(f.read(), CANDUMP_LOG.replace("garbage\n", ""))
+
+    def test_default_channel(self):
+        writer = can.CanutilsLogWriter(self.filename, channel='can0')
+        writer(can.Message(timestamp=1.0, arbitration_id=0x10, extended_id=False, data=[0xab]))
+        writer.stop()
+        with open(self.filename) as f:
+            self.assertEqual(f.read(), "(1.000000) can0 010#AB\n")
+
+
+ASC_LOG = """\
+date Fri Jul 10 07:57:32.000 am 2015
+base hex  timestamps {}
+internal events logged
+// version 9.0.0
+Begin Triggerblock Fri Jul 10 07:57:32.000 am 2015
+   0.000000 Start of measurement
+   0.015991 CAN 1 Status:chip status error active
+   1.015991 1  123             Rx   d 3 01 02 03  Length = 0 BitCount = 0
+   2.015991 2  12345678x       Tx   d 8 01 02 03 04 05 06 07 08
+   3.015991 1  7FF             Rx   r
+   4.015991 1  ErrorFrame
+   5.015991 CANFD   1 Rx        1A3x  EngineData 1 0 9 12 11 22 33 44 55 66 77 88 99 AA BB CC   0 0 3000 0 0 0 0 0
+End TriggerBlock
+"""
+
+
+class ASCTest(unittest.TestCase):
+
+    def setUp(self):
+        self.directory = tempfile.mkdtemp()
+        self.filename = os.path.join(self.directory, 'trace.asc')
+
+    def tearDown(self):
+        shutil.rmtree(self.directory)
+
+    def read(self, mode):
+        with open(self.filename, 'w') as f:
+            f.write(ASC_LOG.format(mode))
+        reader = can.ASCReader(self.filename)
+        return reader, list(reader)
+
+    def test_absolute(self):
+        reader, messages = self.read('absolute')
+        self.assertEqual(len(messages), 5)
+        classic, extended, remote, error, fd = messages
+        self.assertIsNotNone(reader.start_time)
+
+        self.assertEqual(classic.timestamp, 1.015991)
+        self.assertEqual(classic.channel, 1)
+        self.assertEqual(classic.arbitration_id, 0x123)
+        self.assertFalse(classic.id_type)
+        self.assertEqual(bytes(classic.data), b'\x01\x02\x03')
+
+        self.assertEqual(extended.channel, 2)
+        self.assertTrue(extended.id_type)
+        self.assertEqual(extended.dlc, 8)
+
+        self.assertTrue(remote.is_remote_frame)
+        self.assertEqual(remote.arbitration_id, 0x7FF)
+        self.assertTrue(error.is_error_frame)
+
+        self.assertTrue(fd.is_fd)
+        self.assertTrue(fd.bitrate_switch)
+        self.assertFalse(fd.error_state_indicator)
+        self.assertEqual(fd.arbitration_id, 0x1A3)
+        self.assertEqual(fd.dlc, 12)
+        self.assertEqual(fd.data[-1], 0xCC)
+
+    def test_relative(self):
+        _, messages = self.read('relative')
+        self.assertEqual([round(msg.timestamp, 6) for msg in messages],
+                         [1.031982, 3.047973, 6.063964, 10.079955, 15.095946])
+
+    def test_round_trip(self):
+        _, messages = self.read('absolute')
+        copy = os.path.join(self.directory, 'copy.asc')
+        writer = can.ASCWriter(copy)
+        for msg in messages:
+            writer(msg)
+        writer.stop()
+        copied = list(can.ASCReader(copy))
+        self.assertEqual(len(copied), len(messages))
+        for original, msg in zip(messages, copied):
+            self.assertAlmostEqual(msg.timestamp, original.timestamp - messages[0].timestamp, 6)
+            for name in ('arbitration_id', 'id_type', 'is_remote_frame', 'is_error_frame', 'dlc',
+                         'is_fd', 'bitrate_switch', 'channel'):
+                self.assertEqual(getattr(msg, name), getattr(original, name), name)
+            self.assertEqual(bytes(msg.data), bytes(original.data))
+
+    def test_empty_trace(self):
+        can.ASCWriter(self.filename).stop()
+        self.assertEqual(list(can.ASCReader(self.filename)), [])
+
+
+class PcapngTest(unittest.TestCase):
+
+    def setUp(self):
+        self.directory = tempfile.mkdtemp()
+        self.filename = os.path.join(self.directory, 'capture.pcapng')
+        self.messages = [
+            can.Message(timestamp=1436509052.249713, arbitration_id=0x0CF00400, data=[1, 2, 3]),
+            can.Message(timestamp=1436509052.5, arbitration_id=0x123, extended_id=False,
+                        data=[4], channel='can1'),
+            can.Message(timestamp=1436509053.0, arbitration_id=0x7FF, extended_id=False,
+                        is_remote_frame=True, dlc=2),
+            can.Message(timestamp=1436509053.5, arbitration_id=0x1A3, extended_id=False, is_fd=True,
+                        bitrate_switch=True, data=bytearray(range(12)), channel='can1'),
+        ]
+
+    def tearDown(self):
+        shutil.rmtree(self.directory)
+
+    def write(self, **kwargs):
+        writer = can.PcapngWriter(self.filename, **kwargs)
+        for msg in self.messages:
+            writer(msg)
+        writer.stop()
+
+    def test_round_trip(self):
+        self.write(buffer_rows=3)
+        messages = list(can.PcapngReader(self.filename))
+        self.assertEqual(len(messages), len(self.messages))
+        for original, msg in zip(self.messages, messages):
+            self.assertAlmostEqual(msg.timestamp, original.timestamp, 6)
+            for name in ('arbitration_id', 'id_type', 'is_remote_frame', 'is_error_frame', 'dlc',
+                         'is_fd', 'bitrate_switch', 'error_state_indicator'):
+                self.assertEqual(getattr(msg, name), getattr(original, name), name)
+            self.assertEqual(bytes(msg.data), bytes(original.data))
+        self.assertEqual([msg.channel for msg in messages], ['can0', 'can1', 'can0', 'can1'])
+
+    def test_blocks(self):
+        self.write(channel='vcan0')
+        with open(self.filename, 'rb') as f:
+            capture = f.read()
+        offset = 0
+        blocks, can_ids = [], []
+        while offset < len(capture):
+            block_type, length = struct.unpack_from('<II', capture, offset)
+            self.assertEqual(length % 4, 0)
+            self.assertEqual(struct.unpack_from('<I', capture, offset + length - 4)[0], length)
+            blocks.append(block_type)
+            if block_type == 1:
+                self.assertEqual(struct.unpack_from('<H', capture, offset + 8)[0], 227)
+            if block_type == 6:
+                captured = struct.unpack_from('<I', capture, offset + 20)[0]
+                self.assertIn(captured, (16, 72))
+                can_ids.append(capture[offset + 28:offset + 32])
+            offset += length
+        # Section header, then each interface is described before its first packet
+        self.assertEqual(blocks, [0x0A0D0D0A, 1, 6, 1, 6, 6, 6])
+        # can_id is big endian with the extended frame flag set
+        self.assertEqual(can_ids[0], b'\x8c\xf0\x04\x00')
+        self.assertEqual(can_ids[2], b'\x40\x00\x07\xff')
+
+    def test_skips_invalid_length(self):
+        self.write()
+        with open(self.filename, 'r+b') as f:
+            capture = bytearray(f.read())
+            # Claim 12 data bytes in the classic frame of the first packet
+            offset = 0
+            while struct.unpack_from('<I', capture, offset)[0] != 6:
+                offset += struct.unpack_from('<I', capture, offset + 4)[0]
+            capture[offset + 28 + 4] = 12
+            f.seek(0)
+            f.write(capture)
+        with self.assertLogs('can', 'WARNING'):
+            messages = list(can.PcapngReader(self.filename))
+        self.assertEqual([msg.arbitration_id for msg in messages], [0x123, 0x7FF, 0x1A3])
+
+    def test_skips_other_link_types(self):
+        self.write()
+        with open(self.filename, 'r+b') as f:
+            capture = bytearray(f.read())
+            # Turn the first interface into Ethernet
+            struct.pack_into('<H', capture, 28 + 8, 1)
+            f.seek(0)
+            f.write(capture)
+        self.assertEqual([msg.channel for msg in can.PcapngReader(self.filename)], ['can1', 'can1'])
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,114 @@
+import unittest
+
+import can
+
+
+class MessageTest(unittest.TestCase):
+
+    def test_has_no_instance_dict(self):
+        m = can.Message()
+        self.assertFalse(hasattr(m, '__dict__'))
+        with self.assertRaises(AttributeError):
+            m.not_a_field = 1
+
+    def test_subclass_can_add_attributes(self):
+        class Extended(can.Message):
+            pass
+        m = Extended()
+        m.flags = 4
+        self.assertEqual(m.flags, 4)
+
+    def test_bytearray_payload_not_copied(self):
+        payload = bytearray(b'\x01\x02\x03')
+        m = can.Message(data=payload)
+        self.assertIs(m.data, payload)
+
+    def test_bytes_payload_mutable(self):
+        m = can.Message(data=b'\x01\x02')
+        self.assertIsInstance(m.data, bytearray)
+        m.data[0] = 5
+        self.assertEqual(m.data, bytearray(b'\x05\x02'))
+
+    def test_list_payload_converted(self):
+        m = can.Message(data=[1, 2, 3])
+        self.assertEqual(m.data, bytearray([1, 2, 3]))
+        self.assertIsInstance(m.data, bytearray)
+
+    def test_default_data(self):
+        m = can.Message()
+        self.assertEqual(m.data, bytearray())
+        self.assertEqual(m.dlc, 0)
+
+    def test_dlc_derived_from_data(self):
+        m = can.Message(data=[1, 2, 3])
+        self.assertEqual(m.dlc, 3)
+        m.data = bytearray(5)
+        self.assertEqual(m.dlc, 5)
+
+    def test_explicit_dlc(self):
+        m = can.Message(dlc=5)
+        self.assertEqual(m.dlc, 5)
+        self.assertEqual(len(m.data), 0)
+        m.dlc = 2
+        self.assertEqual(m.dlc, 2)
+
+    def test_dlc_too_large(self):
+        with self.assertRaises(ValueError):
+            can.Message(dlc=9)
+
+    def test_data_too_long(self):
+        with self.assertRaises(ValueError):
+            can.Message(data=bytes(12))
+        with self.assertRaises(ValueError):
+            can.Message(data=[0] * 9)
+        with self.assertRaises(ValueError):
+            can.Message(is_fd=True, data=bytearray(65))
+        self.assertEqual(can.Message(is_fd=True, data=bytes(12)).dlc, 12)
+
+    def test_fd_dlc(self):
+        m = can.Message(is_fd=True, dlc=64, data=bytearray(64))
+        self.assertEqual(m.dlc, 64)
+        self.assertFalse(m.bitrate_switch)
+        with self.assertRaises(ValueError):
+            can.Message(is_fd=True, dlc=65)
+
+    def test_channel(self):
+        self.assertIsNone(can.Message().channel)
+        self.assertEqual(can.Message(channel='vcan1').channel, 'vcan1')
+
+    def test_replace(self):
+        from can.message import _replace
+        m = can.Message(arbitration_id=0x100, extended_id=False, data=b'\x01\x02', is_fd=True)
+        copy = _replace(m, arbitration_id=0x200, channel='vcan1')
+        self.assertEqual((copy.arbitration_id, copy.channel), (0x200, 'vcan1'))
+        self.assertEqual((m.arbitration_id, m.channel), (0x100, None))
+        self.assertIs(copy.data, m.data)
+        self.assertEqual(copy.dlc, 2)
+        self.assertTrue(copy.is_fd)
+        self.assertFalse(copy.id_type)
+
+    def test_str(self):
+        m = can.Message(arbitration_id=0x100, extended_id=False, data=b'\x01\x02')
+        self.assertIn("0100", str(m))
+        self.assertIn("01 02", str(m))
+
+
+class DLCMappingTest(unittest.TestCase):
+
+    def test_dlc2len(self):
+        from can.util import dlc2len
+        self.assertEqual([dlc2len(dlc) for dlc in range(16)],
+                         [0, 1, 2, 3, 4, 5, 6, 7, 8, 12, 16, 20, 24, 32, 48, 64])
+
+    def test_len2dlc(self):
+        from can.util import len2dlc
+        self.assertEqual(len2dlc(8), 8)
+        self.assertEqual(len2dlc(9), 9)
+        self.assertEqual(len2dlc(12), 9)
+        self.assertEqual(len2dlc(13), 10)
+        self.assertEqual(len2dlc(33), 14)
+        self.assertEqual(len2dlc(64), 15)
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,207 @@
+import socket
+import threading
+import time
+import unittest
+
+import can
+from can.interfaces.network import NetworkBus, NetworkServer, decode_packet, encode_frame, encode_packet, \
+    _Coalescer, _SequenceChecker
+from can.interfaces.virtual import VirtualBus
+
+
+def _messages():
+    return [
+        can.Message(arbitration_id=0x123, extended_id=False, data=[1, 2, 3]),
+        can.Message(arbitration_id=0x1ABCDE, extended_id=True, is_remote_frame=True, dlc=4),
+        can.Message(arbitration_id=0x10, extended_id=False, is_fd=True, bitrate_switch=True, data=range(24)),
+        can.Message(arbitration_id=0x80, extended_id=False, is_error_frame=True, data=[0] * 8),
+    ]
+
+
+class CodecTest(unittest.TestCase):
+
+    def assertMessagesEqual(self, a, b):
+        self.assertEqual(len(a), len(b))
+        for m1, m2 in zip(a, b):
+            for name in ('arbitration_id', 'id_type', 'is_remote_frame', 'is_error_frame',
+                         'dlc', 'is_fd', 'bitrate_switch', 'error_state_indicator'):
+                self.assertEqual(getattr(m1, name), getattr(m2, name), name)
+            self.assertEqual(bytes(m1.data), bytes(m2.data))
+
+    def test_round_trip(self):
+        sent = _messages()
+        packet = encode_packet(300, [encode_frame(msg) for msg in sent])
+        seq, received, end = decode_packet(packet, channel='test')
+        self.assertEqual(seq, 300 & 0xFF)
+        self.assertEqual(end, len(packet))
+        self.assertMessagesEqual(received, sent)
+        self.assertEqual(received[0].channel, 'test')
+
+    def test_cannelloni_layout(self):
+        packet = encode_packet(7, [encode_frame(can.Message(arbitration_id=0x123, extended_id=False, data=[0xAB]))])
+        self.assertEqual(packet, b'\x02\x00\x07\x00\x01' + b'\x00\x00\x01\x23\x01\xAB')
+
+    def test_incomplete(self):
+        packet = encode_packet(0, [encode_frame(msg) for msg in _messages()])
+        for length in (3, 10, len(packet) - 1):
+            self.assertIsNone(decode_packet(packet[:length]))
+
+    def test_not_a_packet(self):
+        self.assertRaises(can.CanError, decode_packet, b'\x01\x00\x00\x00\x00')
+
+    def test_invalid_frame(self):
+        # A classic frame claiming 9 data bytes
+        packet = b'\x02\x00\x00\x00\x01' + b'\x00\x00\x01\x23\x09' + b'\x00' * 9
+        self.assertRaises(can.CanError, decode_packet, packet)
+
+
+class NetworkTest(unittest.TestCase):
+
+    protocol = 'udp'
+
+    def setUp(self):
+        self.local = VirtualBus('network_test')
+        self.remote = VirtualBus('network_test')
+        self.server = NetworkServer(self.remote, 0, host='127.0.0.1', protocol=self.protocol, coalesce_time=0.005)
+        self.bus = can.interface.Bus('127.0.0.1:{}'.format(self.server.address[1]), bustype='network',
+                                     protocol=self.protocol)
+
+    def tearDown(self):
+        self.bus.shutdown()
+        self.server.stop()
+        self.local.shutdown()
+        self.remote.shutdown()
+
+    def receive(self, bus, count):
+        messages = []
+        for _ in range(50):
+            messages.extend(bus.recv_batch(count - len(messages), timeout=0.1))
+            if len(messages) == count:
+                break
+        return messages
+
+    def test_client_to_bus(self):
+        self.bus.send_batch(can.Message(arbitration_id=i) for i in range(100))
+        received = self.receive(self.local, 100)
+        self.assertEqual([msg.arbitration_id for msg in received], list(range(100)))
+
+    def test_bus_to_client(self):
+        # Wait for the server to know the client
+        self.bus.send(can.Message(arbitration_id=0x7FF))
+        self.assertEqual(len(self.receive(self.local, 1)), 1)
+
+        self.local.send_batch([can.Message(arbitration_id=i, data=[i & 0xFF] * 8) for i in range(500)])
+        received = self.receive(self.bus, 500)
+        self.assertEqual([msg.arbitration_id for msg in received], list(range(500)))
+        self.assertEqual(self.bus.lost_packets, 0)
+        # Coalesced into a handful of packets rather than one per frame
+        self.assertLess(self.server._coalescer.packets_sent, 50)
+
+
+class TcpNetworkTest(NetworkTest):
+
+    protocol = 'tcp'
+
+
+class CoalescingTest(unittest.TestCase):
+
+    def setUp(self):
+        self.peer = socket.socket(socket.AF_INET, socket.SOCK_DGRAM)
+        self.peer.bind(('127.0.0.1', 0))
+        self.peer.settimeout(1)
+        self.bus = NetworkBus('127.0.0.1:{}'.format(self.peer.getsockname()[1]), coalesce_time=0.05)
+        # The bus introduces itself with an empty packet
+        data, self.address = self.peer.recvfrom(65535)
+        self.assertEqual(decode_packet(data)[1], [])
+
+    def tearDown(self):
+        self.bus.shutdown()
+        self.peer.close()
+
+    def test_window(self):
+        for i in range(10):
+            self.bus.send(can.Message(arbitration_id=i))
+        data, _ = self.peer.recvfrom(65535)
+        self.assertEqual(len(decode_packet(data)[1]), 10)
+
+    def test_mtu(self):
+        self.bus.send_batch(can.Message(arbitration_id=i, data=[0] * 8) for i in range(200))
+        counts = []
+        while sum(counts) < 200:
+            data, _ = self.peer.recvfrom(65535)
+            self.assertLessEqual(len(data), 1472)
+            counts.append(len(decode_packet(data)[1]))
+        self.assertEqual(len(counts), 2)
+
+    def test_other_packets_dropped(self):
+        frame = encode_frame(can.Message(arbitration_id=0x42))
+        # An op code other than data, as cannelloni peers may send
+        self.peer.sendto(b'\x02\x01\x00\x00\x00', self.address)
+        self.peer.sendto(encode_packet(0, [frame]), self.address)
+        with self.assertLogs('can.network', 'WARNING'):
+            msg = self.bus.recv(timeout=1)
+        self.assertEqual(msg.arbitration_id, 0x42)
+
+    def test_lost_packets(self):
+        frame = encode_frame(can.Message(arbitration_id=1))
+        sequence = (0, 1, 4, 3, 5, 100, 255, 0)
+        for seq in sequence:
+            self.peer.sendto(encode_packet(seq, [frame]), self.address)
+        self.assertEqual(len(self.bus.recv_batch(timeout=1)), 1)
+        received = 1
+        while received < len(sequence):
+            received += len(self.bus.recv_batch(timeout=1))
+        # 2 is still missing, 3 turned up late
+        self.assertEqual(self.bus.lost_packets, 1 + 94 + 154)
+
+
+class SequenceCheckerTest(unittest.TestCase):
+
+    def check(self, *sequence):
+        checker = _SequenceChecker()
+        for seq in sequence:
+            checker.check(seq)
+        return checker
+
+    def test_in_order_across_wraparound(self):
+        checker = self.check(*[i & 0xFF for i in range(250, 270)])
+        self.assertEqual((checker.lost, checker.reordered), (0, 0))
+
+    def test_late_packet_across_wraparound(self):
+        checker = self.check(254, 255, 1, 0, 2)
+        self.assertEqual((checker.lost, checker.reordered), (0, 1))
+        self.assertEqual(checker.expected, 3)
+
+    def test_gap_across_wraparound(self):
+        checker = self.check(250, 3)
+        self.assertEqual(checker.lost, 8)
+
+
+class CoalescerTest(unittest.TestCase):
+
+    def test_slow_send_does_not_block_adding(self):
+        started, release = threading.Event(), threading.Event()
+        sent = []
+
+        def slow_send(packet):
+            started.set()
+            release.wait()
+            sent.append(decode_packet(packet)[0])
+
+        coalescer = _Coalescer(slow_send)
+        frame = encode_frame(can.Message(arbitration_id=1))
+        sender = threading.Thread(target=coalescer.add, args=([frame],))
+        sender.start()
+        self.assertTrue(started.wait(1.0))
+        start = time.time()
+        coalescer.add([frame])
+        coalescer.add([frame])
+        self.assertLess(time.time() - start, 0.5)
+        release.set()
+        sender.join()
+        # The thread which was sending also sent what was queued meanwhile
+        self.assertEqual(sent, [0, 1, 2])
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,91 @@
+import threading
+import time
+import unittest
+
+import can
+from test.helpers import RecordingBus
+
+
+def recording(count, period):
+    return [can.Message(timestamp=100.0 + i * period, arbitration_id=i) for i in range(count)]
+
+
+class PlayerTest(unittest.TestCase):
+
+    def setUp(self):
+        self.bus = RecordingBus()
+
+    def send_times(self):
+        return [sent for sent, _ in self.bus.sent]
+
+    def test_keeps_gaps(self):
+        player = can.Player(recording(11, 0.01), self.bus)
+        start = time.time()
+        player.play()
+        self.assertEqual(player.sent, 11)
+        times = self.send_times()
+        self.assertAlmostEqual(times[-1] - times[0], 0.1, delta=0.01)
+        self.assertAlmostEqual(time.time() - start, 0.1, delta=0.02)
+        self.assertTrue(0 <= player.mean_error <= player.max_error < 0.005)
+
+    def test_speed(self):
+        player = can.Player(recording(11, 0.02), self.bus, speed=4.0)
+        player.play()
+        times = self.send_times()
+        self.assertAlmostEqual(times[-1] - times[0], 0.05, delta=0.01)
+
+    def test_as_fast_as_possible(self):
+        sent = []
+
+        class BatchBus(RecordingBus):
+            def send_batch(self, messages):
+                sent.append(len(messages))
+
+        player = can.Player(recording(100, 10.0), BatchBus(), speed=None)
+        start = time.time()
+        player.play()
+        self.assertTrue(time.time() - start < 0.5)
+        self.assertEqual(sent, [64, 36])
+        self.assertEqual(player.sent, 100)
+        self.assertIn("Sent 100 messages", player.report())
+
+    def test_filters(self):
+        player = can.Player(recording(20, 0.0), self.bus,
+                            can_filters=[{'can_id': 0x8, 'can_mask': 0x1FFFFFF8}])
+        player.play()
+        self.assertEqual([msg.arbitration_id for _, msg in self.bus.sent], list(range(8, 16)))
+        self.assertEqual(player.filtered, 12)
+
+    def test_skip(self):
+        player = can.Player(recording(10, 1.0), self.bus, skip=7.5)
+        start = time.time()
+        player.play()
+        # Playback starts at the first message after the skipped section
+        self.assertTrue(time.time() - start < 2.2)
+        self.assertEqual([msg.arbitration_id for _, msg in self.bus.sent], [8, 9])
+
+    def test_stop(self):
+        player = can.Player(recording(10, 1.0), self.bus)
+        threading.Timer(0.05, player.stop).start()
+        start = time.time()
+        player.play()
+        self.assertTrue(time.time() - start < 0.5)
+        self.assertEqual(player.sent, 1)
+
+    def test_invalid_speed(self):
+        with self.assertRaises(ValueError):
+            can.Player([], self.bus, speed=0)
+
+
+class LogReaderTest(unittest.TestCase):
+
+    def test_choose_reader(self):
+        self.assertIsInstance(can.LogReader('trace.ASC'), can.ASCReader)
+        self.assertIsInstance(can.LogReader('candump.log'), can.CanutilsLogReader)
+        self.assertIsInstance(can.LogReader('capture.pcapng'), can.PcapngReader)
+        with self.assertRaises(NotImplementedError):
+            can.LogReader('notes.txt')
+
+
+if __name__ == '__main__':
+    unittest.main()
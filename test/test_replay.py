@@ -0,0 +1,77 @@
+import os
+import shutil
+import tempfile
+import time
+import unittest
+
+import can
+from can.interfaces.replay import ReplayBus
+
+
+class ReplayBusTest(unittest.TestCase):
+
+    def setUp(self):
+        self.directory = tempfile.mkdtemp()
+        self.filename = os.path.join(self.directory, 'candump.log')
+        self.messages = [can.Message(timestamp=1000.0 + i * 0.02, arbitration_id=0x100 + i, data=[i])
+                         for i in range(10)]
+        writer = can.CanutilsLogWriter(self.filename)
+        for msg in self.messages:
+            writer(msg)
+        writer.stop()
+
+    def tearDown(self):
+        shutil.rmtree(self.directory)
+
+    def test_interface(self):
+        bus = can.interface.Bus(self.filename, bustype='replay')
+        self.assertIsInstance(bus, ReplayBus)
+        self.assertEqual(bus.recv().arbitration_id, 0x100)
+
+    def test_as_fast_as_possible(self):
+        bus = ReplayBus(self.filename)
+        start = time.time()
+        received = [bus.recv(timeout=1.0) for _ in self.messages]
+        self.assertTrue(time.time() - start < 0.1)
+        self.assertEqual([msg.arbitration_id for msg in received], list(range(0x100, 0x10a)))
+        self.assertEqual(received[3].timestamp, 1000.06)
+        self.assertFalse(bus.finished)
+        self.assertIsNone(bus.recv(timeout=0.01))
+        self.assertTrue(bus.finished)
+
+    def test_recv_batch(self):
+        bus = ReplayBus(self.filename)
+        self.assertEqual(len(bus.recv_batch(max_count=4)), 4)
+        self.assertEqual(len(bus.recv_batch(max_count=64)), 6)
+        self.assertEqual(bus.recv_batch(timeout=0.01), [])
+
+    def test_realtime(self):
+        bus = ReplayBus(self.filename, realtime=True, speed=2.0)
+        start = time.time()
+        bus.recv()
+        self.assertIsNone(bus.recv(timeout=0))
+        self.assertEqual(bus.recv(timeout=0.1).arbitration_id, 0x101)
+        for _ in range(8):
+            bus.recv()
+        self.assertAlmostEqual(time.time() - start, 0.09, delta=0.02)
+
+    def test_filters(self):
+        bus = ReplayBus(self.filename, can_filters=[{'can_id': 0x104, 'can_mask': 0x1FFFFFFE}])
+        self.assertEqual([msg.arbitration_id for msg in bus.recv_batch()], [0x104, 0x105])
+
+    def test_notifier_and_listeners(self):
+        bus = ReplayBus(self.filename)
+        reader = can.BufferedReader()
+        notifier = can.Notifier(bus, [reader], timeout=0.01)
+        deadline = time.time() + 1.0
+        while not bus.finished and time.time() < deadline:
+            time.sleep(0.01)
+        notifier.stop()
+        self.assertEqual(len(reader.get_messages()), 10)
+
+    def test_send_is_discarded(self):
+        ReplayBus(self.filename).send(can.Message())
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,125 @@
+import multiprocessing
+import os
+import shutil
+import tempfile
+import unittest
+
+import can
+from can.interfaces.shm import SharedMemoryBus
+
+
+def _consume(path, count, results):
+    bus = SharedMemoryBus(path)
+    ready, received = results
+    ready.set()
+    ids = []
+    while len(ids) < count:
+        for msg in bus.recv_batch(timeout=5):
+            ids.append(msg.arbitration_id)
+    received.put(ids)
+    bus.shutdown()
+
+
+class SharedMemoryBusTest(unittest.TestCase):
+
+    def setUp(self):
+        self.directory = tempfile.mkdtemp()
+        self.path = os.path.join(self.directory, 'ring')
+        self.buses = []
+
+    def tearDown(self):
+        for bus in self.buses:
+            bus.shutdown()
+        shutil.rmtree(self.directory)
+
+    def bus(self, **kwargs):
+        bus = SharedMemoryBus(self.path, **kwargs)
+        self.buses.append(bus)
+        return bus
+
+    def test_interface(self):
+        bus = can.interface.Bus(self.path, bustype='shm', create=True, capacity=16)
+        self.buses.append(bus)
+        self.assertIsInstance(bus, SharedMemoryBus)
+
+    def test_round_trip(self):
+        producer = self.bus(create=True, capacity=16, payload_size=64)
+        consumer = self.bus()
+        sent = [
+            can.Message(timestamp=1.5, arbitration_id=0x123, data=[1, 2, 3]),
+            can.Message(timestamp=2.0, arbitration_id=0x1ABCDE, extended_id=True, is_remote_frame=True, dlc=4),
+            can.Message(timestamp=2.5, arbitration_id=0x10, is_fd=True, bitrate_switch=True, data=range(24)),
+        ]
+        producer.send_batch(sent)
+        received = consumer.recv_batch(timeout=0)
+        self.assertEqual(len(received), len(sent))
+        for m1, m2 in zip(received, sent):
+            for name in ('timestamp', 'arbitration_id', 'id_type', 'is_remote_frame', 'is_error_frame',
+                         'dlc', 'is_fd', 'bitrate_switch', 'error_state_indicator'):
+                self.assertEqual(getattr(m1, name), getattr(m2, name), name)
+            self.assertEqual(bytes(m1.data), bytes(m2.data))
+        self.assertIsNone(consumer.recv(timeout=0.01))
+
+    def test_consumers_start_at_the_end(self):
+        producer = self.bus(create=True, capacity=16)
+        producer.send(can.Message(arbitration_id=1))
+        consumer = self.bus()
+        producer.send(can.Message(arbitration_id=2))
+        self.assertEqual(consumer.recv(timeout=0).arbitration_id, 2)
+
+    def test_independent_cursors(self):
+        producer = self.bus(create=True, capacity=16)
+        fast, slow = self.bus(), self.bus()
+        for i in range(4):
+            producer.send(can.Message(arbitration_id=i))
+        self.assertEqual([m.arbitration_id for m in fast.recv_batch(timeout=0)], [0, 1, 2, 3])
+        self.assertEqual(slow.recv(timeout=0).arbitration_id, 0)
+        self.assertEqual([m.arbitration_id for m in slow.recv_batch(timeout=0)], [1, 2, 3])
+
+    def test_overrun(self):
+        producer = self.bus(create=True, capacity=8)
+        consumer = self.bus()
+        for i in range(20):
+            producer.send(can.Message(arbitration_id=i))
+        received = consumer.recv_batch(timeout=0)
+        self.assertEqual([m.arbitration_id for m in received], list(range(12, 20)))
+        self.assertEqual(consumer.overruns, 12)
+
+    def test_filters(self):
+        producer = self.bus(create=True, capacity=16)
+        consumer = self.bus(can_filters=[{"can_id": 0x100, "can_mask": 0x700}])
+        for arbitration_id in (0x100, 0x200, 0x1FF):
+            producer.send(can.Message(arbitration_id=arbitration_id))
+        self.assertEqual([m.arbitration_id for m in consumer.recv_batch(timeout=0)], [0x100, 0x1FF])
+
+    def test_only_producer_sends(self):
+        producer = self.bus(create=True, capacity=16)
+        consumer = self.bus()
+        self.assertRaises(can.CanError, consumer.send, can.Message())
+        self.assertRaises(can.CanError, producer.recv, 0)
+
+    def test_payload_too_large(self):
+        producer = self.bus(create=True, capacity=16)
+        self.assertRaises(ValueError, producer.send, can.Message(is_fd=True, data=range(12)))
+
+    def test_not_a_ring(self):
+        with open(self.path, 'wb') as f:
+            f.write(b'\0' * 128)
+        self.assertRaises(can.CanError, SharedMemoryBus, self.path)
+
+    def test_other_process(self):
+        producer = self.bus(create=True, capacity=1024)
+        ready, received = multiprocessing.Event(), multiprocessing.Queue()
+        process = multiprocessing.Process(target=_consume, args=(self.path, 500, (ready, received)))
+        process.start()
+        try:
+            self.assertTrue(ready.wait(10))
+            for i in range(500):
+                producer.send(can.Message(arbitration_id=i))
+            self.assertEqual(received.get(timeout=10), list(range(500)))
+        finally:
+            process.join(10)
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,316 @@
+"""
+Exercises the frame handling of the native socketcan backend. A unix
+datagram socket pair stands in for a CAN socket so no vcan interface is
+required.
+"""
+import socket
+import threading
+import time
+import unittest
+
+try:
+    from can.interfaces import socketcan_native
+except ImportError:
+    socketcan_native = None
+
+from test.helpers import socketpair_bus
+
+
+@unittest.skipIf(socketcan_native is None, "Native socketcan isn't available")
+class AncillaryTimestampTest(unittest.TestCase):
+
+    def setUp(self):
+        self.rx, self.tx = socket.socketpair(socket.AF_UNIX, socket.SOCK_DGRAM)
+
+    def tearDown(self):
+        self.rx.close()
+        self.tx.close()
+
+    def check_capture(self, nanoseconds):
+        socketcan_native.enable_timestamps(self.rx, nanoseconds)
+        before = time.time()
+        self.tx.send(socketcan_native.build_can_frame(0x80000123, b'\x01\x02\x03'))
+        packet = socketcan_native.capturePacketAncillary(self.rx)
+        after = time.time()
+
+        self.assertEqual(packet.arbitration_id, 0x123)
+        self.assertTrue(packet.is_extended_frame_format)
+        self.assertFalse(packet.is_remote_transmission_request)
+        self.assertEqual(packet.dlc, 3)
+        self.assertEqual(packet.data, b'\x01\x02\x03')
+        self.assertTrue(before - 0.001 <= packet.timestamp <= after + 0.001)
+        self.assertIsInstance(packet.timestamp_ns, int)
+        self.assertAlmostEqual(packet.timestamp_ns / 1e9, packet.timestamp, places=6)
+        return packet
+
+    def test_microsecond_timestamps(self):
+        packet = self.check_capture(nanoseconds=False)
+        self.assertEqual(packet.timestamp_ns % 1000, 0)
+
+    def test_nanosecond_timestamps(self):
+        self.check_capture(nanoseconds=True)
+
+    def test_nanoseconds_survive_drain(self):
+        socketcan_native.enable_timestamps(self.rx, True)
+        bus, _ = socketpair_bus(drain=True)
+        bus.socket.close()
+        bus.socket = self.rx
+        self.tx.send(socketcan_native.build_can_frame(0x123, b'\x01'))
+        msg = bus.recv_batch(timeout=0.5)[0]
+        self.assertIsInstance(msg.timestamp_ns, int)
+        self.assertEqual(msg.timestamp, msg.timestamp_ns / 1e9)
+
+    def test_nonblocking_capture_of_empty_socket(self):
+        socketcan_native.enable_timestamps(self.rx)
+        self.assertIsNone(socketcan_native.capturePacketAncillary(self.rx, socket.MSG_DONTWAIT))
+
+
+@unittest.skipIf(socketcan_native is None, "Native socketcan isn't available")
+class DrainTest(unittest.TestCase):
+
+    def setUp(self):
+        self.bus, self.tx = socketpair_bus(drain=True)
+
+    def tearDown(self):
+        self.tx.close()
+        self.bus.socket.close()
+
+    def send_frames(self, count):
+        for i in range(count):
+            self.tx.send(socketcan_native.build_can_frame(0x100 + i, bytes(bytearray([i]))))
+
+    def test_recv_batch_drains_queue(self):
+        self.send_frames(10)
+        messages = self.bus.recv_batch(max_count=64, timeout=0.5)
+        self.assertEqual([m.arbitration_id for m in messages], list(range(0x100, 0x10a)))
+        self.assertEqual([bytes(m.data) for m in messages], [bytes(bytearray([i])) for i in range(10)])
+        self.assertFalse(messages[0].id_type)
+        self.assertEqual(self.bus.recv_batch(timeout=0.01), [])
+
+    def test_recv_batch_max_count(self):
+        self.send_frames(5)
+        self.assertEqual(len(self.bus.recv_batch(max_count=3, timeout=0.5)), 3)
+        self.assertEqual(len(self.bus.recv_batch(max_count=3, timeout=0.5)), 2)
+
+    def test_recv_serves_drained_frames(self):
+        self.send_frames(4)
+        first = self.bus.recv(timeout=0.5)
+        self.assertEqual(first.arbitration_id, 0x100)
+        # The rest were read in the same drain
+        self.assertEqual(len(self.bus._rx_queue), 3)
+        self.assertEqual([self.bus.recv(timeout=0).arbitration_id for _ in range(3)],
+                         [0x101, 0x102, 0x103])
+        self.assertIsNone(self.bus.recv(timeout=0.01))
+
+    def test_recv_without_timeout_waits(self):
+        sender = threading.Timer(0.1, self.send_frames, (1,))
+        sender.start()
+        start = time.time()
+        msg = self.bus.recv()
+        sender.join()
+        self.assertEqual(msg.arbitration_id, 0x100)
+        self.assertGreaterEqual(time.time() - start, 0.05)
+
+    def test_drain_mixed_classic_and_fd(self):
+        self.tx.send(socketcan_native.build_can_frame(0x100, b'\x01'))
+        self.tx.send(socketcan_native.build_canfd_frame(0x80000200, bytearray(range(21)),
+                                                        socketcan_native.CANFD_BRS))
+        classic, fd = self.bus.recv_batch(timeout=0.5)
+        self.assertFalse(classic.is_fd)
+        self.assertEqual(bytes(classic.data), b'\x01')
+        self.assertTrue(fd.is_fd)
+        self.assertTrue(fd.bitrate_switch)
+        self.assertFalse(fd.error_state_indicator)
+        self.assertTrue(fd.id_type)
+        self.assertEqual(fd.arbitration_id, 0x200)
+        # 21 bytes is padded up to the next valid CAN FD length
+        self.assertEqual(fd.dlc, 24)
+        self.assertEqual(bytes(fd.data), bytes(bytearray(range(21))) + b'\x00' * 3)
+
+
+@unittest.skipIf(socketcan_native is None, "Native socketcan isn't available")
+class FDFrameTest(unittest.TestCase):
+
+    def test_canfd_frame_size(self):
+        self.assertEqual(socketcan_native.canfd_frame_size, 72)
+        self.assertEqual(len(socketcan_native.build_canfd_frame(1, b'\x01')), 72)
+
+    def test_round_trip(self):
+        data = bytearray(range(64))
+        frame = socketcan_native.build_canfd_frame(0x123, data, socketcan_native.CANFD_ESI)
+        can_id, length, flags, payload = socketcan_native.dissect_canfd_frame(frame)
+        self.assertEqual((can_id, length, flags), (0x123, 64, socketcan_native.CANFD_ESI))
+        self.assertEqual(payload, bytes(data))
+
+    def test_build_frame_from_message(self):
+        import can
+        msg = can.Message(arbitration_id=0x10, extended_id=False, is_fd=True,
+                          error_state_indicator=True, data=bytearray(9))
+        frame = socketcan_native._build_frame(msg)
+        self.assertEqual(socketcan_native.dissect_canfd_frame(frame)[:3],
+                         (0x10, 12, socketcan_native.CANFD_ESI))
+
+        msg = can.Message(arbitration_id=0x10, extended_id=False, data=b'\x01')
+        self.assertEqual(len(socketcan_native._build_frame(msg)), 16)
+
+    def test_capture_fd_packet(self):
+        rx, tx = socket.socketpair(socket.AF_UNIX, socket.SOCK_DGRAM)
+        try:
+            socketcan_native.enable_timestamps(rx)
+            tx.send(socketcan_native.build_canfd_frame(0x123, b'\x01\x02', socketcan_native.CANFD_BRS))
+            packet = socketcan_native.capturePacketAncillary(rx)
+        finally:
+            rx.close()
+            tx.close()
+        self.assertTrue(packet.is_fd)
+        self.assertTrue(packet.bitrate_switch)
+        self.assertEqual(packet.data, b'\x01\x02')
+
+
+@unittest.skipIf(socketcan_native is None, "Native socketcan isn't available")
+class ReceiveFilterTaskTest(unittest.TestCase):
+
+    def setUp(self):
+        self.rx, self.tx = socket.socketpair(socket.AF_UNIX, socket.SOCK_DGRAM)
+        task = socketcan_native.ReceiveFilterTask.__new__(socketcan_native.ReceiveFilterTask)
+        socketcan_native.ReceiveFilterTaskABC.__init__(task, 'vcan0', 0x123, data_mask=b'\xff\x00',
+                                                       timeout=0.5, extended_id=False)
+        task.bcm_socket = self.rx
+        self.task = task
+
+    def tearDown(self):
+        self.task.bcm_socket = self.tx
+        self.rx.close()
+        self.tx.close()
+
+    def test_rx_setup_message(self):
+        self.task.bcm_socket = self.tx
+        self.task._rx_setup()
+        data = self.rx.recv(1024)
+        self.assertEqual(len(data), socketcan_native.bcm_frames_offset + socketcan_native.can_frame_size)
+        (opcode, flags, count, ival1_seconds, ival1_usec, ival2_seconds, ival2_usec,
+         can_id, nframes) = socketcan_native.struct.unpack_from(socketcan_native.bcm_header_fmt, data)
+        self.assertEqual(opcode, socketcan_native.CAN_BCM_RX_SETUP)
+        self.assertTrue(flags & socketcan_native.STARTTIMER)
+        self.assertTrue(flags & socketcan_native.RX_CHECK_DLC)
+        self.assertFalse(flags & socketcan_native.RX_FILTER_ID)
+        self.assertEqual((ival1_seconds, ival1_usec), (0, 500000))
+        self.assertEqual((can_id, nframes), (0x123, 1))
+        mask = socketcan_native.dissect_can_frame(data[socketcan_native.bcm_frames_offset:])
+        self.assertEqual(mask[2], b'\xff\x00')
+
+    def test_filter_id_only(self):
+        self.task.bcm_socket = self.tx
+        self.task.data_mask = None
+        self.task._rx_setup()
+        data = self.rx.recv(1024)
+        self.assertEqual(len(data), socketcan_native.bcm_frames_offset)
+        flags = socketcan_native.struct.unpack_from("@II", data)[1]
+        self.assertTrue(flags & socketcan_native.RX_FILTER_ID)
+
+    def test_recv_changed_and_timeouts(self):
+        timeouts = []
+        self.task.on_timeout = timeouts.append
+        self.tx.send(socketcan_native.build_bcm_header(socketcan_native.CAN_BCM_RX_TIMEOUT,
+                                                       0, 0, 0, 0, 0, 0, 0x123, 0))
+        self.tx.send(socketcan_native.build_bcm_header(socketcan_native.CAN_BCM_RX_CHANGED,
+                                                       0, 0, 0, 0, 0, 0, 0x123, 1) +
+                     socketcan_native.build_can_frame(0x123, b'\x01\x02'))
+        msg = self.task.recv(timeout=0.5)
+        self.assertEqual(msg.arbitration_id, 0x123)
+        self.assertEqual(bytes(msg.data), b'\x01\x02')
+        self.assertEqual(self.task.timeouts, 1)
+        self.assertEqual(timeouts, [self.task])
+        self.assertIsNone(self.task.recv(timeout=0.01))
+
+
+@unittest.skipIf(socketcan_native is None, "Native socketcan isn't available")
+class MultiBusNotifierTest(unittest.TestCase):
+
+    def setUp(self):
+        self.pairs = [socketpair_bus(), socketpair_bus()]
+
+    def tearDown(self):
+        for bus, tx in self.pairs:
+            tx.close()
+            bus.socket.close()
+
+    def wait_for(self, received, count):
+        deadline = time.time() + 1.0
+        while len(received) < count and time.time() < deadline:
+            time.sleep(0.01)
+
+    def test_tags_and_timestamp_order(self):
+        import can
+        from test.helpers import QueueBus
+        (bus0, tx0), (bus1, tx1) = self.pairs
+        queued = QueueBus()
+        received = []
+        notifier = can.MultiBusNotifier({'a': bus0, 'b': bus1, 'q': queued}, [received.append],
+                                        timeout=0.05)
+        try:
+            # Interleave the writes so the kernel timestamps alternate
+            for i in range(6):
+                tx = tx1 if i % 2 else tx0
+                tx.send(socketcan_native.build_can_frame(i, b''))
+            queued.rx.append(can.Message(arbitration_id=0x7FF, timestamp=time.time()))
+            self.wait_for(received, 7)
+        finally:
+            notifier.stop()
+        self.assertEqual(sorted((msg.channel, msg.arbitration_id) for msg in received),
+                         [('a', 0), ('a', 2), ('a', 4), ('b', 1), ('b', 3), ('b', 5), ('q', 0x7FF)])
+        from_sockets = [msg.arbitration_id for msg in received if msg.channel != 'q']
+        self.assertEqual(from_sockets, list(range(6)))
+
+    def test_list_of_buses_and_subscriptions(self):
+        import can
+        (bus0, tx0), (bus1, tx1) = self.pairs
+        received = []
+        notifier = can.MultiBusNotifier([bus0, bus1], [], timeout=0.05, threaded=True)
+        notifier.subscribe(received.append, [{'can_id': 0x100, 'can_mask': 0x1FFFFFFF}])
+        try:
+            tx0.send(socketcan_native.build_can_frame(0x100, b''))
+            tx1.send(socketcan_native.build_can_frame(0x200, b''))
+            tx1.send(socketcan_native.build_can_frame(0x100, b''))
+            self.wait_for(received, 2)
+        finally:
+            notifier.stop()
+        self.assertEqual(sorted(msg.channel for msg in received), [0, 1])
+
+
+def vcan_fd_available(channel='vcan0'):
+    """True if `channel` exists and accepts CAN FD frames."""
+    if socketcan_native is None:
+        return False
+    try:
+        sock = socketcan_native.createSocket()
+        try:
+            socketcan_native.enable_fd_frames(sock)
+            socketcan_native.bindSocket(sock, channel)
+        finally:
+            sock.close()
+    except (OSError, socket.error):
+        return False
+    return True
+
+
+@unittest.skipUnless(vcan_fd_available(), "Needs vcan0 with an MTU of 72: "
+                                          "ip link add dev vcan0 type vcan mtu 72")
+class VirtualFDBusTest(unittest.TestCase):
+
+    def test_fd_round_trip(self):
+        import can
+        sender = socketcan_native.SocketscanNative_Bus('vcan0', fd=True)
+        receiver = socketcan_native.SocketscanNative_Bus('vcan0', fd=True)
+        msg = can.Message(arbitration_id=0x123, is_fd=True, bitrate_switch=True,
+                          data=bytearray(range(64)))
+        sender.send(msg)
+        received = receiver.recv(timeout=1.0)
+        self.assertTrue(received.is_fd)
+        self.assertTrue(received.bitrate_switch)
+        self.assertEqual(received.arbitration_id, 0x123)
+        self.assertEqual(bytes(received.data), bytes(msg.data))
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,115 @@
+import threading
+import time
+import unittest
+
+import can
+from can.interfaces.virtual import VirtualBus
+
+
+class VirtualBusTest(unittest.TestCase):
+
+    def setUp(self):
+        self.buses = []
+
+    def tearDown(self):
+        for bus in self.buses:
+            bus.shutdown()
+
+    def bus(self, channel='test', **kwargs):
+        bus = VirtualBus(channel, **kwargs)
+        self.buses.append(bus)
+        return bus
+
+    def test_interface(self):
+        bus = can.interface.Bus('test', bustype='virtual')
+        self.buses.append(bus)
+        self.assertIsInstance(bus, VirtualBus)
+
+    def test_fan_out_without_copying(self):
+        sender, a, b = self.bus(), self.bus(), self.bus()
+        msg = can.Message(arbitration_id=0x123)
+        sender.send(msg)
+        self.assertIs(a.recv(timeout=0), msg)
+        self.assertIs(b.recv(timeout=0), msg)
+        self.assertIsNone(sender.recv(timeout=0))
+
+    def test_channels_are_separate(self):
+        sender, other = self.bus('one'), self.bus('two')
+        sender.send(can.Message())
+        self.assertIsNone(other.recv(timeout=0.01))
+
+    def test_receive_own_messages(self):
+        bus = self.bus(receive_own_messages=True)
+        msg = can.Message()
+        bus.send(msg)
+        self.assertIs(bus.recv(timeout=0), msg)
+
+    def test_recv_waits(self):
+        sender, receiver = self.bus(), self.bus()
+        threading.Timer(0.02, sender.send, (can.Message(arbitration_id=7),)).start()
+        self.assertEqual(receiver.recv(timeout=1.0).arbitration_id, 7)
+
+    def test_batches(self):
+        sender, receiver = self.bus(), self.bus()
+        messages = [can.Message(arbitration_id=i) for i in range(100)]
+        sender.send_batch(messages)
+        self.assertEqual(receiver.recv_batch(max_count=64), messages[:64])
+        self.assertEqual(receiver.recv_batch(), messages[64:])
+        self.assertEqual(receiver.recv_batch(timeout=0.01), [])
+
+    def test_queue_size(self):
+        sender, receiver = self.bus(), self.bus(queue_size=3)
+        for i in range(5):
+            sender.send(can.Message(arbitration_id=i))
+        self.assertEqual([msg.arbitration_id for msg in receiver.recv_batch()], [2, 3, 4])
+
+    def test_filters(self):
+        sender = self.bus()
+        receiver = self.bus(can_filters=[{'can_id': 0x100, 'can_mask': 0x700}])
+        sender.send_batch(can.Message(arbitration_id=i) for i in (0x100, 0x200, 0x1FF))
+        self.assertEqual([msg.arbitration_id for msg in receiver.recv_batch()], [0x100, 0x1FF])
+
+    def test_shutdown_leaves_channel(self):
+        sender, receiver = self.bus(), self.bus()
+        receiver.shutdown()
+        sender.send(can.Message())
+        self.assertIsNone(receiver.recv(timeout=0))
+
+    def test_threaded_throughput(self):
+        sender, receiver = self.bus(), self.bus()
+        count = 50000
+        messages = [can.Message(arbitration_id=i & 0x7FF) for i in range(count)]
+        received = []
+
+        def consume():
+            while len(received) < count:
+                received.extend(receiver.recv_batch(timeout=1.0))
+
+        consumer = threading.Thread(target=consume)
+        consumer.start()
+        for msg in messages:
+            sender.send(msg)
+        consumer.join(5.0)
+        self.assertEqual(len(received), count)
+        self.assertTrue(all(a is b for a, b in zip(received, messages)))
+
+    def test_notifiers_do_not_retag_shared_messages(self):
+        sender, a, b = self.bus(), self.bus(), self.bus()
+        seen = {'A': [], 'B': []}
+        notifiers = [can.MultiBusNotifier({'A': a}, [seen['A'].append], timeout=0.01, poll_interval=0.001),
+                     can.MultiBusNotifier({'B': b}, [seen['B'].append], timeout=0.01, poll_interval=0.001)]
+        msg = can.Message(arbitration_id=0x123)
+        sender.send(msg)
+        for _ in range(100):
+            if seen['A'] and seen['B']:
+                break
+            time.sleep(0.01)
+        for notifier in notifiers:
+            notifier.stop()
+        self.assertEqual([m.channel for m in seen['A']], ['A'])
+        self.assertEqual([m.channel for m in seen['B']], ['B'])
+        self.assertIsNone(msg.channel)
+
+
+if __name__ == '__main__':
+    unittest.main()